@@ -2,17 +2,30 @@
 app.py
 ---------------------------
 Streamlit app for interactive transaction categorization.
+
+Uploads are cleaned and scored once per distinct file (cached by content
+hash); moving the threshold slider only re-derives brand and industry
+columns from the cached top-1 scores. The model is warmed up once per
+server process; matplotlib is only imported when a chart is drawn.
 """
 
-from io import StringIO
+import hashlib
+from io import BytesIO
 
-import matplotlib.pyplot as plt
 import pandas as pd
 import streamlit as st
 
-from categorize_transactions import MIN_CONFIDENCE_THRESHOLD, predict_top_k
-from src.brand_matcher import clean_merchant_name
-from src.industry_classifier import classify_industry
+from categorize_transactions import (
+    MIN_CONFIDENCE_THRESHOLD,
+    load_brand_model,
+    open_prediction_cache,
+    predict_top_k,
+    predict_top_k_batch,
+    threshold_brands,
+    warm_up,
+)
+from src.brand_matcher import clean_merchant_names
+from src.industry_classifier import classify_industry_frame
 
 # -------------------------------------------------------------------
 # Streamlit Page Config
@@ -20,6 +33,26 @@ from src.industry_classifier import classify_industry
 st.set_page_config(page_title="Transaction Categorization", layout="wide")
 st.title("Banking Transaction Categorization Demo")
 
+
+REQUIRED_COLUMNS = {"RAW_MERCHANT", "MCC_CODE"}
+
+
+@st.cache_resource
+def get_brand_model():
+    """Brand classifier, loaded and warmed up once per server process and shared by all sessions."""
+    warm_up()
+    return load_brand_model()
+
+
+@st.cache_resource
+def get_prediction_cache():
+    """Shared on-disk prediction cache, opened once per server process."""
+    return open_prediction_cache()
+
+
+get_brand_model()
+prediction_cache = get_prediction_cache()
+
 # -------------------------------------------------------------------
 # Sidebar Controls
 # -------------------------------------------------------------------
@@ -46,7 +79,7 @@ merchant_input = st.text_input(
 )
 
 if merchant_input:
-    top_preds = predict_top_k(merchant_input, k=3)
+    top_preds = predict_top_k(merchant_input, k=3, cache=prediction_cache)
 
     if not top_preds:
         st.warning("Model unavailable or empty input.")
@@ -63,6 +96,8 @@ if merchant_input:
         pred_df = pred_df.sort_values("Confidence", ascending=True)
 
         # Plot horizontal bar chart
+        import matplotlib.pyplot as plt
+
         fig, ax = plt.subplots(figsize=(6, 3))
         ax.barh(pred_df["Brand"], pred_df["Confidence"], color="steelblue")
         ax.set_xlabel("Confidence")
@@ -72,28 +107,37 @@ if merchant_input:
         st.pyplot(fig)
 
 # -------------------------------------------------------------------
-# Helper function to run categorization on uploaded CSV
+# Helpers to score uploaded CSVs once and re-threshold cheaply
 # -------------------------------------------------------------------
-def categorize_transactions(df: pd.DataFrame, threshold: float) -> pd.DataFrame:
-    df["cleaned_merchant"] = df["RAW_MERCHANT"].apply(clean_merchant_name)
-
-    def assign_brand(text):
-        top_preds = predict_top_k(text, k=3)
-        if not top_preds:
-            return None
-        brand, conf = top_preds[0]
-        return brand if conf >= threshold else "Other"
-
-    df["brand_pred"] = df["RAW_MERCHANT"].apply(assign_brand)
-
-    industry_df = df.apply(
-        lambda row: classify_industry(row["brand_pred"], row["MCC_CODE"]),
-        axis=1,
-        result_type="expand"
-    )
-    industry_df.columns = ["industry_t1_pred", "industry_t2_pred"]
-    df = pd.concat([df, industry_df], axis=1)
-    return df
+@st.cache_data(show_spinner=False, max_entries=8)
+def score_upload(file_hash: str, _data: bytes):
+    """
+    Parse an uploaded CSV, clean merchants and score them in one batch.
+
+    Cached by `file_hash` (the raw bytes are not re-hashed); merchants seen
+    before are answered from the on-disk prediction cache. Returns the
+    rows with `cleaned_merchant` plus top-1 class indices and confidences,
+    or None arrays when required columns are missing.
+    """
+    df = pd.read_csv(BytesIO(_data))
+    if not REQUIRED_COLUMNS.issubset(df.columns):
+        return df, None, None
+    df["cleaned_merchant"] = clean_merchant_names(df["RAW_MERCHANT"])
+    indices, confidences, _ = predict_top_k_batch(df["RAW_MERCHANT"], k=1, cache=prediction_cache)
+    return df, indices[:, 0], confidences[:, 0]
+
+
+def enrich_upload(df: pd.DataFrame, indices, confidences, threshold: float) -> pd.DataFrame:
+    """Brand and industry columns for `threshold`, derived from cached scores without rerunning the model."""
+    brands = pd.Series(threshold_brands(indices, confidences, threshold), index=df.index, name="brand_pred")
+    industry_df = classify_industry_frame(brands, df["MCC_CODE"])
+    return pd.concat([df, brands, industry_df], axis=1)
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def enriched_csv(file_hash: str, threshold: float, _df: pd.DataFrame) -> str:
+    """CSV export of an enriched upload, built once per file and threshold."""
+    return _df.to_csv(index=False)
 
 # -------------------------------------------------------------------
 # CSV Upload Section
@@ -106,28 +150,27 @@ st.write(
 uploaded_file = st.file_uploader("Upload CSV", type=["csv"])
 
 if uploaded_file is not None:
-    # Read uploaded file
-    stringio = StringIO(uploaded_file.getvalue().decode("utf-8"))
-    df_input = pd.read_csv(stringio)
+    data = uploaded_file.getvalue()
+    file_hash = hashlib.sha256(data).hexdigest()
+
+    with st.spinner("Scoring transactions..."):
+        df_input, top_indices, top_confidences = score_upload(file_hash, data)
 
     st.subheader("Preview of Uploaded Data")
-    st.dataframe(df_input.head())
+    st.dataframe(df_input.drop(columns="cleaned_merchant", errors="ignore").head())
 
-    required_cols = {"RAW_MERCHANT", "MCC_CODE"}
-    if not required_cols.issubset(df_input.columns):
-        st.error(f"CSV must contain columns: {required_cols}")
+    if top_indices is None:
+        st.error(f"CSV must contain columns: {REQUIRED_COLUMNS}")
     else:
-        with st.spinner("Categorizing transactions..."):
-            df_output = categorize_transactions(df_input, confidence_threshold)
+        df_output = enrich_upload(df_input, top_indices, top_confidences, confidence_threshold)
 
         st.success("Categorization complete.")
         st.subheader("Enriched Transactions")
         st.dataframe(df_output.head(20))
 
-        csv = df_output.to_csv(index=False)
         st.download_button(
             label="Download Enriched CSV",
-            data=csv,
+            data=enriched_csv(file_hash, confidence_threshold, df_output),
             file_name="enriched_transactions.csv",
             mime="text/csv"
         )
@@ -0,0 +1,253 @@
+"""
+run_benchmarks.py
+-----------------
+Reproducible throughput benchmarks for every stage of the enrichment pipeline.
+
+Inputs are built from `scripts.generate_synthetic_data_with_labels`: a pool
+of `--cardinality` distinct synthetic transactions is generated once and
+sampled (with a fixed seed) up to each requested row count, so merchant
+repetition resembles real card feeds.
+
+For every size the suite times merchant cleaning, brand (and top-k) inference, industry
+classification, CSV read/write and end-to-end categorization, reporting
+rows/sec and peak RSS. Single-item APIs also get p50/p99 per-call latency.
+End-to-end categorization is also run in the default and the compact
+output mode under tracemalloc, reporting the peak memory allocated by the
+call and the size of the enrichment columns it added.
+Results are written as JSON and can be checked against a stored baseline:
+
+    uv run python -m benchmarks.run_benchmarks --sizes 10000 100000 \
+        --output benchmarks/results/latest.json \
+        --baseline benchmarks/results/baseline.json --threshold 0.15
+"""
+
+import argparse
+import json
+import platform
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from categorize_transactions import (
+    MODEL_PATH,
+    categorize_transactions,
+    load_brand_model,
+    predict_brand,
+    predict_brands,
+    predict_top_k_batch,
+)
+from scripts.generate_synthetic_data_with_labels import generate_datasets
+from src.brand_matcher import clean_merchant_name, clean_merchant_names
+from src.industry_classifier import classify_industry, classify_industry_frame
+from src.transaction_io import TransactionWriter, read_transactions
+
+DEFAULT_SIZES = [10_000, 100_000]
+DEFAULT_CARDINALITY = 2_000
+DEFAULT_OUTPUT = Path("benchmarks/results/latest.json")
+ENRICHMENT_COLUMNS = ["cleaned_merchant", "brand_pred", "industry_t1_pred", "industry_t2_pred"]
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far, in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def build_input(n_rows: int, cardinality: int, seed: int = 42) -> pd.DataFrame:
+    """`n_rows` raw transactions sampled from `cardinality` distinct synthetic ones."""
+    pool, _ = generate_datasets(cardinality, seed=seed)
+    rng = np.random.default_rng(seed)
+    df = pool.iloc[rng.integers(0, len(pool), size=n_rows)].reset_index(drop=True)
+    df["TXN_ID"] = np.arange(1, n_rows + 1)
+    return df
+
+
+def time_stage(fn, n_rows: int) -> tuple[dict, object]:
+    start = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - start
+    return {
+        "seconds": round(seconds, 6),
+        "rows_per_sec": round(n_rows / seconds, 1) if seconds > 0 else None,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }, result
+
+
+def measure_memory(fn) -> tuple[dict, object]:
+    """
+    Peak memory allocated while running `fn`, as traced by tracemalloc
+    (Python objects and NumPy buffers; Arrow buffers are not traced).
+    """
+    tracemalloc.start()
+    try:
+        result = fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"peak_alloc_mb": round(peak / (1024 * 1024), 1)}, result
+
+
+def time_per_call(fn, inputs) -> dict:
+    """p50/p99 latency in microseconds of calling `fn` once per input."""
+    latencies = np.empty(len(inputs))
+    for i, value in enumerate(inputs):
+        start = time.perf_counter()
+        fn(*value) if isinstance(value, tuple) else fn(value)
+        latencies[i] = time.perf_counter() - start
+    return {
+        "calls": len(inputs),
+        "p50_us": round(float(np.percentile(latencies, 50)) * 1e6, 2),
+        "p99_us": round(float(np.percentile(latencies, 99)) * 1e6, 2),
+    }
+
+
+def run_size(n_rows: int, cardinality: int, seed: int, latency_samples: int) -> dict:
+    df = build_input(n_rows, cardinality, seed)
+    stages = {}
+
+    stages["clean_merchant_names"], cleaned = time_stage(lambda: clean_merchant_names(df["RAW_MERCHANT"]), n_rows)
+    stages["predict_brands"], (brands, _) = time_stage(lambda: predict_brands(cleaned), n_rows)
+    stages["predict_top_k_batch"], _ = time_stage(lambda: predict_top_k_batch(cleaned, k=3), n_rows)
+    stages["classify_industry_frame"], _ = time_stage(
+        lambda: classify_industry_frame(brands, df["MCC_CODE"]), n_rows
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        raw_path = Path(tmp) / "raw.csv"
+        out_path = Path(tmp) / "enriched.csv"
+        df.to_csv(raw_path, index=False)
+
+        stages["csv_read"], raw = time_stage(lambda: read_transactions(raw_path), n_rows)
+        stages["categorize_transactions"], enriched = time_stage(lambda: categorize_transactions(raw), n_rows)
+
+        def write():
+            with TransactionWriter(out_path) as writer:
+                writer.write(enriched)
+
+        stages["csv_write"], _ = time_stage(write, n_rows)
+
+        raw = read_transactions(raw_path)
+        stages["categorize_compact"], _ = time_stage(
+            lambda: categorize_transactions(raw, compact_output=True, copy=False), n_rows
+        )
+
+        memory = {}
+        for mode, options in [("default", {}), ("compact", {"compact_output": True, "copy": False})]:
+            raw = read_transactions(raw_path)
+            memory[mode], enriched = measure_memory(lambda: categorize_transactions(raw, **options))
+            columns = enriched.memory_usage(deep=True, index=False)[ENRICHMENT_COLUMNS]
+            memory[mode]["enrichment_columns_mb"] = round(columns.sum() / (1024 * 1024), 1)
+        for key in ("peak_alloc_mb", "enrichment_columns_mb"):
+            default, compact = memory["default"][key], memory["compact"][key]
+            memory[f"{key}_reduction"] = round(1 - compact / default, 3) if default else None
+
+    rng = np.random.default_rng(seed)
+    sample = rng.integers(0, n_rows, size=min(latency_samples, n_rows))
+    merchants = df["RAW_MERCHANT"].to_numpy()[sample]
+    latency = {
+        "clean_merchant_name": time_per_call(clean_merchant_name, list(merchants)),
+        "predict_brand": time_per_call(predict_brand, list(merchants)),
+        "classify_industry": time_per_call(
+            classify_industry, list(zip(brands[sample], df["MCC_CODE"].to_numpy()[sample]))
+        ),
+    }
+
+    return {"rows": n_rows, "cardinality": cardinality, "stages": stages, "latency": latency, "memory": memory}
+
+
+def run_benchmarks(sizes, cardinality: int, seed: int = 42, latency_samples: int = 1000) -> dict:
+    start = time.perf_counter()
+    load_brand_model()
+    model_load_seconds = time.perf_counter() - start
+
+    results = []
+    for n_rows in sizes:
+        print(f"Benchmarking {n_rows:,} rows (cardinality {cardinality:,})...")
+        result = run_size(n_rows, cardinality, seed, latency_samples)
+        for stage, stats in result["stages"].items():
+            print(f"  {stage:<26} {stats['rows_per_sec'] or 0:>14,.0f} rows/sec  peak RSS {stats['peak_rss_mb']:,.0f} MiB")
+        memory = result["memory"]
+        for key, label in [("peak_alloc_mb", "peak allocated"), ("enrichment_columns_mb", "enrichment columns")]:
+            print(
+                f"  compact output {label}: {memory['compact'][key]:,.1f} MiB vs {memory['default'][key]:,.1f} MiB "
+                f"({memory[f'{key}_reduction'] or 0:.0%} less)"
+            )
+        results.append(result)
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "model_path": str(MODEL_PATH),
+            "model_load_seconds": round(model_load_seconds, 4),
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def compare_results(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    Return a description of every stage whose rows/sec dropped by more
+    than `threshold` (a fraction) relative to the baseline at the same size.
+    """
+    baseline_by_size = {result["rows"]: result for result in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        reference = baseline_by_size.get(result["rows"])
+        if reference is None:
+            continue
+        for stage, stats in result["stages"].items():
+            expected = reference["stages"].get(stage, {}).get("rows_per_sec")
+            actual = stats["rows_per_sec"]
+            if expected and actual is not None and actual < expected * (1 - threshold):
+                regressions.append(
+                    f"{stage} @ {result['rows']:,} rows: {actual:,.0f} rows/sec vs baseline {expected:,.0f} "
+                    f"({actual / expected - 1:+.1%})"
+                )
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the transaction enrichment pipeline")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Row counts to benchmark")
+    parser.add_argument(
+        "--cardinality", type=int, default=DEFAULT_CARDINALITY,
+        help="Number of distinct synthetic transactions sampled into each input"
+    )
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for input generation")
+    parser.add_argument("--latency-samples", type=int, default=1000, help="Calls timed per single-item API")
+    parser.add_argument("--output", default=str(DEFAULT_OUTPUT), help="Where to write the JSON results")
+    parser.add_argument("--baseline", default=None, help="JSON results to compare against")
+    parser.add_argument(
+        "--threshold", type=float, default=0.10,
+        help="Allowed fractional rows/sec drop versus the baseline before failing"
+    )
+    args = parser.parse_args()
+
+    if load_brand_model() is None:
+        sys.exit("A trained model is required; run `uv run python -m scripts.train_brand_classifier` first.")
+
+    report = run_benchmarks(args.sizes, args.cardinality, args.seed, args.latency_samples)
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"Results written to: {output}")
+
+    if args.baseline:
+        regressions = compare_results(report, json.loads(Path(args.baseline).read_text()), args.threshold)
+        if regressions:
+            print(f"Throughput regressions beyond {args.threshold:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
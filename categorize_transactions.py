@@ -13,20 +13,81 @@ Expected input columns:
 - TIMESTAMP
 - CITY
 - COUNTRY
+
+Heavy dependencies (joblib, and through unpickling scikit-learn; scipy
+for compact models; threadpoolctl) are imported on first use, so importing
+this module stays cheap. Call warm_up() to pay for model loading and the
+first prediction ahead of traffic.
 """
 
 import argparse
+import cProfile
+import json
+import multiprocessing
+import os
+import queue
+import shutil
+import sys
+import threading
+import time
 import warnings
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import nullcontext
 from pathlib import Path
 
-import joblib
+import numpy as np
 import pandas as pd
 
-from src.brand_matcher import clean_merchant_name
-from src.industry_classifier import classify_industry
+from src.brand_matcher import BrandMatcher, clean_merchant_name_cached, clean_merchant_names
+from src.enrichment_state import EnrichmentState, run_key
+from src.industry_classifier import classify_industry_frame, get_taxonomy, set_taxonomy
+from src.industry_taxonomy import IndustryTaxonomy
+from src.metrics import NULL_METRICS, PipelineMetrics
+from src.prediction_cache import CACHE_TOP_K, PredictionCache, model_fingerprint
+from src.transaction_io import (
+    FORMATS,
+    TransactionWriter,
+    concat_files,
+    detect_format,
+    drop_rows,
+    is_file_pattern,
+    list_transaction_files,
+    read_transactions,
+)
 
 MODEL_PATH = Path("models/brand_classifier.joblib")
+CASCADE_MODEL_PATH = Path("models/brand_classifier_cascade.joblib")
+CACHE_PATH = Path("models/prediction_cache.sqlite")
+STATE_PATH = Path("models/enrichment_state.sqlite")
 MIN_CONFIDENCE_THRESHOLD = 0.25
+DICTIONARY_MIN_SCORE = 0.8  # dictionary matches at or above this score skip the model
+PREDICT_BATCH_SIZE = 4096  # unique merchant strings scored per model call
+PARALLEL_CHUNKSIZE = 50_000  # rows per task handed to a worker process
+COMPACT_STRING_DTYPE = "string[pyarrow]"  # cleaned_merchant dtype in compact output
+STREAM_BATCH_SIZE = 256  # most JSONL records enriched per batch in streaming mode
+STREAM_MAX_WAIT_MS = 50.0  # longest a streamed record waits for its batch to fill
+PREFETCH_FILES = 2  # input files read ahead while the current one is enriched in multi-file runs
+OUTPUT_LAYOUTS = ("files", "partitioned")
+REPORT_NAME = "_enrichment_report.json"  # per-file report written next to multi-file outputs
+# Forking a process that already runs BLAS threads can deadlock the children
+POOL_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+# Output column order (columns missing from the input are skipped)
+OUTPUT_COLUMNS = [
+    "TXN_ID",
+    "RAW_MERCHANT",
+    "cleaned_merchant",
+    "brand_pred",
+    "industry_t1_pred",
+    "industry_t2_pred",
+    "MCC_CODE",
+    "AMOUNT",
+    "CURRENCY",
+    "TIMESTAMP",
+    "CITY",
+    "COUNTRY",
+]
 
 # -------------------------------------------------------------------
 # Model loading and prediction utilities
@@ -34,7 +95,19 @@ MIN_CONFIDENCE_THRESHOLD = 0.25
 
 _brand_model = None  # cache
 
+def set_model_path(path):
+    """Point the loaders at another model artifact, dropping any cached model state."""
+    global MODEL_PATH, _brand_model, _brand_matcher
+    MODEL_PATH = Path(path)
+    _brand_model = None
+    _brand_matcher = None
+
 def load_brand_model():
+    """
+    Load the brand classifier from MODEL_PATH: a joblib-pickled sklearn
+    pipeline, or a directory holding a compact artifact exported by
+    `scripts.train_brand_classifier`.
+    """
     global _brand_model
     if _brand_model is None:
         if not MODEL_PATH.exists():
@@ -43,9 +116,49 @@ def load_brand_model():
                 f"Run `uv run python -m scripts.train_brand_classifier` first to train it."
             )
             return None
-        _brand_model = joblib.load(MODEL_PATH)
+        if MODEL_PATH.is_dir():
+            from src.compact_model import CompactBrandModel
+
+            _brand_model = CompactBrandModel.load(MODEL_PATH)
+        else:
+            import joblib
+
+            # Memory-map the fitted arrays so worker processes share pages
+            _brand_model = joblib.load(MODEL_PATH, mmap_mode="r")
     return _brand_model
 
+def warm_up() -> dict[str, float] | None:
+    """
+    Load the brand model and industry taxonomy and enrich a dummy row, so
+    that the first real prediction does not pay for lazy imports, model
+    loading and first-call initialization.
+
+    Returns the seconds spent on each step, or None if no model is trained.
+    """
+    timings = {}
+    start = time.perf_counter()
+    if load_brand_model() is None:
+        return None
+    get_taxonomy()
+    timings["model_load"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    categorize_transactions(pd.DataFrame({"RAW_MERCHANT": ["WARM UP #1"], "MCC_CODE": [None]}))
+    timings["first_prediction"] = time.perf_counter() - start
+    return timings
+
+_brand_matcher = None  # cache
+
+def load_brand_matcher() -> BrandMatcher | None:
+    """Dictionary matcher over the trained model's brand labels."""
+    global _brand_matcher
+    if _brand_matcher is None:
+        model = load_brand_model()
+        if model is None:
+            return None
+        _brand_matcher = BrandMatcher.from_brands(model.classes_)
+    return _brand_matcher
+
 def predict_brand(merchant_text: str):
     """Predict the single top brand from merchant text."""
     if not isinstance(merchant_text, str) or merchant_text.strip() == "":
@@ -55,7 +168,7 @@ def predict_brand(merchant_text: str):
     if model is None:
         return None
 
-    cleaned = clean_merchant_name(merchant_text)
+    cleaned = clean_merchant_name_cached(merchant_text)
     return model.predict([cleaned])[0]
 
 def predict_brand_with_confidence(merchant_text: str):
@@ -67,13 +180,11 @@ def predict_brand_with_confidence(merchant_text: str):
     if model is None:
         return None, None
 
-    cleaned = clean_merchant_name(merchant_text)
-    proba = model.predict_proba([cleaned])[0]
-    classes = model.classes_
-    top_idx = proba.argmax()
-    return classes[top_idx], proba[top_idx]
+    cleaned = clean_merchant_name_cached(merchant_text)
+    indices, confidences = score_top_k(model, [cleaned], 1)
+    return model.classes_[indices[0, 0]], confidences[0, 0]
 
-def predict_top_k(merchant_text: str, k: int = 3):
+def predict_top_k(merchant_text: str, k: int = 3, cache: PredictionCache | None = None):
     """Return top-k (brand, confidence) predictions sorted by confidence."""
     if not isinstance(merchant_text, str) or merchant_text.strip() == "":
         return []
@@ -82,80 +193,1196 @@ def predict_top_k(merchant_text: str, k: int = 3):
     if model is None:
         return []
 
-    cleaned = clean_merchant_name(merchant_text)
-    proba = model.predict_proba([cleaned])[0]
+    cleaned = clean_merchant_name_cached(merchant_text)
+    if cache is not None and k <= CACHE_TOP_K:
+        hit = cache.get_many([cleaned]).get(cleaned)
+        if hit is not None:
+            return hit[2][:k]
+
+    indices, confidences = score_top_k(model, [cleaned], max(k, CACHE_TOP_K if cache is not None else 0))
+    classes = model.classes_
+    top = [(classes[i], confidence) for i, confidence in zip(indices[0], confidences[0]) if i >= 0]
+    if cache is not None:
+        cache.put_many([(cleaned, top[0][0], top[0][1], top[:CACHE_TOP_K])])
+    return top[:k]
+
+def top_k_indices(proba: np.ndarray, k: int) -> np.ndarray:
+    """
+    Column indices of the `k` largest values in each row of `proba`, best
+    first, as an int32 (n_rows, k) array.
+
+    Uses argpartition, so only the k candidates per row are sorted. Ties
+    among the selected candidates are ordered by column; which of several
+    values tied at the cut-off is selected is unspecified (except for k=1,
+    which matches argmax).
+    """
+    n_classes = proba.shape[1]
+    k = min(k, n_classes)
+    if k == 1:
+        return proba.argmax(axis=1).astype(np.int32)[:, None]
+    if k < n_classes:
+        candidates = np.argpartition(proba, n_classes - k, axis=1)[:, n_classes - k:]
+    else:
+        candidates = np.broadcast_to(np.arange(n_classes), proba.shape)
+    values = np.take_along_axis(proba, candidates, axis=1)
+    order = np.lexsort((candidates, -values), axis=1)
+    return np.take_along_axis(candidates, order, axis=1).astype(np.int32)
+
+def score_top_k(model, texts, k: int, metrics: PipelineMetrics | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    (indices, confidences) of the `k` best classes of `model` for each
+    cleaned text, best first.
+
+    Models with a `top_k()` method (e.g. BrandCandidateIndex) rank their
+    candidates themselves and may pad rows with -1/NaN; for the others the
+    full predict_proba() matrix is ranked with top_k_indices(). Models with
+    a `route()` method (CascadeBrandModel) also report how many rows each
+    of their stages scored, counted in `metrics` as `cascade_<stage>`.
+    """
+    if hasattr(model, "top_k"):
+        return model.top_k(texts, k)
+    if hasattr(model, "route"):
+        proba, routes = model.route(texts)
+        for stage, rows in routes.items():
+            (metrics or NULL_METRICS).add(f"cascade_{stage}", rows)
+    else:
+        proba = model.predict_proba(texts)
+    top = top_k_indices(proba, k)
+    return top, np.take_along_axis(proba, top, axis=1)
+
+def _factorize_cleaned(texts) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Return (row_codes, cleaned): the distinct cleaned merchant strings and,
+    per input text, the index of its cleaned form (-1 for empty or
+    non-string inputs). Each distinct raw string is cleaned once.
+    """
+    codes, uniques = pd.factorize(texts if isinstance(texts, pd.Series) else pd.Series(texts, dtype=object))
+    valid = np.array(
+        [i for i, text in enumerate(uniques) if isinstance(text, str) and text.strip() != ""],
+        dtype=np.intp,
+    )
+    # Different raw strings often clean to the same text; score each once
+    cleaned_codes, cleaned = pd.factorize(clean_merchant_names(uniques[valid]))
+    # The trailing -1 is picked by inputs that factorize to -1 (NaN/None)
+    unique_codes = np.full(len(uniques) + 1, -1, dtype=np.intp)
+    unique_codes[valid] = cleaned_codes
+    return unique_codes[codes], cleaned.to_numpy()
+
+def _score_cleaned(
+    model,
+    cleaned: np.ndarray,
+    k: int,
+    batch_size: int = PREDICT_BATCH_SIZE,
+    cache: PredictionCache | None = None,
+    metrics: PipelineMetrics | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    (indices, confidences) of the `k` best classes for distinct cleaned
+    merchant strings, best first, scoring `batch_size` texts per model call.
+
+    With a `cache`, merchants it holds are answered from it when `k` is at
+    most CACHE_TOP_K, and newly scored merchants are stored with their
+    CACHE_TOP_K best classes. Missing ranks are -1 / NaN.
+    """
+    metrics = metrics or NULL_METRICS
+    classes = model.classes_
+    indices = np.full((len(cleaned), k), -1, dtype=np.int32)
+    confidences = np.full((len(cleaned), k), np.nan)
+
+    cached = {}
+    if cache is not None and k <= CACHE_TOP_K:
+        with metrics.stage("cache_lookup", rows=len(cleaned)):
+            cached = cache.get_many(cleaned)
+            if cached:
+                class_index = {label: i for i, label in enumerate(classes)}
+                for row, text in enumerate(cleaned):
+                    if text in cached:
+                        pairs = cached[text][2][:k]
+                        indices[row, :len(pairs)] = [class_index.get(label, -1) for label, _ in pairs]
+                        confidences[row, :len(pairs)] = [confidence for _, confidence in pairs]
+        metrics.add("cache_hits", len(cached))
+        metrics.add("cache_misses", len(cleaned) - len(cached))
+    missing = np.array([row for row, text in enumerate(cleaned) if text not in cached], dtype=np.intp)
+    metrics.add("model_predictions", len(missing))
+
+    scored_k = max(k, CACHE_TOP_K) if cache is not None else k
+    new_entries = []
+    for start in range(0, len(missing), batch_size):
+        batch = missing[start:start + batch_size]
+        with metrics.stage("model_inference", rows=len(batch)):
+            top, top_confidences = score_top_k(model, cleaned[batch], scored_k, metrics)
+            indices[batch] = top[:, :k]
+            confidences[batch] = top_confidences[:, :k]
+        if cache is not None:
+            for row, i in enumerate(batch):
+                pairs = [(classes[j], confidence) for j, confidence in zip(top[row], top_confidences[row]) if j >= 0]
+                if pairs:
+                    new_entries.append((cleaned[i], pairs[0][0], pairs[0][1], pairs[:CACHE_TOP_K]))
+    if cache is not None:
+        with metrics.stage("cache_store", rows=len(new_entries)):
+            cache.put_many(new_entries)
+    return indices, confidences
+
+def predict_top_k_batch(
+    texts, k: int = 3, batch_size: int = PREDICT_BATCH_SIZE, cache: PredictionCache | None = None
+):
+    """
+    Top-k brands for many merchant texts, as compact arrays.
+
+    Returns (indices, confidences, labels), each shaped (len(texts), k) and
+    ordered best first: int32 indices into the model's classes_, float32
+    confidences and brand labels. Rows for empty or non-string inputs hold
+    -1, NaN and None. Each distinct cleaned merchant is scored once and
+    only its k best classes are ranked (see top_k_indices). With a
+    `cache`, previously seen merchants skip the model (for k up to
+    CACHE_TOP_K) and new predictions are stored.
+    """
+    row_codes, cleaned = _factorize_cleaned(texts)
+    model = load_brand_model()
+    classes = np.asarray(model.classes_, dtype=object) if model is not None else np.empty(0, dtype=object)
+    k = min(k, len(classes)) if model is not None else k
+
+    indices = np.full((len(row_codes), k), -1, dtype=np.int32)
+    confidences = np.full((len(row_codes), k), np.nan, dtype=np.float32)
+    labels = np.full((len(row_codes), k), None, dtype=object)
+    if model is None or len(cleaned) == 0:
+        return indices, confidences, labels
+
+    cleaned_indices, cleaned_confidences = _score_cleaned(model, cleaned, k, batch_size, cache)
+    mask = row_codes >= 0
+    indices[mask] = cleaned_indices[row_codes[mask]]
+    confidences[mask] = cleaned_confidences[row_codes[mask]]
+    labels[indices >= 0] = classes[indices[indices >= 0]]
+    return indices, confidences, labels
+
+def assign_brands(
+    texts,
+    threshold: float = MIN_CONFIDENCE_THRESHOLD,
+    batch_size: int = PREDICT_BATCH_SIZE,
+    cache: PredictionCache | None = None,
+):
+    """
+    Return (brands, confidences) for many merchant texts, with brands whose
+    confidence is below `threshold` replaced by "Other".
+
+    Confidences are float32; empty or non-string inputs get a None brand
+    and a NaN confidence. `cache` is used as in predict_top_k_batch.
+    """
+    indices, confidences, _ = predict_top_k_batch(texts, k=1, batch_size=batch_size, cache=cache)
+    return threshold_brands(indices[:, 0], confidences[:, 0], threshold), confidences[:, 0]
+
+def threshold_brands(indices: np.ndarray, confidences: np.ndarray, threshold: float = MIN_CONFIDENCE_THRESHOLD):
+    """
+    Brand labels for top-1 class `indices` (as returned by
+    predict_top_k_batch), with "Other" where the confidence is below
+    `threshold` and None where the index is -1 (empty input).
+
+    Cheap enough to re-run whenever only the threshold changes.
+    """
+    brands = np.full(len(indices), None, dtype=object)
+    scored = indices >= 0
+    if scored.any():
+        classes = np.asarray(load_brand_model().classes_, dtype=object)
+        brands[scored] = np.where(confidences[scored] >= threshold, classes[indices[scored]], "Other")
+    return brands
+
+def predict_brands(
+    texts,
+    batch_size: int = PREDICT_BATCH_SIZE,
+    cache: PredictionCache | None = None,
+    matcher: BrandMatcher | None = None,
+    metrics: PipelineMetrics | None = None,
+):
+    """
+    Return (brands, confidences) arrays for many merchant texts at once.
+
+    Texts are factorized so each distinct merchant string is cleaned and
+    scored only once; the model sees the unique values in batches of at
+    most `batch_size` and results are broadcast back to the input order.
+    With a `matcher`, merchants it resolves with a score of at least
+    DICTIONARY_MIN_SCORE take the dictionary brand (and score) without
+    touching the model. With a `cache`, previously seen cleaned merchants
+    skip the model and new predictions are stored. Empty or non-string
+    inputs yield a brand of None and a NaN confidence.
+    """
+    metrics = metrics or NULL_METRICS
+    row_codes, cleaned = _factorize_cleaned(texts)
+    brands = np.full(len(row_codes), None, dtype=object)
+    confidences = np.full(len(row_codes), np.nan)
+
+    model = load_brand_model()
+    if model is None or len(cleaned) == 0:
+        return brands, confidences
+
+    cleaned_brands = np.full(len(cleaned), None, dtype=object)
+    cleaned_confidences = np.full(len(cleaned), np.nan)
     classes = model.classes_
-    top_indices = proba.argsort()[::-1][:k]
-    return [(classes[i], proba[i]) for i in top_indices]
+    metrics.add("unique_merchants", len(cleaned))
+
+    pending = np.arange(len(cleaned))
+    if matcher is not None:
+        with metrics.stage("dictionary_match", rows=len(cleaned)):
+            matched, scores = matcher.match_many(cleaned)
+            resolved = scores >= DICTIONARY_MIN_SCORE
+            cleaned_brands[resolved] = matched[resolved]
+            cleaned_confidences[resolved] = scores[resolved]
+            pending = np.flatnonzero(~resolved)
+        metrics.add("dictionary_resolved", int(resolved.sum()))
+
+    top, top_confidences = _score_cleaned(model, cleaned[pending], 1, batch_size, cache, metrics)
+    cleaned_brands[pending] = classes[top[:, 0]]
+    cleaned_confidences[pending] = top_confidences[:, 0]
+
+    mask = row_codes >= 0
+    brands[mask] = cleaned_brands[row_codes[mask]]
+    confidences[mask] = cleaned_confidences[row_codes[mask]]
+    return brands, confidences
+
+def brand_categorical(brands) -> pd.Categorical:
+    """
+    Brand labels as a categorical whose categories are the model's classes
+    (labels outside them, e.g. from a custom matcher, are appended).
+    """
+    brands = np.asarray(brands, dtype=object)
+    model = load_brand_model()
+    categories = pd.Index(model.classes_ if model is not None else [], dtype=object)
+    codes = categories.get_indexer(brands)
+    unknown = (codes == -1) & pd.notna(brands)
+    if unknown.any():
+        categories = categories.append(pd.Index(pd.unique(brands[unknown]), dtype=object))
+        codes = categories.get_indexer(brands)
+    return pd.Categorical.from_codes(codes, categories=categories)
+
+def open_prediction_cache(path=CACHE_PATH) -> PredictionCache | None:
+    """Open the on-disk prediction cache for the current model, or None if no model is trained."""
+    if not MODEL_PATH.exists():
+        return None
+    return PredictionCache(path, model_fingerprint(MODEL_PATH))
 
 # -------------------------------------------------------------------
 # Categorization pipeline
 # -------------------------------------------------------------------
 
-def categorize_transactions(df: pd.DataFrame) -> pd.DataFrame:
+def categorize_transactions(
+    df: pd.DataFrame,
+    cache: PredictionCache | None = None,
+    matcher: BrandMatcher | None = None,
+    metrics: PipelineMetrics | None = None,
+    compact_output: bool = False,
+    copy: bool = True,
+) -> pd.DataFrame:
     """
     Apply text cleansing, brand assignment, and industry classification
     to a transactions DataFrame. Location and currency fields are passed through.
+    Pass a `matcher` (see load_brand_matcher) to resolve clean merchant names
+    by dictionary lookup before falling back to the model, and `metrics` to
+    collect per-stage timings and counters.
+
+    The enrichment columns are added to `df` itself. With `compact_output`,
+    `cleaned_merchant` holds Arrow-backed strings and `brand_pred` is a
+    categorical over the model's classes (the industry tiers are always
+    categorical). With `copy=False` the result is assembled from `df`'s
+    column arrays instead of a reordered copy: it shares memory with `df`,
+    which the caller should no longer use.
     """
+    metrics = metrics or NULL_METRICS
+    rows = len(df)
+    metrics.add("rows", rows)
+
     # Step 1: Cleanse merchant names
-    df["cleaned_merchant"] = df["RAW_MERCHANT"].apply(clean_merchant_name)
+    with metrics.stage("clean_merchant", rows=rows):
+        df["cleaned_merchant"] = clean_merchant_names(
+            df["RAW_MERCHANT"], dtype=COMPACT_STRING_DTYPE if compact_output else object
+        )
 
-    # Step 2: Brand assignment using ML model
-    df["brand_pred"] = df["cleaned_merchant"].apply(predict_brand)
+    # Step 2: Brand assignment using ML model (batched over unique merchants)
+    with metrics.stage("predict_brands", rows=rows):
+        brands, confidences = predict_brands(df["cleaned_merchant"], cache=cache, matcher=matcher, metrics=metrics)
+        df["brand_pred"] = brand_categorical(brands) if compact_output else brands
+    if metrics.enabled:
+        metrics.add("below_threshold_rows", int((confidences < MIN_CONFIDENCE_THRESHOLD).sum()))
 
     # Step 3: Industry classification (brand first, then MCC fallback)
-    industry_df = df.apply(
-        lambda row: classify_industry(row["brand_pred"], row["MCC_CODE"]),
-        axis=1,
-        result_type="expand"
-    )
-    industry_df.columns = ["industry_t1_pred", "industry_t2_pred"]
-
-    # Step 4: Combine results
-    df = pd.concat([df, industry_df], axis=1)
-
-    # Reorder columns for readability
-    column_order = [
-        "TXN_ID",
-        "RAW_MERCHANT",
-        "cleaned_merchant",
-        "brand_pred",
-        "industry_t1_pred",
-        "industry_t2_pred",
-        "MCC_CODE",
-        "AMOUNT",
-        "CURRENCY",
-        "TIMESTAMP",
-        "CITY",
-        "COUNTRY"
-    ]
-    df = df[[col for col in column_order if col in df.columns]]
+    with metrics.stage("classify_industry", rows=rows):
+        industry_df = classify_industry_frame(df["brand_pred"], df["MCC_CODE"])
+
+    # Step 4: Combine results and reorder columns for readability
+    with metrics.stage("assemble", rows=rows):
+        if copy:
+            df = pd.concat([df, industry_df], axis=1)
+            df = df[[col for col in OUTPUT_COLUMNS if col in df.columns]]
+        else:
+            for col in industry_df.columns:
+                df[col] = industry_df[col].array
+            df = pd.DataFrame({col: df[col] for col in OUTPUT_COLUMNS if col in df.columns}, copy=False)
     return df
 
+# -------------------------------------------------------------------
+# Parallel execution
+# -------------------------------------------------------------------
+
+_worker_cache = None  # per-process PredictionCache opened by _init_worker
+_worker_matcher = None  # per-process BrandMatcher handed over by _init_worker
+
+def _init_worker(
+    model_path: str,
+    blas_threads: int | None,
+    cache_args: tuple | None,
+    matcher: BrandMatcher | None,
+    taxonomy: IndustryTaxonomy,
+):
+    """Process-pool initializer: cap native threads, load the model and open the cache once."""
+    global _worker_cache, _worker_matcher
+    set_model_path(model_path)
+    set_taxonomy(taxonomy)
+    if blas_threads is not None:
+        from threadpoolctl import threadpool_limits
+
+        threadpool_limits(limits=blas_threads)
+    warm_up()
+    if cache_args is not None:
+        _worker_cache = PredictionCache(*cache_args)
+    _worker_matcher = matcher
+
+def _categorize_in_worker(chunk: pd.DataFrame, collect_metrics: bool, compact_output: bool = False):
+    """Enrich one chunk; also returns its cache hits/misses and, if requested, its metrics."""
+    metrics = PipelineMetrics() if collect_metrics else None
+    hits, misses = (_worker_cache.hits, _worker_cache.misses) if _worker_cache is not None else (0, 0)
+    enriched = categorize_transactions(
+        chunk, cache=_worker_cache, matcher=_worker_matcher, metrics=metrics,
+        compact_output=compact_output, copy=not compact_output,
+    )
+    if _worker_cache is not None:
+        hits, misses = _worker_cache.hits - hits, _worker_cache.misses - misses
+    return enriched, hits, misses, metrics.as_dict() if metrics is not None else None
+
+def iter_categorized_chunks(
+    chunks,
+    workers: int = 1,
+    blas_threads: int | None = None,
+    cache: PredictionCache | None = None,
+    matcher: BrandMatcher | None = None,
+    metrics: PipelineMetrics | None = None,
+    compact_output: bool = False,
+):
+    """
+    Enrich an iterable of DataFrames, yielding results in input order.
+
+    With `workers` > 1 the chunks are processed by a process pool whose
+    workers each load the model once; at most 2 * `workers` chunks are in
+    flight so memory stays bounded for streamed input. `blas_threads`
+    caps BLAS/OpenMP threads per worker to avoid oversubscribing cores.
+    Workers open their own connection to `cache`'s file and their hit/miss
+    counts are added to `cache`. Worker-side `metrics` are merged into
+    `metrics`, so stage times are summed across workers. With
+    `compact_output` the chunks are enriched in place into compact dtypes
+    (see categorize_transactions), so they must not be reused.
+    """
+    metrics = metrics or NULL_METRICS
+    if workers <= 1:
+        if blas_threads is not None:
+            from threadpoolctl import threadpool_limits
+
+            limits = threadpool_limits(limits=blas_threads)
+        else:
+            limits = nullcontext()
+        with limits:
+            for chunk in chunks:
+                yield categorize_transactions(
+                    chunk, cache=cache, matcher=matcher, metrics=metrics,
+                    compact_output=compact_output, copy=not compact_output,
+                )
+        return
+
+    cache_args = (str(cache.path), cache.fingerprint, cache.max_entries) if cache is not None else None
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context(POOL_START_METHOD),
+        initializer=_init_worker,
+        initargs=(str(MODEL_PATH), blas_threads, cache_args, matcher, get_taxonomy()),
+    ) as pool:
+        def collect(future):
+            enriched, hits, misses, worker_metrics = future.result()
+            if cache is not None:
+                cache.hits += hits
+                cache.misses += misses
+            if worker_metrics is not None:
+                metrics.merge(worker_metrics)
+            return enriched
+
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(_categorize_in_worker, chunk, metrics.enabled, compact_output))
+            if len(pending) >= 2 * workers:
+                yield collect(pending.popleft())
+        while pending:
+            yield collect(pending.popleft())
+
+def categorize_transactions_parallel(
+    df: pd.DataFrame,
+    workers: int,
+    chunksize: int = PARALLEL_CHUNKSIZE,
+    blas_threads: int | None = 1,
+    cache: PredictionCache | None = None,
+    matcher: BrandMatcher | None = None,
+    metrics: PipelineMetrics | None = None,
+    compact_output: bool = False,
+) -> pd.DataFrame:
+    """
+    Run categorize_transactions() over `df` split into `chunksize`-row
+    partitions on `workers` processes, preserving row order.
+    """
+    chunks = (df.iloc[start:start + chunksize] for start in range(0, len(df), chunksize))
+    results = list(iter_categorized_chunks(chunks, workers, blas_threads, cache, matcher, metrics, compact_output))
+    if not results:
+        return categorize_transactions(
+            df.copy(), cache=cache, matcher=matcher, metrics=metrics, compact_output=compact_output
+        )
+    return pd.concat(results)
+
+def enrich_file_in_chunks(
+    input_file: Path,
+    output_file: Path,
+    chunksize: int,
+    workers: int = 1,
+    blas_threads: int | None = None,
+    cache: PredictionCache | None = None,
+    matcher: BrandMatcher | None = None,
+    input_format: str | None = None,
+    output_format: str | None = None,
+    metrics: PipelineMetrics | None = None,
+    compact_output: bool = False,
+) -> pd.DataFrame:
+    """
+    Stream `input_file` through the pipeline `chunksize` rows at a time,
+    appending each enriched chunk to `output_file` as it completes.
+
+    Memory stays bounded by the chunk size, and the file written is
+    byte-identical to the in-memory run. Returns the first rows for preview.
+    """
+    metrics = metrics or NULL_METRICS
+    preview = None
+    rows_done = 0
+    start = time.perf_counter()
+    chunks = metrics.timed_iter("read", read_transactions(input_file, input_format, chunksize=chunksize))
+
+    with TransactionWriter(output_file, output_format) as writer:
+        for enriched in iter_categorized_chunks(chunks, workers, blas_threads, cache, matcher, metrics, compact_output):
+            with metrics.stage("write", rows=len(enriched)):
+                writer.write(enriched)
+            if preview is None:
+                preview = enriched.head(10)
+
+            rows_done += len(enriched)
+            elapsed = time.perf_counter() - start
+            print(f"  {rows_done:,} rows enriched ({rows_done / max(elapsed, 1e-9):,.0f} rows/sec)")
+
+    return preview
+
+def enrich_file_incrementally(
+    input_file: Path,
+    output_file: Path,
+    state: EnrichmentState,
+    chunksize: int = PARALLEL_CHUNKSIZE,
+    workers: int = 1,
+    blas_threads: int | None = None,
+    cache: PredictionCache | None = None,
+    matcher: BrandMatcher | None = None,
+    input_format: str | None = None,
+    output_format: str | None = None,
+    metrics: PipelineMetrics | None = None,
+    compact_output: bool = False,
+) -> pd.DataFrame | None:
+    """
+    Enrich only the rows of `input_file` whose TXN_ID `state` has not seen
+    enriched by the current model, appending them to `output_file`.
+
+    `output_file` accumulates: after each run it holds every row enriched
+    into it so far, the rows of this run last. Rows re-enriched because
+    the model changed replace their earlier rows, so each TXN_ID appears
+    once. When nothing is new or stale, `output_file` is left untouched.
+
+    Each chunk's enriched rows go to their own part file in
+    `<output_file>.parts/`, and the chunk is then checkpointed in `state`
+    together with its TXN_IDs. A rerun after a crash skips checkpointed
+    chunks; once every chunk is done the previous output and the parts
+    are assembled into a new `output_file`, which replaces the old one,
+    and only then are the TXN_IDs marked enriched. If the input changed
+    before the rerun, the old checkpoints and parts are discarded and
+    their rows enriched again. Returns the first enriched rows for
+    preview (None when there was nothing to enrich).
+    """
+    metrics = metrics or NULL_METRICS
+    fmt = detect_format(output_file, output_format)
+    parts_dir = output_file.with_name(output_file.name + ".parts")
+    key = run_key(input_file, output_file, state.fingerprint, chunksize)
+    done = state.completed_chunks(output_file, key)
+    if done:
+        print(f"Resuming: {len(done):,} chunks already enriched")
+    elif parts_dir.exists():
+        shutil.rmtree(parts_dir)  # left over from a run over other input or another model
+    parts_dir.mkdir(parents=True, exist_ok=True)
+
+    in_flight = deque()  # (chunk number, TXN_IDs) of chunks handed to the pipeline, in order
+
+    def pending_chunks():
+        chunks = metrics.timed_iter("read", read_transactions(input_file, input_format, chunksize=chunksize))
+        for number, chunk in enumerate(chunks):
+            if number in done:
+                continue
+            if "TXN_ID" not in chunk.columns:
+                raise ValueError("Incremental enrichment needs a TXN_ID column.")
+            pending = state.pending_mask(chunk["TXN_ID"], output_file)
+            metrics.add("skipped_rows", int((~pending).sum()))
+            if not pending.all():
+                chunk = chunk[pending].copy()
+            in_flight.append((number, chunk["TXN_ID"].to_numpy()))
+            yield chunk
+
+    preview = None
+    rows_done = 0
+    start = time.perf_counter()
+    for enriched in iter_categorized_chunks(
+        pending_chunks(), workers, blas_threads, cache, matcher, metrics, compact_output
+    ):
+        number, txn_ids = in_flight.popleft()
+        part = None
+        if len(enriched):
+            part = f"part-{number:06d}{output_file.suffix}"
+            # Written under a temporary name so a checkpointed part is always complete
+            partial = parts_dir / f"{part}.partial"
+            with metrics.stage("write", rows=len(enriched)), TransactionWriter(partial, fmt) as writer:
+                writer.write(enriched)
+            partial.replace(parts_dir / part)
+            if preview is None:
+                preview = enriched.head(10)
+        state.commit_chunk(output_file, key, number, txn_ids, part)
+        done[number] = part
+
+        rows_done += len(enriched)
+        elapsed = time.perf_counter() - start
+        print(f"  chunk {number}: {len(enriched):,} new or stale rows ({rows_done:,} enriched, "
+              f"{rows_done / max(elapsed, 1e-9):,.0f} rows/sec)")
+
+    parts = [parts_dir / part for _, part in sorted(done.items()) if part is not None]
+    if parts:
+        with metrics.stage("write"):
+            if output_file.exists():
+                # Rows of this run already in the output (re-enriched, or appended before a crash) are replaced
+                previous = parts_dir / f"previous{output_file.suffix}"
+                if not drop_rows(output_file, previous, "TXN_ID", state.staged_txn_ids(output_file), fmt):
+                    previous = output_file
+                parts = [previous, *parts]
+            partial = output_file.with_name(output_file.name + ".partial")
+            concat_files(parts, partial, fmt)
+            partial.replace(output_file)
+    else:
+        print("No new or stale transactions to enrich.")
+    state.finish_run(output_file)
+    shutil.rmtree(parts_dir)
+    return preview
+
+# -------------------------------------------------------------------
+# Multi-file ingestion
+# -------------------------------------------------------------------
+
+_OUTPUT_SUFFIXES = {"csv": ".csv", "parquet": ".parquet", "arrow": ".arrow"}
+
+def multi_file_output_paths(input_files, output_dir: Path, layout: str = "files", fmt: str | None = None) -> list[Path]:
+    """
+    Where enrich_files() writes the enriched rows of each of `input_files`.
+
+    Inputs are named by their path relative to the deepest directory
+    holding all of them. The "files" layout mirrors that path in
+    `output_dir`; the "partitioned" layout writes a Hive-style dataset
+    with one `source=<relative path without extension>` partition per
+    input file (subdirectories joined by "__"), in format `fmt` (Parquet
+    by default).
+
+    Raises ValueError if `output_dir` holds any of the inputs, or if two
+    inputs would be written to the same place.
+    """
+    if layout not in OUTPUT_LAYOUTS:
+        raise ValueError(f"Unsupported output layout {layout!r}; expected one of {OUTPUT_LAYOUTS}")
+    input_files = [Path(path).resolve() for path in input_files]
+    inside = [str(path) for path in input_files if Path(output_dir).resolve() in path.parents]
+    if inside:
+        raise ValueError(f"Output directory {output_dir} contains input files: {', '.join(inside)}")
+    if not input_files:
+        return []
+
+    root = Path(os.path.commonpath([path.parent for path in input_files]))
+    outputs, sources = [], {}
+    for input_file in input_files:
+        relative = input_file.relative_to(root)
+        if layout == "files":
+            output_file = Path(output_dir) / relative
+        else:
+            source = "__".join(relative.with_suffix("").parts)
+            output_file = Path(output_dir) / f"source={source}" / f"part-0{_OUTPUT_SUFFIXES[fmt or 'parquet']}"
+        sources.setdefault(output_file, []).append(str(input_file))
+        outputs.append(output_file)
+    clashes = ["; ".join(inputs) for inputs in sources.values() if len(inputs) > 1]
+    if clashes:
+        raise ValueError(f"Input files would be written to the same output: {' | '.join(clashes)}")
+    return outputs
+
+def _timed(function, *args):
+    start = time.perf_counter()
+    return function(*args), time.perf_counter() - start
+
+def _read_file(path: Path, fmt: str | None, metrics: PipelineMetrics) -> pd.DataFrame:
+    with metrics.stage("read"):
+        return read_transactions(path, fmt)
+
+def _write_file(df: pd.DataFrame, path: Path, fmt: str | None, metrics: PipelineMetrics):
+    # Written under a temporary name so a failed write leaves no truncated output behind
+    partial = path.with_name(path.name + ".partial")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        with metrics.stage("write", rows=len(df)), TransactionWriter(partial, detect_format(path, fmt)) as writer:
+            writer.write(df)
+        partial.replace(path)
+    finally:
+        partial.unlink(missing_ok=True)
+
+def enrich_files(
+    input_files,
+    output_dir: Path,
+    layout: str = "files",
+    prefetch: int = PREFETCH_FILES,
+    cache: PredictionCache | None = None,
+    matcher: BrandMatcher | None = None,
+    file_format: str | None = None,
+    metrics: PipelineMetrics | None = None,
+    compact_output: bool = False,
+) -> list[dict]:
+    """
+    Enrich each of `input_files` into `output_dir` (see
+    multi_file_output_paths for the layouts) with the already loaded model.
+
+    Up to `prefetch` upcoming files are read and parsed on a background
+    thread pool while the current one is enriched, and each enriched file
+    is written on a writer thread while the next one is enriched (at most
+    one write is pending, which bounds memory). A file that fails to read,
+    enrich or write is reported and skipped; the others still complete.
+
+    Returns one report per input file, in input order: input, output,
+    rows, read/enrich/write seconds, rows_per_sec (rows over the sum of
+    the three) and error (None on success).
+    """
+    metrics = metrics or NULL_METRICS
+    output_format = file_format if layout == "files" else file_format or "parquet"
+    input_files = list(input_files)
+    output_files = dict(zip(input_files, multi_file_output_paths(input_files, output_dir, layout, output_format)))
+    upcoming = iter(input_files)
+    reads = deque()  # (input file, read future), in input order
+    reports = []
+    pending_write = None  # (report, write future) of the previous file
+
+    def finish(report, write=None):
+        if write is not None:
+            try:
+                _, report["write_seconds"] = write.result()
+            except Exception as error:
+                report["error"] = f"{type(error).__name__}: {error}"
+        seconds = report["read_seconds"] + report["enrich_seconds"] + report["write_seconds"]
+        report["rows_per_sec"] = report["rows"] / seconds if report["error"] is None and seconds > 0 else None
+        metrics.add("files_failed" if report["error"] else "files_enriched")
+        reports.append(report)
+        if report["error"]:
+            print(f"  {report['input']}: FAILED ({report['error']})")
+        else:
+            print(f"  {report['input']}: {report['rows']:,} rows in {seconds:.2f}s "
+                  f"({report['rows_per_sec']:,.0f} rows/sec) -> {report['output']}")
+
+    with (
+        ThreadPoolExecutor(max_workers=max(prefetch, 1), thread_name_prefix="prefetch") as readers,
+        ThreadPoolExecutor(max_workers=1, thread_name_prefix="writer") as writer,
+    ):
+        def prefetch_next():
+            path = next(upcoming, None)
+            if path is not None:
+                reads.append((path, readers.submit(_timed, _read_file, Path(path), file_format, metrics)))
+
+        for _ in range(max(prefetch, 1)):
+            prefetch_next()
+        while reads:
+            input_file, read = reads.popleft()
+            prefetch_next()
+            output_file = output_files[input_file]
+            report = {
+                "input": str(input_file), "output": str(output_file), "rows": 0,
+                "read_seconds": 0.0, "enrich_seconds": 0.0, "write_seconds": 0.0, "error": None,
+            }
+            try:
+                df, report["read_seconds"] = read.result()
+                start = time.perf_counter()
+                enriched = categorize_transactions(
+                    df, cache=cache, matcher=matcher, metrics=metrics,
+                    compact_output=compact_output, copy=not compact_output,
+                )
+                report["enrich_seconds"] = time.perf_counter() - start
+                del df
+                report["rows"] = len(enriched)
+            except Exception as error:
+                report["error"] = f"{type(error).__name__}: {error}"
+                enriched = None
+
+            # Reports stay in input order: the previous file's write completes first
+            if pending_write is not None:
+                finish(*pending_write)
+                pending_write = None
+            if enriched is None:
+                finish(report)
+            else:
+                write = writer.submit(_timed, _write_file, enriched, output_file, output_format, metrics)
+                pending_write = (report, write)
+                del enriched
+        if pending_write is not None:
+            finish(*pending_write)
+    return reports
+
+# -------------------------------------------------------------------
+# JSONL streaming
+# -------------------------------------------------------------------
+
+ENRICHMENT_FIELDS = ["cleaned_merchant", "brand_pred", "industry_t1_pred", "industry_t2_pred"]
+_END_OF_STREAM = object()
+
+def _read_lines(lines, pending: queue.Queue):
+    """Reader thread: feed `lines` into the bounded `pending` queue, then an end marker."""
+    try:
+        for line in lines:
+            pending.put(line)
+    finally:
+        pending.put(_END_OF_STREAM)
+
+def _iter_batches(lines, batch_size: int, max_wait_ms: float):
+    """
+    Group `lines` into lists of at most `batch_size`, cutting a batch
+    short once its first line has waited `max_wait_ms`. Lines are read on
+    a background thread into a queue of a few batches, so a slow consumer
+    applies backpressure instead of buffering the stream.
+    """
+    pending = queue.Queue(maxsize=4 * batch_size)
+    threading.Thread(target=_read_lines, args=(lines, pending), daemon=True).start()
+    max_wait = max_wait_ms / 1000
+    while True:
+        line = pending.get()
+        if line is _END_OF_STREAM:
+            return
+        batch = [line]
+        deadline = time.monotonic() + max_wait
+        while len(batch) < batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                line = pending.get(timeout=remaining) if remaining > 0 else pending.get_nowait()
+            except queue.Empty:
+                break
+            if line is _END_OF_STREAM:
+                yield batch
+                return
+            batch.append(line)
+        yield batch
+
+def _jsonl_record_error(record) -> str | None:
+    if not isinstance(record, dict):
+        return "Each line must be a JSON object"
+    if not isinstance(record.get("RAW_MERCHANT"), str | None):
+        return "RAW_MERCHANT must be a string or null"
+    if not isinstance(record.get("MCC_CODE"), str | int | float | None):
+        return "MCC_CODE must be a number, a string or null"
+    return None
+
+def enrich_jsonl_batch(
+    lines: list[str],
+    cache: PredictionCache | None = None,
+    matcher: BrandMatcher | None = None,
+    metrics: PipelineMetrics | None = None,
+) -> list[str]:
+    """
+    Enrich JSONL transaction lines (objects with RAW_MERCHANT and MCC_CODE)
+    with one vectorized pipeline run. Returns one JSON line per input
+    line: the record with the enrichment fields appended, or
+    {"error": ...} for a line that is not a JSON object or whose
+    RAW_MERCHANT is not a string or MCC_CODE not a number or string.
+    """
+    records = []
+    errors = {}  # line number -> message
+    for line in lines:
+        try:
+            record = json.loads(line)
+            error = _jsonl_record_error(record)
+        except ValueError as exc:
+            error = f"Invalid JSON: {exc}"
+        if error is not None:
+            errors[len(records)] = error
+            record = {}
+        records.append(record)
+
+    frame = pd.DataFrame({
+        "RAW_MERCHANT": pd.Series([record.get("RAW_MERCHANT") for record in records], dtype=object),
+        "MCC_CODE": pd.Series([record.get("MCC_CODE") for record in records], dtype=object),
+    })
+    enriched = categorize_transactions(frame, cache=cache, matcher=matcher, metrics=metrics, copy=False)
+    columns = [enriched[field].astype(object).tolist() for field in ENRICHMENT_FIELDS]
+
+    output = []
+    for number, record in enumerate(records):
+        if number in errors:
+            output.append(json.dumps({"error": errors[number]}))
+            continue
+        for field, values in zip(ENRICHMENT_FIELDS, columns):
+            # NaN (unmapped industry) becomes null
+            record[field] = None if pd.isna(values[number]) else values[number]
+        output.append(json.dumps(record, ensure_ascii=False))
+    return output
+
+def enrich_jsonl_stream(
+    lines,
+    output,
+    batch_size: int = STREAM_BATCH_SIZE,
+    max_wait_ms: float = STREAM_MAX_WAIT_MS,
+    cache: PredictionCache | None = None,
+    matcher: BrandMatcher | None = None,
+    metrics: PipelineMetrics | None = None,
+) -> int:
+    """
+    Enrich a (possibly unbounded) stream of JSONL transactions from `lines`
+    to the text stream `output`, in input order.
+
+    Records are scored in batches of at most `batch_size`, closed early
+    once the oldest record has waited `max_wait_ms`, and `output` is flushed
+    after every batch, so latency stays low on a trickle and memory stays
+    bounded on a firehose. Blank lines are skipped. Returns the number of
+    records written.
+    """
+    metrics = metrics or NULL_METRICS
+    written = 0
+    for batch in _iter_batches(lines, batch_size, max_wait_ms):
+        batch = [line for line in batch if line.strip()]
+        if not batch:
+            continue
+        metrics.add("stream_batches", 1)
+        enriched = enrich_jsonl_batch(batch, cache, matcher, metrics)
+        with metrics.stage("write", rows=len(enriched)):
+            output.write("\n".join(enriched) + "\n")
+            output.flush()
+        written += len(enriched)
+    return written
+
 # -------------------------------------------------------------------
 # CLI entrypoint
 # -------------------------------------------------------------------
 
-def main(input_path: str, output_path: str):
+def main(
+    input_path: str,
+    output_path: str,
+    chunksize: int | None = None,
+    workers: int = 1,
+    blas_threads: int | None = None,
+    cache_path: str | None = None,
+    use_dictionary: bool = False,
+    model_path: str | None = None,
+    file_format: str | None = None,
+    metrics_path: str | None = None,
+    profile_path: str | None = None,
+    incremental: bool = False,
+    state_path: str | None = None,
+    compact_output: bool = False,
+    output_layout: str = "files",
+    prefetch: int = PREFETCH_FILES,
+):
+    """
+    Enrich `input_path` into `output_path`. When `input_path` is a directory
+    or glob pattern, every matching file is enriched into the directory
+    `output_path` (see enrich_files); failed files are listed in its
+    report and end the run with SystemExit once the others are written.
+    """
     input_file = Path(input_path)
     output_file = Path(output_path)
     output_file.parent.mkdir(parents=True, exist_ok=True)
+    failed = []
+    if model_path:
+        set_model_path(model_path)
+    metrics = PipelineMetrics() if metrics_path else NULL_METRICS
+    profiler = cProfile.Profile() if profile_path else None
+    if profiler is not None:
+        profiler.enable()
 
-    print(f"Loading raw transactions from: {input_file}")
-    df = pd.read_csv(input_file)
+    with metrics.stage("model_load"):
+        load_brand_model()
+    cache = open_prediction_cache(cache_path) if cache_path else None
+    matcher = load_brand_matcher() if use_dictionary else None
 
-    print("Running categorization pipeline...")
-    enriched_df = categorize_transactions(df)
+    if is_file_pattern(input_path):
+        input_files = list_transaction_files(input_path, file_format)
+        if not input_files:
+            raise SystemExit(f"No transaction files match {input_path}")
+        try:
+            multi_file_output_paths(input_files, output_file, output_layout, file_format)
+        except ValueError as error:
+            raise SystemExit(str(error)) from None
+        output_file.mkdir(parents=True, exist_ok=True)
+        print(f"Enriching {len(input_files):,} files from: {input_path} (prefetching {prefetch} ahead)")
+        print(f"Writing enriched data to: {output_file}/ ({output_layout} layout)")
+        start = time.perf_counter()
+        reports = enrich_files(
+            input_files, output_file, output_layout, prefetch, cache, matcher, file_format, metrics, compact_output
+        )
+        elapsed = time.perf_counter() - start
+        failed = [report for report in reports if report["error"]]
+        rows = sum(report["rows"] for report in reports if not report["error"])
+        summary = {"files": len(reports), "failed": len(failed), "rows": rows, "seconds": elapsed,
+                   "rows_per_sec": rows / elapsed if elapsed > 0 else None, "reports": reports}
+        (output_file / REPORT_NAME).write_text(json.dumps(summary, indent=2))
+        print(f"{len(reports) - len(failed):,} of {len(reports):,} files enriched: {rows:,} rows in {elapsed:.2f}s "
+              f"({summary['rows_per_sec'] or 0:,.0f} rows/sec); report written to {output_file / REPORT_NAME}")
+        preview = pd.DataFrame(reports, columns=["input", "rows", "rows_per_sec", "error"])
+    elif incremental:
+        chunksize = chunksize or PARALLEL_CHUNKSIZE
+        state = EnrichmentState(state_path or STATE_PATH, model_fingerprint(MODEL_PATH))
+        print(f"Incrementally enriching new or stale transactions from: {input_file} ({chunksize:,} rows per chunk)")
+        print(f"Writing enriched data to: {output_file}")
+        try:
+            preview = enrich_file_incrementally(
+                input_file, output_file, state, chunksize, workers, blas_threads, cache, matcher, file_format,
+                file_format, metrics, compact_output,
+            )
+            stats = state.stats()
+        finally:
+            state.close()
+        print(f"Enrichment state: {stats['current_model']:,} of {stats['enriched']:,} TXN_IDs enriched "
+              f"with the current model")
+    elif chunksize:
+        print(f"Streaming raw transactions from: {input_file} ({chunksize:,} rows per chunk)")
+        print(f"Writing enriched data to: {output_file}")
+        preview = enrich_file_in_chunks(
+            input_file, output_file, chunksize, workers, blas_threads, cache, matcher, file_format, file_format,
+            metrics, compact_output,
+        )
+    else:
+        print(f"Loading raw transactions from: {input_file}")
+        with metrics.stage("read"):
+            df = read_transactions(input_file, file_format)
 
-    print(f"Saving enriched data to: {output_file}")
-    enriched_df.to_csv(output_file, index=False)
+        if workers > 1:
+            print(f"Running categorization pipeline on {workers} worker processes...")
+            enriched_df = categorize_transactions_parallel(
+                df, workers, blas_threads=blas_threads, cache=cache, matcher=matcher, metrics=metrics,
+                compact_output=compact_output,
+            )
+        else:
+            print("Running categorization pipeline...")
+            enriched_df = categorize_transactions(
+                df, cache=cache, matcher=matcher, metrics=metrics,
+                compact_output=compact_output, copy=not compact_output,
+            )
+        del df  # only the enriched frame is needed while writing
+
+        print(f"Saving enriched data to: {output_file}")
+        with metrics.stage("write", rows=len(enriched_df)), TransactionWriter(output_file, file_format) as writer:
+            writer.write(enriched_df)
+        preview = enriched_df.head(10)
+
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(profile_path)
+        print(f"cProfile stats written to: {profile_path}")
+    if metrics.enabled:
+        metrics.write_json(metrics_path)
+        print(f"Pipeline metrics written to: {metrics_path}")
 
     print("Categorization complete.")
-    print(enriched_df.head(10))
+    _print_cache_stats(cache)
+    print(preview)
+    if failed:
+        raise SystemExit(f"{len(failed):,} input files failed: {', '.join(report['input'] for report in failed)}")
+
+def stream_main(
+    batch_size: int = STREAM_BATCH_SIZE,
+    max_wait_ms: float = STREAM_MAX_WAIT_MS,
+    cache_path: str | None = None,
+    use_dictionary: bool = False,
+    model_path: str | None = None,
+    metrics_path: str | None = None,
+):
+    """Enrich JSONL from stdin to stdout; stdout carries only records, progress goes to stderr."""
+    if model_path:
+        set_model_path(model_path)
+    timings = warm_up()
+    if timings is None:
+        raise SystemExit("A trained model is required; run `uv run python -m scripts.train_brand_classifier` first.")
+    metrics = PipelineMetrics() if metrics_path else NULL_METRICS
+    cache = open_prediction_cache(cache_path) if cache_path else None
+    matcher = load_brand_matcher() if use_dictionary else None
+    print(f"Streaming JSONL from stdin (batches of up to {batch_size} records or {max_wait_ms:g} ms)", file=sys.stderr)
+
+    try:
+        written = enrich_jsonl_stream(sys.stdin, sys.stdout, batch_size, max_wait_ms, cache, matcher, metrics)
+    except BrokenPipeError:
+        # The consumer went away; silence the final flush of stdout at exit
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        raise SystemExit(1)
+    if metrics.enabled:
+        metrics.write_json(metrics_path)
+    print(f"Enriched {written:,} streamed transactions.", file=sys.stderr)
+    _print_cache_stats(cache, file=sys.stderr)
+
+def _print_cache_stats(cache: PredictionCache | None, file=None):
+    if cache is None:
+        return
+    stats = cache.stats()
+    print(
+        f"Prediction cache: {stats['hits']:,} hits, {stats['misses']:,} misses "
+        f"({stats['hit_rate']:.1%} hit rate, {stats['entries']:,} entries)",
+        file=file,
+    )
+    cache.close()
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Enrich raw transactions with brand and industry")
-    parser.add_argument("--input", required=True, help="Path to input raw transactions CSV")
-    parser.add_argument("--output", required=True, help="Path to output enriched CSV")
+    parser.add_argument(
+        "--input", default=None,
+        help="Path to input raw transactions (CSV, Parquet or Arrow IPC), or a directory or quoted glob of such files"
+    )
+    parser.add_argument(
+        "--output", default=None,
+        help="Path to output enriched file (CSV, Parquet or Arrow IPC); a directory for directory/glob input"
+    )
+    parser.add_argument(
+        "--output-layout", choices=OUTPUT_LAYOUTS, default="files",
+        help="For directory/glob input: one output file per input ('files') or a dataset partitioned by "
+             "source file ('partitioned', Parquet unless --format is given)"
+    )
+    parser.add_argument(
+        "--prefetch", type=int, default=PREFETCH_FILES,
+        help=f"For directory/glob input: files read ahead while the current one is enriched "
+             f"(default: {PREFETCH_FILES})"
+    )
+    parser.add_argument(
+        "--format", choices=FORMATS, default=None,
+        help="File format for input and output (default: inferred from each file extension)"
+    )
+    parser.add_argument(
+        "--chunksize", type=int, default=None,
+        help="Stream the input in chunks of this many rows to bound memory (default: load all at once)"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="Number of worker processes used for enrichment (default: 1)"
+    )
+    parser.add_argument(
+        "--blas-threads", type=int, default=None,
+        help="Cap on BLAS/OpenMP threads per worker (default: 1 when --workers > 1)"
+    )
+    parser.add_argument(
+        "--model", default=None,
+        help=f"Model artifact: a joblib pipeline or a compact model directory (default: {MODEL_PATH})"
+    )
+    parser.add_argument(
+        "--cascade", action="store_true",
+        help=f"Use the cascade model ({CASCADE_MODEL_PATH}, from `train_brand_classifier --cascade`): a fast "
+             f"linear scorer, escalating only ambiguous rows to the calibrated ensemble"
+    )
+    parser.add_argument(
+        "--cache", default=str(CACHE_PATH),
+        help=f"Path to the on-disk prediction cache (default: {CACHE_PATH})"
+    )
+    parser.add_argument("--no-cache", action="store_true", help="Disable the on-disk prediction cache")
+    parser.add_argument(
+        "--dictionary", action="store_true",
+        help="Resolve merchants that exactly/closely match a known brand without running the model"
+    )
+    parser.add_argument(
+        "--metrics-out", default=None,
+        help="Write per-stage timings and counters (rows, cache hits, ...) to this JSON file"
+    )
+    parser.add_argument("--profile-out", default=None, help="Write cProfile stats for the whole run to this file")
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="Only enrich TXN_IDs not yet enriched by the current model, checkpointing each chunk so an "
+             "interrupted run resumes where it stopped"
+    )
+    parser.add_argument(
+        "--state", default=str(STATE_PATH),
+        help=f"Path to the incremental enrichment state (default: {STATE_PATH})"
+    )
+    parser.add_argument(
+        "--compact-output", action="store_true",
+        help="Enrich into compact dtypes (categorical brand/industry, Arrow strings) without intermediate "
+             "frame copies, to cut peak memory"
+    )
+    parser.add_argument(
+        "--stream", action="store_true",
+        help="Read JSONL transactions from stdin and write enriched JSONL to stdout, batch by batch"
+    )
+    parser.add_argument(
+        "--stream-batch-size", type=int, default=STREAM_BATCH_SIZE,
+        help=f"Most records enriched per streamed batch (default: {STREAM_BATCH_SIZE})"
+    )
+    parser.add_argument(
+        "--stream-max-wait-ms", type=float, default=STREAM_MAX_WAIT_MS,
+        help=f"Longest a streamed record waits for its batch to fill (default: {STREAM_MAX_WAIT_MS:g})"
+    )
+    parser.add_argument(
+        "--warm-up", action="store_true",
+        help="Load the model and run a dummy prediction first, reporting both latencies "
+             "(without --input/--output, only warm up, e.g. to compile the taxonomy cache before traffic)"
+    )
     args = parser.parse_args()
-    main(args.input, args.output)
+    if args.cascade and args.model is None:
+        args.model = str(CASCADE_MODEL_PATH)
+    if args.stream:
+        if args.input is not None or args.output is not None:
+            parser.error("--stream reads stdin and writes stdout; drop --input/--output")
+        stream_main(
+            args.stream_batch_size,
+            args.stream_max_wait_ms,
+            cache_path=None if args.no_cache else args.cache,
+            use_dictionary=args.dictionary,
+            model_path=args.model,
+            metrics_path=args.metrics_out,
+        )
+        raise SystemExit(0)
+    warm_up_only = args.warm_up and args.input is None and args.output is None
+    if not warm_up_only and (args.input is None or args.output is None):
+        parser.error("--input and --output are required (unless only warming up with --warm-up)")
+    if args.input is not None and is_file_pattern(args.input):
+        if args.incremental or args.chunksize or args.workers > 1:
+            parser.error("directory/glob input enriches whole files in one process; drop "
+                         "--incremental/--chunksize/--workers")
+        if args.prefetch < 1:
+            parser.error("--prefetch must be at least 1")
+    if args.warm_up:
+        if args.model:
+            set_model_path(args.model)
+        timings = warm_up()
+        if timings is None:
+            raise SystemExit("A trained model is required; run `uv run python -m scripts.train_brand_classifier` first.")
+        print(f"Warm-up: model loaded in {timings['model_load'] * 1000:.0f} ms, "
+              f"first prediction in {timings['first_prediction'] * 1000:.0f} ms")
+        if warm_up_only:
+            raise SystemExit(0)
+    blas_threads = args.blas_threads
+    if blas_threads is None and args.workers > 1:
+        blas_threads = 1
+    main(
+        args.input,
+        args.output,
+        chunksize=args.chunksize,
+        workers=args.workers,
+        blas_threads=blas_threads,
+        cache_path=None if args.no_cache else args.cache,
+        use_dictionary=args.dictionary,
+        model_path=args.model,
+        file_format=args.format,
+        metrics_path=args.metrics_out,
+        profile_path=args.profile_out,
+        incremental=args.incremental,
+        state_path=args.state,
+        compact_output=args.compact_output,
+        output_layout=args.output_layout,
+        prefetch=args.prefetch,
+    )
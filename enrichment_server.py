@@ -0,0 +1,287 @@
+"""
+enrichment_server.py
+---------------------------
+Low-latency local enrichment service.
+
+A small asyncio HTTP/1.1 server (TCP or Unix socket, no external services)
+that keeps the brand model loaded and answers:
+
+- POST /enrich       {"merchant": ..., "mcc": ..., "txn_id": ...}
+- POST /enrich/bulk  {"transactions": [{...}, ...]}
+- GET  /metrics      latency histograms and batch statistics
+- GET  /health
+
+Unexpected errors while handling a request are logged and answered with
+a 500 JSON body, after which the connection is closed.
+
+Concurrent /enrich requests are coalesced by a MicroBatcher, so each
+micro-batch costs one vectorized predict_proba call. Bulk requests are
+scored as a single batch on the same worker thread.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from categorize_transactions import predict_top_k_batch, set_model_path, warm_up
+from src.brand_matcher import clean_merchant_names
+from src.industry_classifier import classify_industry_frame
+from src.metrics import LatencyHistogram
+from src.micro_batcher import MicroBatcher
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_TOP_K = 3
+MAX_BATCH_SIZE = 64
+MAX_WAIT_MS = 2.0
+MAX_BULK_RECORDS = 100_000
+MAX_BODY_BYTES = 64 * 1024 * 1024
+
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------------------------
+# Batch enrichment
+# -------------------------------------------------------------------
+
+def enrich_records(records: list[dict], k: int = DEFAULT_TOP_K) -> list[dict]:
+    """
+    Enrich transaction records ({"merchant", "mcc", optional "txn_id"})
+    with brand, confidence, top-k brands and industry tiers.
+
+    Distinct cleaned merchants are scored with a single predict_proba call.
+    """
+    merchants = [record.get("merchant") for record in records]
+    cleaned = clean_merchant_names(merchants)
+    _, confidences, labels = predict_top_k_batch(merchants, k)
+    brands = labels[:, 0] if labels.shape[1] else np.full(len(records), None, dtype=object)
+    industries = classify_industry_frame(brands, pd.Series([record.get("mcc") for record in records], dtype=object))
+    # Unclassified rows are NaN in the frame; JSON clients get null
+    industry_t1 = industries["industry_t1_pred"].astype(object).where(industries["industry_t1_pred"].notna(), None)
+    industry_t2 = industries["industry_t2_pred"].astype(object).where(industries["industry_t2_pred"].notna(), None)
+
+    results = []
+    for row, record in enumerate(records):
+        top = [
+            {"brand": brand, "confidence": float(confidence)}
+            for brand, confidence in zip(labels[row], confidences[row])
+            if brand is not None
+        ]
+        result = {
+            "merchant": record.get("merchant"),
+            "cleaned_merchant": cleaned.iat[row],
+            "brand": brands[row],
+            "confidence": top[0]["confidence"] if top else None,
+            "top_k": top,
+            "industry_t1": industry_t1.iat[row],
+            "industry_t2": industry_t2.iat[row],
+        }
+        if "txn_id" in record:
+            result = {"txn_id": record["txn_id"], **result}
+        results.append(result)
+    return results
+
+# -------------------------------------------------------------------
+# HTTP server
+# -------------------------------------------------------------------
+
+class RequestError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+def _parse_json(body: bytes):
+    try:
+        return json.loads(body or b"null")
+    except ValueError as exc:
+        raise RequestError(400, f"Invalid JSON body: {exc}") from None
+
+def _validate_record(record, where: str = "") -> dict:
+    """Reject a record before it joins a micro-batch, where a bad value would fail every request in it."""
+    if not isinstance(record, dict) or "merchant" not in record:
+        raise RequestError(400, f"{where}Each transaction must be an object with a 'merchant' field")
+    if not isinstance(record["merchant"], str | None):
+        raise RequestError(400, f"{where}'merchant' must be a string or null")
+    if not isinstance(record.get("mcc"), str | int | float | None):
+        raise RequestError(400, f"{where}'mcc' must be a number, a string or null")
+    return record
+
+class EnrichmentServer:
+    """Warm-model enrichment service with micro-batched single-transaction requests."""
+
+    def __init__(
+        self,
+        max_batch_size: int = MAX_BATCH_SIZE,
+        max_wait_ms: float = MAX_WAIT_MS,
+        top_k: int = DEFAULT_TOP_K,
+    ):
+        self.top_k = top_k
+        self.latency = {"enrich": LatencyHistogram(), "enrich_bulk": LatencyHistogram(), "batch": LatencyHistogram()}
+        self.batches = 0
+        self.batched_records = 0
+        self.batcher = MicroBatcher(self._score, max_batch_size, max_wait_ms, on_batch=self._record_batch)
+
+    def _score(self, records):
+        return enrich_records(records, self.top_k)
+
+    def _record_batch(self, size: int, seconds: float):
+        self.batches += 1
+        self.batched_records += size
+        self.latency["batch"].observe(seconds)
+
+    def metrics(self) -> dict:
+        return {
+            "latency_ms": {name: histogram.as_dict() for name, histogram in self.latency.items()},
+            "batches": self.batches,
+            "mean_batch_size": self.batched_records / self.batches if self.batches else None,
+            "max_batch_size": self.batcher.max_batch_size,
+            "max_wait_ms": self.batcher.max_wait * 1000,
+        }
+
+    async def route(self, method: str, path: str, body: bytes):
+        """Dispatch one request; returns (status, JSON-serializable payload)."""
+        if path in ("/health", "/metrics"):
+            if method != "GET":
+                raise RequestError(405, f"{path} only accepts GET")
+            return (200, {"status": "ok"}) if path == "/health" else (200, self.metrics())
+        if path not in ("/enrich", "/enrich/bulk"):
+            raise RequestError(404, f"No route for {path}")
+        if method != "POST":
+            raise RequestError(405, f"{path} only accepts POST")
+
+        start = time.perf_counter()
+        payload = _parse_json(body)
+        if path == "/enrich":
+            result = await self.batcher.submit(_validate_record(payload))
+            self.latency["enrich"].observe(time.perf_counter() - start)
+            return 200, result
+
+        transactions = payload.get("transactions") if isinstance(payload, dict) else None
+        if not isinstance(transactions, list):
+            raise RequestError(400, "Bulk requests need a 'transactions' list")
+        if len(transactions) > MAX_BULK_RECORDS:
+            raise RequestError(413, f"At most {MAX_BULK_RECORDS:,} transactions per bulk request")
+        records = [_validate_record(record, f"transactions[{index}]: ") for index, record in enumerate(transactions)]
+        results = await self.batcher.run(records) if records else []
+        self.latency["enrich_bulk"].observe(time.perf_counter() - start)
+        return 200, {"results": results}
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve HTTP/1.1 requests on one connection, honouring keep-alive."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                keep_alive = True
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                    headers = {}
+                    while True:
+                        line = await reader.readline()
+                        if line in (b"\r\n", b"\n", b""):
+                            break
+                        name, _, value = line.decode("latin-1").partition(":")
+                        headers[name.strip().lower()] = value.strip()
+                    keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                    length = int(headers.get("content-length", 0))
+                    if length > MAX_BODY_BYTES:
+                        keep_alive = False
+                        raise RequestError(413, "Request body too large")
+                    body = await reader.readexactly(length)
+                except RequestError as exc:
+                    status, payload = exc.status, {"error": str(exc)}
+                except ValueError:
+                    status, payload, keep_alive = 400, {"error": "Malformed HTTP request"}, False
+                else:
+                    try:
+                        status, payload = await self.route(method, target.split("?", 1)[0], body)
+                    except RequestError as exc:
+                        status, payload = exc.status, {"error": str(exc)}
+                    except Exception:
+                        logger.exception("Unhandled error serving %s %s", method, target)
+                        status, payload, keep_alive = 500, {"error": "Internal server error"}, False
+
+                data = json.dumps(payload, default=_json_default).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, unix_socket: str | None = None):
+        """Start listening; returns the asyncio Server."""
+        if unix_socket:
+            return await asyncio.start_unix_server(self.handle_connection, path=unix_socket)
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+# -------------------------------------------------------------------
+# CLI entrypoint
+# -------------------------------------------------------------------
+
+async def serve(server: EnrichmentServer, host: str, port: int, unix_socket: str | None):
+    listener = await server.start(host, port, unix_socket)
+    print(f"Enrichment service listening on {unix_socket or f'http://{host}:{port}'}")
+    async with listener:
+        await listener.serve_forever()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve brand/industry enrichment over local HTTP")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"Interface to bind (default: {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"TCP port (default: {DEFAULT_PORT})")
+    parser.add_argument("--unix-socket", default=None, help="Listen on this Unix socket path instead of TCP")
+    parser.add_argument("--model", default=None, help="Path to the brand model artifact")
+    parser.add_argument(
+        "--max-batch-size", type=int, default=MAX_BATCH_SIZE,
+        help=f"Most single requests scored together (default: {MAX_BATCH_SIZE})"
+    )
+    parser.add_argument(
+        "--max-wait-ms", type=float, default=MAX_WAIT_MS,
+        help=f"Longest a request waits for its batch to fill (default: {MAX_WAIT_MS})"
+    )
+    parser.add_argument("--top-k", type=int, default=DEFAULT_TOP_K, help="Brands returned per transaction")
+    args = parser.parse_args()
+
+    if args.model:
+        set_model_path(args.model)
+    # Load the model and score a throwaway batch so the first real request does not pay for lazy initialization
+    timings = warm_up()
+    if timings is None:
+        sys.exit("A trained model is required; run `uv run python -m scripts.train_brand_classifier` first.")
+    enrich_records([{"merchant": "warm up", "mcc": None}], args.top_k)
+    print(f"Warm-up: model loaded in {timings['model_load'] * 1000:.0f} ms, "
+          f"first prediction in {timings['first_prediction'] * 1000:.0f} ms")
+
+    enrichment_server = EnrichmentServer(args.max_batch_size, args.max_wait_ms, args.top_k)
+    try:
+        asyncio.run(serve(enrichment_server, args.host, args.port, args.unix_socket))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        enrichment_server.batcher.close()
@@ -2,16 +2,26 @@
 generate_synthetic_data_with_labels.py
 -------------------------
 Generate synthetic transaction data with brand labels for training.
+
+With `--rows N` the script instead streams N load-test transactions in
+vectorized chunks: a catalog of `--cardinality` merchant strings is built
+once from precomputed Faker pools, rows draw merchants from it with a
+Zipf popularity skew (`--zipf`), and amounts, timestamps and locations
+come from NumPy. Chunks are written incrementally as CSV, Parquet or
+Arrow IPC; output is deterministic for a given seed and chunk size.
 """
 
+import argparse
 import random
 from datetime import datetime
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 from faker import Faker
 
-from src.brand_matcher import clean_merchant_name
+from src.brand_matcher import clean_merchant_names
+from src.transaction_io import FORMATS, TransactionWriter
 
 fake = Faker()
 
@@ -50,12 +60,8 @@ def generate_other_examples(n=3000, seed=42):
     random.seed(seed)
     Faker.seed(seed)
 
-    others = []
-    for _ in range(n):
-        noise = fake.company()[:15]  # trim long names
-        cleaned = clean_merchant_name(noise)
-        others.append({"cleaned": cleaned, "BRAND": "Other"})
-    return pd.DataFrame(others)
+    noise = [fake.company()[:15] for _ in range(n)]  # trim long names
+    return pd.DataFrame({"cleaned": clean_merchant_names(noise), "BRAND": "Other"})
 
 def generate_raw_merchant(brand_name: str) -> str:
     """
@@ -105,16 +111,166 @@ def generate_datasets(n: int = 5000, seed: int = 42):
 
     # Training dataset: cleaned merchant + brand label
     df_train = pd.DataFrame({
-        "cleaned": df_full["RAW_MERCHANT"].apply(clean_merchant_name),
+        "cleaned": clean_merchant_names(df_full["RAW_MERCHANT"]),
         "BRAND": df_full["BRAND"]
     })
 
     return df_raw, df_train
 
+# -------------------------------------------------------------------
+# Vectorized high-volume generation
+# -------------------------------------------------------------------
+LOADTEST_CHUNKSIZE = 1_000_000
+LOADTEST_CARDINALITY = 50_000
+LOADTEST_ZIPF = 1.1  # popularity exponent; 0 draws merchants uniformly
+LOADTEST_OTHER_SHARE = 0.2  # share of catalog merchants that are not known brands
+LOADTEST_END_DATE = "2025-06-30"  # fixed so output does not depend on the current date
+FAKER_POOL_SIZE = 2_000
+OTHER_MCCS = [5311, 5399, 5812, 5999, 7011, 4111, 5411, 5541]
+MERCHANT_SUFFIXES = np.array(["Mall", "TST", "HQ"], dtype=object)
+N_PATTERNS = 5  # the generate_raw_merchant() patterns
+
+def _brand_merchant(pattern: int, brand: str, number: int, city: str, suffix: str) -> str:
+    """generate_raw_merchant() with its random draws passed in."""
+    if pattern == 0:
+        return f"{brand.upper()} #{number}"
+    if pattern == 1:
+        return f"{brand} {city}"
+    if pattern == 2:
+        return f"{brand[:4]}*{brand[4:]}"
+    if pattern == 3:
+        return f"{brand.upper()}-{suffix}"
+    return brand.upper()
+
+def build_merchant_catalog(
+    cardinality: int = LOADTEST_CARDINALITY,
+    seed: int = 42,
+    other_share: float = LOADTEST_OTHER_SHARE,
+) -> pd.DataFrame:
+    """
+    `cardinality` merchant entries (RAW_MERCHANT, MCC_CODE, BRAND, cleaned)
+    in popularity order: row 0 is the most frequent under a Zipf draw.
+
+    Brand merchants follow the generate_raw_merchant() patterns; the
+    `other_share` rest are Faker company names labeled "Other". Some
+    patterns repeat, so the number of distinct strings can be lower.
+    """
+    rng = np.random.default_rng([seed, 0])
+    fake_pool = Faker()
+    fake_pool.seed_instance(seed)
+    cities = np.array([fake_pool.city() for _ in range(FAKER_POOL_SIZE)], dtype=object)
+    companies = np.array([fake_pool.company()[:15] for _ in range(FAKER_POOL_SIZE)], dtype=object)
+
+    brand_names = np.array([info["brand"] for info in BRANDS] + ["Other"], dtype=object)
+    brand_mccs = np.array([info["mcc"] for info in BRANDS], dtype=np.int32)
+
+    is_other = rng.random(cardinality) < other_share
+    brand_idx = np.where(is_other, len(BRANDS), rng.integers(0, len(BRANDS), cardinality))
+    patterns = rng.integers(0, N_PATTERNS, cardinality)
+    numbers = rng.integers(1, 1000, cardinality)
+    city_idx = rng.integers(0, len(cities), cardinality)
+    suffix_idx = rng.integers(0, len(MERCHANT_SUFFIXES), cardinality)
+    company_idx = rng.integers(0, len(companies), cardinality)
+
+    merchants = [
+        (f"{companies[c]} #{n}" if p < 2 else companies[c]) if b == len(BRANDS)
+        else _brand_merchant(p, brand_names[b], n, cities[ci], MERCHANT_SUFFIXES[s])
+        for b, p, n, ci, s, c in zip(brand_idx, patterns, numbers, city_idx, suffix_idx, company_idx)
+    ]
+    mccs = np.where(
+        is_other,
+        np.asarray(OTHER_MCCS, dtype=np.int32)[rng.integers(0, len(OTHER_MCCS), cardinality)],
+        brand_mccs[np.minimum(brand_idx, len(BRANDS) - 1)],
+    )
+    catalog = pd.DataFrame({
+        "RAW_MERCHANT": pd.Series(merchants, dtype=object),
+        "MCC_CODE": mccs,
+        "BRAND": brand_names[brand_idx],
+    })
+    catalog["cleaned"] = clean_merchant_names(catalog["RAW_MERCHANT"])
+    return catalog
+
+def zipf_cdf(cardinality: int, skew: float = LOADTEST_ZIPF) -> np.ndarray:
+    """Cumulative Zipf(skew) probabilities over ranks 1..cardinality."""
+    weights = np.arange(1, cardinality + 1, dtype=np.float64) ** -skew
+    cdf = np.cumsum(weights)
+    return cdf / cdf[-1]
+
+def generate_transaction_chunks(
+    n_rows: int,
+    chunksize: int = LOADTEST_CHUNKSIZE,
+    seed: int = 42,
+    cardinality: int = LOADTEST_CARDINALITY,
+    skew: float = LOADTEST_ZIPF,
+    other_share: float = LOADTEST_OTHER_SHARE,
+    end_date: str = LOADTEST_END_DATE,
+):
+    """
+    Yield (df_raw, df_train) chunk pairs for `n_rows` synthetic transactions,
+    like generate_datasets() but vectorized and in bounded memory.
+
+    Each chunk has its own seeded generator, so output is reproducible for
+    a given seed and chunksize.
+    """
+    catalog = build_merchant_catalog(cardinality, seed, other_share)
+    cdf = zipf_cdf(cardinality, skew)
+    merchants = catalog["RAW_MERCHANT"].to_numpy()
+    mccs = catalog["MCC_CODE"].to_numpy()
+    labels = catalog["BRAND"].to_numpy()
+    cleaned = catalog["cleaned"].to_numpy()
+    locations = pd.DataFrame(CITY_COUNTRY_CURRENCY)
+    end = np.datetime64(end_date, "s")
+    window = 183 * 24 * 3600  # about six months, as in generate_transaction()
+
+    for chunk_index, start in enumerate(range(0, n_rows, chunksize)):
+        size = min(chunksize, n_rows - start)
+        rng = np.random.default_rng([seed, 1, chunk_index])
+        ids = np.minimum(np.searchsorted(cdf, rng.random(size), side="right"), cardinality - 1)
+        location = rng.integers(0, len(locations), size)
+
+        df_raw = pd.DataFrame({
+            "TXN_ID": np.arange(start + 1, start + size + 1),
+            "RAW_MERCHANT": merchants[ids],
+            "MCC_CODE": mccs[ids],
+            "AMOUNT": np.round(rng.uniform(1, 2000, size), 2),
+            "CURRENCY": locations["currency"].to_numpy()[location],
+            "TIMESTAMP": end - rng.integers(0, window, size).astype("timedelta64[s]"),
+            "CITY": locations["city"].to_numpy()[location],
+            "COUNTRY": locations["country"].to_numpy()[location],
+        })
+        df_train = pd.DataFrame({"cleaned": cleaned[ids], "BRAND": labels[ids]})
+        yield df_raw, df_train
+
+def write_load_test_data(
+    n_rows: int,
+    output_path,
+    labels_path=None,
+    file_format: str | None = None,
+    **options,
+) -> int:
+    """
+    Stream generate_transaction_chunks() to `output_path` (raw rows) and,
+    if given, `labels_path` (cleaned merchant + brand). Returns rows written.
+    """
+    rows = 0
+    with TransactionWriter(output_path, file_format) as raw_writer:
+        label_writer = TransactionWriter(labels_path, file_format) if labels_path else None
+        try:
+            for df_raw, df_train in generate_transaction_chunks(n_rows, **options):
+                raw_writer.write(df_raw)
+                if label_writer is not None:
+                    label_writer.write(df_train)
+                rows += len(df_raw)
+                print(f"  {rows:,} / {n_rows:,} rows written")
+        finally:
+            if label_writer is not None:
+                label_writer.close()
+    return rows
+
 # -------------------------------------------------------------------
 # Main script
 # -------------------------------------------------------------------
-if __name__ == "__main__":
+def main():
     output_dir = Path("data")
     output_dir.mkdir(parents=True, exist_ok=True)
 
@@ -136,3 +292,42 @@ if __name__ == "__main__":
     print(f"Saved brand training data to: {train_path}")
     print("\nSample training data:")
     print(df_train.sample(10, random_state=42))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic transactions with brand labels")
+    parser.add_argument(
+        "--rows", type=int, default=None,
+        help="Stream this many load-test transactions in vectorized chunks instead of the default datasets"
+    )
+    parser.add_argument(
+        "--output", default="data/loadtest_raw_transactions.parquet",
+        help="Load-test output file (CSV, Parquet or Arrow IPC by extension)"
+    )
+    parser.add_argument("--labels-output", default=None, help="Also write (cleaned, BRAND) labels to this file")
+    parser.add_argument("--format", choices=FORMATS, default=None, help="Output format (default: from extension)")
+    parser.add_argument("--chunksize", type=int, default=LOADTEST_CHUNKSIZE, help="Rows generated per chunk")
+    parser.add_argument(
+        "--cardinality", type=int, default=LOADTEST_CARDINALITY,
+        help="Number of merchant strings in the catalog rows are drawn from"
+    )
+    parser.add_argument(
+        "--zipf", type=float, default=LOADTEST_ZIPF,
+        help="Zipf exponent of merchant popularity (0 = uniform)"
+    )
+    parser.add_argument(
+        "--other-share", type=float, default=LOADTEST_OTHER_SHARE,
+        help="Share of catalog merchants that are unknown ('Other')"
+    )
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    args = parser.parse_args()
+
+    if args.rows is None:
+        main()
+    else:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        print(f"Generating {args.rows:,} transactions into: {args.output}")
+        write_load_test_data(
+            args.rows, args.output, args.labels_output, args.format,
+            chunksize=args.chunksize, seed=args.seed, cardinality=args.cardinality,
+            skew=args.zipf, other_share=args.other_share,
+        )
@@ -3,22 +3,66 @@ train_brand_classifier.py
 -------------------------
 Train a brand classification model using character n-gram TF-IDF
 and probability calibration (isotonic) for better confidence scores.
+
+`--incremental` instead streams the training CSV in chunks into a hashing
+vectorizer + SGD model (see src/incremental_model.py); with `--resume` it
+continues from the saved incremental model, e.g. to add newly labeled
+merchants or brands without a full retrain.
+
+`--candidate-index` builds a BrandCandidateIndex (src/candidate_index.py)
+instead: n-gram retrieval over brand aliases plus a small reranker, for
+brand catalogs too large for one multiclass model.
+
+Full retrains fit the TF-IDF vectorizer once, run the calibration folds
+(and the optional `--search` over C) on `--n-jobs` cores, and with
+`--cache-features` reuse the sparse feature matrices saved on disk for
+the same data and vectorizer settings. Per-phase timings are printed.
+With `--cascade` they also save a CascadeBrandModel (src/cascade_model.py)
+over the new model, its maps fitted out of fold on the training split
+(which refits the pipeline once per fold), and report its routing rates and agreement with the full model on the
+hold-out set and on a degraded copy of it (characters dropped and
+truncated, as in short or garbled card descriptors).
 """
 
+import argparse
+import hashlib
+import json
+import time
 from pathlib import Path
 
 import joblib
+import numpy as np
 import pandas as pd
+import scipy.sparse as sp
 from sklearn.calibration import CalibratedClassifierCV
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import classification_report, confusion_matrix
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import GridSearchCV, train_test_split
 from sklearn.pipeline import Pipeline
 
+from src.candidate_index import BrandCandidateIndex
+from src.cascade_model import CascadeBrandModel
+from src.compact_model import CompactBrandModel, export_compact_model
+from src.incremental_model import IncrementalBrandModel
+from src.metrics import PipelineMetrics
+
 DATA_PATH = Path("data/brand_training.csv")
 MODEL_DIR = Path("models")
 MODEL_PATH = MODEL_DIR / "brand_classifier.joblib"
+COMPACT_MODEL_DIR = MODEL_DIR / "brand_classifier_compact"
+INCREMENTAL_MODEL_PATH = MODEL_DIR / "brand_classifier_incremental.joblib"
+CANDIDATE_INDEX_PATH = MODEL_DIR / "brand_candidate_index.joblib"
+CASCADE_MODEL_PATH = MODEL_DIR / "brand_classifier_cascade.joblib"
+INCREMENTAL_CHUNKSIZE = 100_000
+HOLDOUT_FRACTION = 0.1
+FEATURE_CACHE_DIR = MODEL_DIR / "feature_cache"
+
+# Character n-gram vectorizer settings (robust to typos); part of the feature cache key
+VECTORIZER_PARAMS = {"analyzer": "char", "ngram_range": (3, 5)}
+SPLIT_PARAMS = {"test_size": 0.2, "random_state": 42}
+SEARCH_GRID = {"C": [0.3, 1.0, 3.0, 10.0]}
+DEGRADE_DROP_RATE = 0.35  # share of characters dropped from hold-out texts for the degraded cascade check
 
 
 def load_training_data():
@@ -34,36 +78,86 @@ def load_training_data():
     return df
 
 
-def train_model(df: pd.DataFrame):
-    """Train character n-gram TF-IDF + calibrated logistic regression model."""
+def feature_cache_key(df: pd.DataFrame) -> str:
+    """Hash of the training rows plus the vectorizer and split settings."""
+    digest = hashlib.sha256(pd.util.hash_pandas_object(df[["cleaned", "BRAND"]], index=False).to_numpy().tobytes())
+    digest.update(json.dumps([VECTORIZER_PARAMS, SPLIT_PARAMS], sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def featurize(X_train, X_test, cache_dir: Path | None = None):
+    """
+    Fit the TF-IDF vectorizer on `X_train` and transform both splits.
+
+    With `cache_dir`, the fitted vectorizer and both sparse matrices are
+    loaded from there when present and saved there otherwise.
+    """
+    if cache_dir is not None and (cache_dir / "vectorizer.joblib").exists():
+        print(f"Loading cached features from: {cache_dir}")
+        vectorizer = joblib.load(cache_dir / "vectorizer.joblib")
+        return vectorizer, sp.load_npz(cache_dir / "X_train.npz"), sp.load_npz(cache_dir / "X_test.npz")
+
+    vectorizer = TfidfVectorizer(**VECTORIZER_PARAMS)
+    features_train = vectorizer.fit_transform(X_train)
+    features_test = vectorizer.transform(X_test)
+    if cache_dir is not None:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        sp.save_npz(cache_dir / "X_train.npz", features_train)
+        sp.save_npz(cache_dir / "X_test.npz", features_test)
+        # Written last: its presence marks a complete cache entry
+        joblib.dump(vectorizer, cache_dir / "vectorizer.joblib")
+        print(f"Cached features in: {cache_dir}")
+    return vectorizer, features_train, features_test
+
+
+def train_model(df: pd.DataFrame, n_jobs: int | None = None, cache_features: bool = False, search: bool = False):
+    """
+    Train character n-gram TF-IDF + calibrated logistic regression model.
+
+    The vectorizer is fitted once; calibration folds and the optional grid
+    search over C run on `n_jobs` cores. Returns the fitted Pipeline.
+    """
+    metrics = PipelineMetrics()
     X = df["cleaned"].astype(str)
     y = df["BRAND"].astype(str)
 
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, stratify=y, random_state=42
-    )
+    X_train, X_test, y_train, y_test = train_test_split(X, y, stratify=y, **SPLIT_PARAMS)
 
-    # Character n-gram vectorizer (robust to typos)
-    vectorizer = TfidfVectorizer(analyzer="char", ngram_range=(3, 5))
+    cache_dir = FEATURE_CACHE_DIR / feature_cache_key(df) if cache_features else None
+    with metrics.stage("featurize", rows=len(X)):
+        vectorizer, features_train, features_test = featurize(X_train, X_test, cache_dir)
 
     # Base classifier
     base_clf = LogisticRegression(max_iter=1000, multi_class="auto")
 
-    # Probability calibration wrapper (5-fold isotonic)
-    calibrated_clf = CalibratedClassifierCV(base_clf, cv=5, method="isotonic")
+    if search:
+        print(f"Searching {SEARCH_GRID} ...")
+        with metrics.stage("search", rows=len(X_train)):
+            grid = GridSearchCV(base_clf, SEARCH_GRID, cv=3, scoring="neg_log_loss", n_jobs=n_jobs)
+            grid.fit(features_train, y_train)
+        print(f"Best parameters: {grid.best_params_}")
+        base_clf.set_params(**grid.best_params_)
 
-    model = Pipeline([("tfidf", vectorizer), ("calibrated_clf", calibrated_clf)])
+    # Probability calibration wrapper (5-fold isotonic), folds fitted in parallel
+    calibrated_clf = CalibratedClassifierCV(base_clf, cv=5, method="isotonic", n_jobs=n_jobs)
 
     print("Training model...")
-    model.fit(X_train, y_train)
+    with metrics.stage("calibrate", rows=len(X_train)):
+        calibrated_clf.fit(features_train, y_train)
+    model = Pipeline([("tfidf", vectorizer), ("calibrated_clf", calibrated_clf)])
 
     # Evaluate
     print("\nEvaluating model on hold-out set...")
-    y_pred = model.predict(X_test)
+    with metrics.stage("evaluate", rows=len(X_test)):
+        y_pred = calibrated_clf.predict(features_test)
     print(classification_report(y_test, y_pred, zero_division=0))
     print("\nConfusion Matrix:")
     print(confusion_matrix(y_test, y_pred))
 
+    print("\nPhase timings:")
+    for phase, stats in metrics.as_dict()["stages"].items():
+        print(f"  {phase:<10} {stats['wall_seconds']:>9.2f}s wall {stats['cpu_seconds']:>9.2f}s CPU")
+
     return model
 
 
@@ -74,7 +168,188 @@ def save_model(model):
     print(f"\nModel saved to: {MODEL_PATH}")
 
 
+def export_compact(model, sample_texts):
+    """Export the compact inference artifact and check it agrees with the pipeline."""
+    export_compact_model(model, COMPACT_MODEL_DIR)
+    compact = CompactBrandModel.load(COMPACT_MODEL_DIR)
+    max_diff = np.abs(compact.predict_proba(sample_texts) - model.predict_proba(sample_texts)).max()
+    print(f"Compact model exported to: {COMPACT_MODEL_DIR} (max probability difference {max_diff:.2e})")
+
+
+def evaluate_cascade(cascade: CascadeBrandModel, model, texts, labels) -> dict:
+    """Routing rates, accuracy and agreement of `cascade` with the full `model` on labeled `texts`."""
+    texts, labels = list(texts), np.asarray(labels, dtype=object)
+    start = time.perf_counter()
+    full = model.predict_proba(texts)
+    full_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    cascaded, routes = cascade.route(texts)
+    cascade_seconds = time.perf_counter() - start
+
+    classes = np.asarray(model.classes_, dtype=object)
+    full_top, cascade_top = classes[full.argmax(axis=1)], classes[cascaded.argmax(axis=1)]
+    # Brands as the pipeline assigns them: "Other" below the confidence threshold
+    full_brands = np.where(full.max(axis=1) >= cascade.threshold, full_top, "Other")
+    cascade_brands = np.where(cascaded.max(axis=1) >= cascade.threshold, cascade_top, "Other")
+    return {
+        "rows": len(texts),
+        "routing": {stage: rows / max(len(texts), 1) for stage, rows in routes.items()},
+        "full_accuracy": float((full_top == labels).mean()),
+        "cascade_accuracy": float((cascade_top == labels).mean()),
+        "brand_agreement": float((full_brands == cascade_brands).mean()),
+        "full_seconds": full_seconds,
+        "cascade_seconds": cascade_seconds,
+    }
+
+
+def degrade_texts(texts, drop_rate: float = DEGRADE_DROP_RATE, seed: int = 0) -> list[str]:
+    """Deterministically drop characters from each text and keep the first half of what is left."""
+    rng = np.random.default_rng(seed)
+    degraded = []
+    for text in texts:
+        kept = "".join(char for char in text if rng.random() >= drop_rate)
+        degraded.append(kept[:max(3, len(kept) // 2)])
+    return degraded
+
+
+def train_cascade(model, df: pd.DataFrame) -> CascadeBrandModel:
+    """
+    Fit a CascadeBrandModel over `model`, with its maps fitted out of fold
+    on the training split, and check it against `model` on the hold-out
+    set and a degraded copy of it.
+    """
+    X_train, X_test, y_train, y_test = train_test_split(
+        df["cleaned"].astype(str), df["BRAND"].astype(str), stratify=df["BRAND"], **SPLIT_PARAMS
+    )
+    cascade = CascadeBrandModel(model).fit(X_train, y_train)
+
+    for name, texts in [("hold-out", X_test), ("degraded hold-out", degrade_texts(X_test))]:
+        report = evaluate_cascade(cascade, model, texts, y_test)
+        routing = ", ".join(f"{stage} {share:.1%}" for stage, share in report["routing"].items())
+        print(f"\nCascade on {report['rows']:,} {name} rows: {routing}")
+        print(
+            f"  top-1 accuracy {report['cascade_accuracy']:.2%} (full model {report['full_accuracy']:.2%}), "
+            f"assigned brand agrees with the full model on {report['brand_agreement']:.2%}"
+        )
+        print(f"  scored in {report['cascade_seconds']:.3f}s (full model {report['full_seconds']:.3f}s)")
+    return cascade
+
+
+def save_cascade(cascade: CascadeBrandModel):
+    MODEL_DIR.mkdir(parents=True, exist_ok=True)
+    joblib.dump(cascade, CASCADE_MODEL_PATH)
+    print(f"Cascade model saved to: {CASCADE_MODEL_PATH}")
+
+
+def is_holdout(texts: pd.Series, fraction: float) -> np.ndarray:
+    """Deterministic held-out split by hashing merchant text, stable across runs and chunks."""
+    buckets = pd.util.hash_pandas_object(texts, index=False).to_numpy() % 10_000
+    return buckets < fraction * 10_000
+
+
+def train_incremental(
+    data_path: Path = DATA_PATH,
+    chunksize: int = INCREMENTAL_CHUNKSIZE,
+    epochs: int = 1,
+    resume: bool = False,
+    holdout_fraction: float = HOLDOUT_FRACTION,
+    seed: int = 42,
+):
+    """
+    Stream (cleaned, BRAND) rows from `data_path` into an IncrementalBrandModel.
+
+    A hash-selected `holdout_fraction` of rows is never trained on and is
+    used to recalibrate the model once all epochs are done.
+    """
+    if not Path(data_path).exists():
+        raise FileNotFoundError(f"Training data not found at {data_path}.")
+    model = joblib.load(INCREMENTAL_MODEL_PATH) if resume else IncrementalBrandModel(random_state=seed)
+    rng = np.random.default_rng(seed)
+
+    for epoch in range(epochs):
+        for chunk in pd.read_csv(data_path, usecols=["cleaned", "BRAND"], dtype=str, chunksize=chunksize):
+            texts, labels = chunk["cleaned"].fillna(""), chunk["BRAND"].fillna("Other")
+            holdout = is_holdout(texts, holdout_fraction)
+            if epoch == 0:
+                model.add_holdout(texts[holdout].tolist(), labels[holdout].tolist())
+            order = rng.permutation(np.flatnonzero(~holdout))
+            if len(order):
+                model.partial_fit(texts.iloc[order].tolist(), labels.iloc[order].to_numpy())
+        print(f"Epoch {epoch + 1}/{epochs}: {model.rows_seen:,} training rows seen, {len(model.classes_)} brands")
+
+    model.calibrate()
+    if model.holdout_texts:
+        print("\nEvaluating incremental model on held-out rows...")
+        y_pred = model.predict(model.holdout_texts)
+        print(classification_report(model.holdout_labels, y_pred, zero_division=0))
+    return model
+
+
+def save_incremental_model(model):
+    MODEL_DIR.mkdir(parents=True, exist_ok=True)
+    joblib.dump(model, INCREMENTAL_MODEL_PATH)
+    print(f"\nIncremental model saved to: {INCREMENTAL_MODEL_PATH}")
+
+
+def train_candidate_index(df: pd.DataFrame) -> BrandCandidateIndex:
+    """Build a BrandCandidateIndex on the training split and evaluate it on the hold-out set."""
+    X_train, X_test, y_train, y_test = train_test_split(
+        df["cleaned"].astype(str), df["BRAND"].astype(str), stratify=df["BRAND"], **SPLIT_PARAMS
+    )
+    index = BrandCandidateIndex().fit(X_train, y_train)
+    print(f"Indexed {len(index.alias_texts):,} aliases of {len(index.classes_) - 1:,} brands")
+
+    print("\nEvaluating candidate index on hold-out set...")
+    print(classification_report(y_test, index.predict(X_test), zero_division=0))
+    return index
+
+
+def save_candidate_index(index: BrandCandidateIndex):
+    MODEL_DIR.mkdir(parents=True, exist_ok=True)
+    joblib.dump(index, CANDIDATE_INDEX_PATH)
+    print(f"\nCandidate index saved to: {CANDIDATE_INDEX_PATH}")
+
+
 if __name__ == "__main__":
-    df = load_training_data()
-    model = train_model(df)
-    save_model(model)
+    parser = argparse.ArgumentParser(description="Train the brand classifier")
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="Stream the data into a hashing + SGD model instead of a full TF-IDF retrain"
+    )
+    parser.add_argument("--resume", action="store_true", help="Continue training the saved incremental model")
+    parser.add_argument("--data", default=str(DATA_PATH), help=f"Labeled training CSV (default: {DATA_PATH})")
+    parser.add_argument("--chunksize", type=int, default=INCREMENTAL_CHUNKSIZE, help="Rows per partial_fit chunk")
+    parser.add_argument("--epochs", type=int, default=1, help="Passes over the data in incremental mode")
+    parser.add_argument(
+        "--n-jobs", type=int, default=-1,
+        help="Cores for calibration folds and grid search (default: all)"
+    )
+    parser.add_argument(
+        "--cache-features", action="store_true",
+        help=f"Reuse TF-IDF features cached under {FEATURE_CACHE_DIR} for identical data and settings"
+    )
+    parser.add_argument("--search", action="store_true", help=f"Grid-search LogisticRegression over {SEARCH_GRID}")
+    parser.add_argument(
+        "--cascade", action="store_true",
+        help=f"Also fit and save the cascade model ({CASCADE_MODEL_PATH}); refits the pipeline on each of its folds"
+    )
+    parser.add_argument(
+        "--candidate-index", action="store_true",
+        help="Build the retrieval + rerank brand index instead of the multiclass model"
+    )
+    args = parser.parse_args()
+
+    if args.candidate_index:
+        DATA_PATH = Path(args.data)
+        save_candidate_index(train_candidate_index(load_training_data()))
+    elif args.incremental or args.resume:
+        model = train_incremental(Path(args.data), args.chunksize, args.epochs, resume=args.resume)
+        save_incremental_model(model)
+    else:
+        DATA_PATH = Path(args.data)
+        df = load_training_data()
+        model = train_model(df, n_jobs=args.n_jobs, cache_features=args.cache_features, search=args.search)
+        save_model(model)
+        export_compact(model, df["cleaned"].astype(str).head(1000).tolist())
+        if args.cascade:
+            save_cascade(train_cascade(model, df))
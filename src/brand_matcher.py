@@ -2,10 +2,24 @@
 brand_matcher.py
 ----------------
 Utility module for cleaning raw merchant names before
-vectorization and brand classification.
+vectorization and brand classification, plus a dictionary
+matcher that resolves well-formed merchant names without the model.
 """
 
 import re
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from src.industry_classifier import BRAND_INDUSTRY_MAP
+
+# Branch identifiers (#123) and any non alphanumeric/space character are
+# removed in a single pass; whitespace runs are collapsed afterwards.
+_STRIP_PATTERN = re.compile(r"#\d+|[^a-z0-9\s]")
+_SPACE_PATTERN = re.compile(r"\s+")
+
+CLEAN_CACHE_SIZE = 65536  # distinct merchant strings kept by the memoized cleaner
 
 
 def clean_merchant_name(name: str) -> str:
@@ -21,8 +35,169 @@ def clean_merchant_name(name: str) -> str:
     if not isinstance(name, str):
         return ""
 
-    name = name.lower()
-    name = re.sub(r'#\d+', '', name)         # remove branch identifiers
-    name = re.sub(r'[^a-z0-9\s]', '', name)  # keep alphanumeric + space
-    name = re.sub(r'\s+', ' ', name)         # normalize spaces
-    return name.strip()
+    name = _STRIP_PATTERN.sub("", name.lower())
+    return _SPACE_PATTERN.sub(" ", name).strip()
+
+
+@lru_cache(maxsize=CLEAN_CACHE_SIZE)
+def _clean_merchant_name_cached(name: str) -> str:
+    return clean_merchant_name(name)
+
+
+def clean_merchant_name_cached(name: str) -> str:
+    """
+    Memoized clean_merchant_name() for online, one-at-a-time callers
+    that see the same merchant strings repeatedly.
+    """
+    if not isinstance(name, str):
+        return ""
+    return _clean_merchant_name_cached(name)
+
+
+def clean_merchant_names(names, dtype=object) -> pd.Series:
+    """
+    Clean a whole column of raw merchant names.
+
+    Values are factorized first so each distinct merchant string is cleaned
+    once, then broadcast back. Output matches clean_merchant_name() element
+    for element and keeps the index of `names` when it is a Series. Pass
+    e.g. dtype="string[pyarrow]" to get Arrow-backed strings, built directly
+    from the distinct values without an intermediate object column.
+    """
+    names = names if isinstance(names, pd.Series) else pd.Series(names, dtype=object)
+    codes, uniques = pd.factorize(names)
+    cleaned = pd.array([clean_merchant_name(name) for name in uniques] + [""], dtype=dtype)
+    # NaN/None factorize to -1, which picks the trailing "" entry
+    return pd.Series(cleaned.take(codes), index=names.index, name=names.name, copy=False)
+
+
+# -------------------------------------------------------------------
+# Dictionary matching against a brand alias catalog
+# -------------------------------------------------------------------
+
+MAX_EDIT_RATIO = 0.25  # fuzzy matches may differ by up to this many edits per alias character
+_NGRAM = 3
+
+
+def _trigrams(text: str) -> set[str]:
+    return {text[i:i + _NGRAM] for i in range(len(text) - _NGRAM + 1)}
+
+
+def _bounded_edit_distance(a: str, b: str, limit: int) -> int | None:
+    """Levenshtein distance between a and b, or None once it must exceed `limit`."""
+    if abs(len(a) - len(b)) > limit:
+        return None
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, start=1):
+        current = [i]
+        for j, char_b in enumerate(b, start=1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b),
+            ))
+        if min(current) > limit:
+            return None
+        previous = current
+    return previous[-1] if previous[-1] <= limit else None
+
+
+class BrandMatcher:
+    """
+    Exact and fuzzy lookup of cleaned merchant text in a brand alias catalog.
+
+    Exact matches are a hash lookup on the whole text or on its leading
+    words (so "starbucks lake view" hits "starbucks"). Fuzzy matches pull
+    candidates from a character-trigram inverted index and verify them with
+    a bounded edit distance. Scores are 1.0 for exact matches and
+    1 - distance / len(alias) for fuzzy ones.
+    """
+
+    def __init__(self, aliases: dict[str, str], max_edit_ratio: float = MAX_EDIT_RATIO):
+        self.max_edit_ratio = max_edit_ratio
+        self._exact = {}
+        for alias, brand in aliases.items():
+            cleaned = clean_merchant_name(alias)
+            if cleaned:
+                self._exact.setdefault(cleaned, brand)
+        self._aliases = list(self._exact)
+        self._max_words = max((alias.count(" ") + 1 for alias in self._aliases), default=0)
+
+        self._alias_grams = [len(_trigrams(alias)) for alias in self._aliases]
+        self._index: dict[str, list[int]] = {}
+        for alias_id, alias in enumerate(self._aliases):
+            for gram in _trigrams(alias):
+                self._index.setdefault(gram, []).append(alias_id)
+
+    @classmethod
+    def from_brands(cls, brands, max_edit_ratio: float = MAX_EDIT_RATIO) -> "BrandMatcher":
+        """Catalog where each brand label (except 'Other') is its own alias."""
+        return cls({brand: brand for brand in brands if brand != "Other"}, max_edit_ratio)
+
+    def _prefixes(self, text: str) -> list[str]:
+        """The text itself, then its leading word prefixes, longest first."""
+        words = text.split(" ")
+        prefixes = [" ".join(words[:n]) for n in range(min(len(words) - 1, self._max_words), 0, -1)]
+        return [text, *prefixes]
+
+    def _fuzzy(self, query: str) -> tuple[str | None, float]:
+        shared: dict[int, int] = {}
+        for gram in _trigrams(query):
+            for alias_id in self._index.get(gram, ()):
+                shared[alias_id] = shared.get(alias_id, 0) + 1
+
+        best, best_score = None, 0.0
+        for alias_id, count in shared.items():
+            alias = self._aliases[alias_id]
+            limit = int(len(alias) * self.max_edit_ratio)
+            # Each edit destroys at most three trigrams (q-gram lemma)
+            if limit == 0 or count < self._alias_grams[alias_id] - _NGRAM * limit:
+                continue
+            distance = _bounded_edit_distance(query, alias, limit)
+            if distance is not None:
+                score = 1.0 - distance / len(alias)
+                if score > best_score:
+                    best, best_score = self._exact[alias], score
+        return best, best_score
+
+    def match(self, text: str) -> tuple[str | None, float]:
+        """Return (brand, score) for the best catalog match of `text`, or (None, 0.0)."""
+        cleaned = clean_merchant_name(text)
+        if not cleaned:
+            return None, 0.0
+
+        candidates = self._prefixes(cleaned)
+        for candidate in candidates:
+            if candidate in self._exact:
+                return self._exact[candidate], 1.0
+
+        best, best_score = None, 0.0
+        for candidate in candidates:
+            brand, score = self._fuzzy(candidate)
+            if score > best_score:
+                best, best_score = brand, score
+        return best, best_score
+
+    def match_many(self, texts) -> tuple[np.ndarray, np.ndarray]:
+        """Vectorized match(): (brands, scores) arrays, computed once per distinct text."""
+        codes, uniques = pd.factorize(pd.Series(texts, dtype=object))
+        matches = [self.match(text) for text in uniques] + [(None, 0.0)]
+        brands = np.array([brand for brand, _ in matches], dtype=object)
+        scores = np.array([score for _, score in matches], dtype=np.float64)
+        return brands[codes], scores[codes]
+
+
+_default_matcher = None  # built lazily from BRAND_INDUSTRY_MAP
+
+
+def match_brand(text: str, matcher: BrandMatcher | None = None) -> str | None:
+    """
+    Resolve merchant text to a known brand by exact or fuzzy dictionary
+    lookup. Uses the BRAND_INDUSTRY_MAP brands unless a matcher is given.
+    """
+    global _default_matcher
+    if matcher is None:
+        if _default_matcher is None:
+            _default_matcher = BrandMatcher({brand: brand for brand in BRAND_INDUSTRY_MAP})
+        matcher = _default_matcher
+    return matcher.match(text)[0]
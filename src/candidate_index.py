@@ -0,0 +1,210 @@
+"""
+candidate_index.py
+------------------
+Brand resolver for catalogs too large for one flat multiclass model.
+
+Known brand aliases (the most frequent cleaned merchant strings of each
+brand, plus the brand name) are embedded as char n-gram TF-IDF vectors.
+Their transpose, n-gram -> aliases, is kept as a CSR matrix, i.e. an
+inverted index: multiplying a batch of query vectors by it walks only the
+postings of the n-grams the queries contain, so cost grows with the
+overlap, not with the number of brands. n-grams shared by many brands are
+left out of the postings, like stop words.
+
+The RETRIEVED_ALIASES most similar aliases per merchant are reranked by a
+small logistic regression over (cosine, alias containment), fitted on
+held-out labeled rows; each brand keeps its best alias and the
+`n_candidates` best brands are the merchant's candidates. The reranker's
+probability is a candidate's confidence and whatever probability mass is
+left goes to the "Other" class.
+
+BrandCandidateIndex exposes `classes_`, `predict_proba()` and `predict()`
+like the sklearn pipeline, plus `top_k()` which returns only the k best
+classes per merchant without materializing an (n_samples, n_classes) array.
+"""
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+
+from src.brand_matcher import clean_merchant_name
+
+OTHER_LABEL = "Other"
+N_CANDIDATES = 16  # candidate brands kept per merchant
+MAX_ALIASES_PER_BRAND = 32
+# n-grams shared by more brands than this are dropped from the index (like stop words)
+MAX_BRAND_SHARE = 0.02
+MIN_BRANDS_PER_NGRAM = 50  # ... but small catalogs keep every n-gram
+MIN_SIMILARITY = 0.1  # retrieval score (cosine over indexed n-grams) below which an alias is dropped
+RETRIEVED_ALIASES = 64  # most similar aliases per merchant that are reranked
+QUERY_BATCH_SIZE = 2048
+RERANK_FRACTION = 0.2  # labeled rows held out to fit the reranker
+
+
+def _rerank_features(cosine: np.ndarray, containment: np.ndarray) -> np.ndarray:
+    return np.column_stack([cosine, containment, cosine * containment])
+
+
+class BrandCandidateIndex:
+    """
+    Inverted-index candidate retrieval + reranking over brand aliases.
+
+    Build it with fit() on (cleaned merchant, brand) rows; rows labeled
+    OTHER_LABEL are not indexed but teach the reranker what non-brand
+    merchants look like.
+    """
+
+    def __init__(
+        self,
+        ngram_range: tuple[int, int] = (3, 5),
+        n_candidates: int = N_CANDIDATES,
+        max_aliases_per_brand: int = MAX_ALIASES_PER_BRAND,
+    ):
+        self.ngram_range = ngram_range
+        self.n_candidates = n_candidates
+        self.max_aliases_per_brand = max_aliases_per_brand
+
+    def fit(self, texts, labels, rerank_fraction: float = RERANK_FRACTION, random_state: int = 42):
+        texts = pd.Series(texts, dtype=object).fillna("").astype(str).reset_index(drop=True)
+        labels = pd.Series(labels, dtype=object).fillna(OTHER_LABEL).astype(str).reset_index(drop=True)
+        rng = np.random.default_rng(random_state)
+        rerank_rows = rng.random(len(texts)) < rerank_fraction
+
+        # Most frequent cleaned strings of each brand become its aliases
+        indexed = pd.DataFrame({"alias": texts[~rerank_rows], "brand": labels[~rerank_rows]})
+        indexed = indexed[(indexed["brand"] != OTHER_LABEL) & (indexed["alias"] != "")]
+        names = pd.DataFrame({"alias": [clean_merchant_name(b) for b in labels.unique()], "brand": labels.unique()})
+        names = names[names["brand"] != OTHER_LABEL]
+        counts = pd.concat([names, indexed]).value_counts(["brand", "alias"], sort=False).rename("n").reset_index()
+        counts = counts.sort_values(["brand", "n", "alias"], ascending=[True, False, True], kind="stable")
+        aliases = counts.groupby("brand", sort=False).head(self.max_aliases_per_brand)
+        aliases = aliases[aliases["alias"] != ""]
+
+        self.classes_ = np.array(sorted({*aliases["brand"], OTHER_LABEL}), dtype=object)
+        self.other_index = int(np.searchsorted(self.classes_.astype(str), OTHER_LABEL))
+        self.alias_texts = aliases["alias"].to_numpy(dtype=object)
+        self.alias_classes = np.searchsorted(self.classes_.astype(str), aliases["brand"].to_numpy(dtype=str))
+        self.alias_classes = self.alias_classes.astype(np.int32)
+
+        self.vectorizer = TfidfVectorizer(analyzer="char", ngram_range=self.ngram_range, dtype=np.float32)
+        self.alias_vectors = sp.csr_matrix(self.vectorizer.fit_transform(self.alias_texts))
+        # Squared alias weights give the containment feature
+        self.alias_weights = self.alias_vectors.multiply(self.alias_vectors).tocsr()
+        self.postings = self._build_postings()
+
+        # Until the reranker is fitted, candidates are ranked by cosine alone
+        rows, classes, features = self._batched_candidates(texts[rerank_rows].tolist(), rerank=False)
+        targets = self.classes_[classes] == labels[rerank_rows].to_numpy(dtype=object)[rows]
+        if len(np.unique(targets)) < 2:
+            raise ValueError("Reranker needs both matching and non-matching candidates; add more labeled rows.")
+        self.reranker = LogisticRegression(C=10.0).fit(features, targets)
+        return self
+
+    def _build_postings(self) -> sp.csr_matrix:
+        """
+        n-gram -> alias postings used for retrieval. n-grams common to many
+        brands are left out (their postings would be huge); they still count
+        when the retrieved aliases are scored.
+        """
+        brand_of_alias = sp.csr_matrix(
+            (np.ones(len(self.alias_classes)), (self.alias_classes, np.arange(len(self.alias_classes)))),
+            shape=(len(self.classes_), len(self.alias_classes)),
+        )
+        brands_per_ngram = np.asarray(((brand_of_alias @ self.alias_vectors) > 0).sum(axis=0)).ravel()
+        limit = max(MIN_BRANDS_PER_NGRAM, MAX_BRAND_SHARE * len(self.classes_))
+        postings = sp.diags((brands_per_ngram <= limit).astype(np.float32)) @ sp.csr_matrix(self.alias_vectors.T)
+        postings.eliminate_zeros()
+        return sp.csr_matrix(postings)
+
+    def _batched_candidates(self, texts, rerank: bool = True):
+        """_candidates() over QUERY_BATCH_SIZE texts at a time, bounding the similarity matrices."""
+        parts = []
+        for start in range(0, len(texts), QUERY_BATCH_SIZE):
+            rows, classes, features = self._candidates(texts[start:start + QUERY_BATCH_SIZE], rerank)
+            parts.append((rows + start, classes, features))
+        if not parts:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int32), np.empty((0, 3))
+        return tuple(np.concatenate(part) for part in zip(*parts))
+
+    def _candidates(self, texts, rerank: bool = True) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        (row, class, features) of the retrieved candidate brands, at most
+        `n_candidates` per row, each represented by its best-scoring alias.
+        """
+        queries = self.vectorizer.transform(texts)
+        overlap = (queries @ self.postings).tocoo()
+        # Aliases that share only a few distinctive n-grams with the merchant are not credible candidates
+        similar = overlap.data >= MIN_SIMILARITY
+        rows, alias_ids, similarity = overlap.row[similar].astype(np.int64), overlap.col[similar], overlap.data[similar]
+        # Most similar aliases per row; the score is <= 1, so the key sorts by row, then by descending score
+        order = np.argsort(rows * 2.0 - similarity, kind="stable")
+        rows, alias_ids = rows[order], alias_ids[order]
+        retrieved = np.arange(len(rows)) - np.searchsorted(rows, rows, side="left") < RETRIEVED_ALIASES
+        rows, alias_ids = rows[retrieved], alias_ids[retrieved]
+
+        # Rerank features over all n-grams: cosine, and the share of the alias's TF-IDF mass in the merchant
+        gathered = queries[rows]
+        cosine = np.asarray(gathered.multiply(self.alias_vectors[alias_ids]).sum(axis=1)).ravel()
+        gathered.data[:] = 1.0
+        contained = np.asarray(gathered.multiply(self.alias_weights[alias_ids]).sum(axis=1)).ravel()
+
+        classes = self.alias_classes[alias_ids]
+        features = _rerank_features(cosine, contained)
+        scores = self.reranker.decision_function(features) if rerank and len(rows) else features[:, 0]
+
+        # Best alias per (row, brand), then the n_candidates best brands per row
+        order = np.lexsort((-scores, classes, rows))
+        rows, classes, features, scores = rows[order], classes[order], features[order], scores[order]
+        first = np.ones(len(rows), dtype=bool)
+        first[1:] = (rows[1:] != rows[:-1]) | (classes[1:] != classes[:-1])
+        rows, classes, features, scores = rows[first], classes[first], features[first], scores[first]
+        order = np.lexsort((-scores, rows))
+        rows, classes, features = rows[order], classes[order], features[order]
+        keep = np.arange(len(rows)) - np.searchsorted(rows, rows, side="left") < self.n_candidates
+        return rows[keep], classes[keep], features[keep]
+
+    def _scores(self, texts):
+        """(rows, classes, probabilities) for every candidate, including each row's Other remainder."""
+        texts = list(texts)
+        rows, classes, features = self._batched_candidates(texts)
+        proba = self.reranker.predict_proba(features)[:, 1] if len(rows) else np.empty(0)
+        # Rows whose candidates sum above 1 are normalized; otherwise the rest is Other
+        totals = np.bincount(rows, weights=proba, minlength=len(texts))
+        scale = np.maximum(totals, 1.0)
+        proba = proba / scale[rows]
+        other = 1.0 - totals / scale
+        all_rows = np.concatenate([rows, np.arange(len(texts))])
+        all_classes = np.concatenate([classes, np.full(len(texts), self.other_index)])
+        return all_rows, all_classes, np.concatenate([proba, other])
+
+    def top_k(self, texts, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        int32 class indices and float64 confidences of the `k` best classes
+        per text, best first (ties by class index). Rows with fewer than k
+        candidates are padded with -1 and NaN.
+        """
+        texts = list(texts)
+        rows, classes, proba = self._scores(texts)
+        order = np.lexsort((classes, -proba, rows))
+        rows, classes, proba = rows[order], classes[order], proba[order]
+        ranks = np.arange(len(rows)) - np.searchsorted(rows, rows, side="left")
+        keep = ranks < k
+
+        indices = np.full((len(texts), k), -1, dtype=np.int32)
+        confidences = np.full((len(texts), k), np.nan)
+        indices[rows[keep], ranks[keep]] = classes[keep]
+        confidences[rows[keep], ranks[keep]] = proba[keep]
+        return indices, confidences
+
+    def predict_proba(self, texts) -> np.ndarray:
+        """Dense (n_samples, n_classes) probabilities; prefer top_k() for large catalogs."""
+        texts = list(texts)
+        rows, classes, proba = self._scores(texts)
+        dense = np.zeros((len(texts), len(self.classes_)))
+        dense[rows, classes] = proba
+        return dense
+
+    def predict(self, texts) -> np.ndarray:
+        return self.classes_[self.top_k(texts, 1)[0][:, 0]]
@@ -0,0 +1,153 @@
+"""
+cascade_model.py
+----------------
+Two-stage brand scorer: one linear model first, the calibrated ensemble
+only for ambiguous rows.
+
+The trained pipeline scores every merchant with each calibration fold's
+logistic regression plus per-class isotonic calibrators. The fast stage
+reuses the pipeline's TF-IDF features and a single logistic model whose
+coefficients are the mean of the folds' (one sparse matmul and a softmax).
+Two isotonic regressions map its top-1 probability to (a) the
+ensemble's calibrated confidence in that class, so fast confidences are
+on the same scale as the full model's, and (b) the chance that the
+ensemble ranks the same class first. A row is escalated to the
+calibrated ensemble when its mapped confidence is near the brand
+threshold (within `threshold ± margin`) or when the stages are likely
+to disagree (estimated agreement below `min_agreement`); all other rows
+keep the fast result.
+
+Given labels, both maps are fitted out of fold: copies of the pipeline
+are trained on all but one fold and scored on the held-out one, so the
+maps describe merchants the models have not seen rather than the
+ensemble's in-sample overconfidence.
+
+CascadeBrandModel exposes `classes_`, `predict_proba()` and `predict()`
+like the pipeline, plus `route()` which also reports how many rows each
+stage scored.
+"""
+
+import warnings
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.isotonic import IsotonicRegression
+from sklearn.model_selection import StratifiedKFold
+
+DEFAULT_THRESHOLD = 0.25  # categorize_transactions.MIN_CONFIDENCE_THRESHOLD
+DEFAULT_MARGIN = 0.15  # fast confidences within this distance of the threshold are escalated
+DEFAULT_MIN_AGREEMENT = 0.98  # rows less likely than this to get the ensemble's top class are escalated
+DEFAULT_FOLDS = 3  # out-of-fold splits used to fit the confidence and agreement maps
+
+
+def _softmax(scores: np.ndarray) -> np.ndarray:
+    scores = scores - scores.max(axis=1, keepdims=True)
+    np.exp(scores, out=scores)
+    scores /= scores.sum(axis=1, keepdims=True)
+    return scores
+
+
+class CascadeBrandModel:
+    """
+    Fast linear scorer with escalation to a fitted tfidf + calibrated_clf
+    Pipeline. Build it with fit() on the pipeline's labeled training texts.
+    """
+
+    def __init__(
+        self,
+        pipeline,
+        threshold: float = DEFAULT_THRESHOLD,
+        margin: float = DEFAULT_MARGIN,
+        min_agreement: float = DEFAULT_MIN_AGREEMENT,
+    ):
+        self.pipeline = pipeline
+        self.min_agreement = min_agreement
+        self.vectorizer = pipeline.named_steps["tfidf"]
+        self.calibrated = pipeline.named_steps["calibrated_clf"]
+        self.classes_ = np.asarray(self.calibrated.classes_)
+        self.threshold = threshold
+        self.margin = margin
+
+        estimators = [fold.estimator for fold in self.calibrated.calibrated_classifiers_]
+        if any(not np.array_equal(estimator.classes_, self.classes_) for estimator in estimators):
+            raise ValueError("Every calibration fold must have been fitted on all classes.")
+        coef = np.mean([estimator.coef_ for estimator in estimators], axis=0)
+        intercept = np.mean([estimator.intercept_ for estimator in estimators], axis=0)
+        if len(self.classes_) == 2:
+            # A binary model's single logit d; softmax([-d/2, d/2]) is sigmoid(d)
+            coef, intercept = np.vstack([-coef / 2, coef / 2]), np.concatenate([-intercept / 2, intercept / 2])
+        self.coef = np.ascontiguousarray(coef.T, dtype=np.float32)
+        self.intercept = intercept.astype(np.float32)
+
+    def __setstate__(self, state):
+        # Artifacts saved before the agreement map existed route on the threshold band alone
+        if "agreement_map" not in state:
+            warnings.warn("Cascade model predates agreement escalation; retrain it with --cascade to enable it")
+            state = {**state, "agreement_map": None, "min_agreement": DEFAULT_MIN_AGREEMENT}
+        self.__dict__.update(state)
+
+    def _fast_proba(self, features) -> np.ndarray:
+        return _softmax(np.asarray(features @ self.coef, dtype=np.float64) + self.intercept)
+
+    def _stage_scores(self, texts) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Per text: fast top-1 probability, the ensemble's probability for that class, and whether it ranks it first."""
+        features = self.vectorizer.transform(texts)
+        fast = self._fast_proba(features)
+        top = fast.argmax(axis=1)
+        full = self.calibrated.predict_proba(features)
+        rows = np.arange(len(top))
+        return fast[rows, top], full[rows, top], full.argmax(axis=1) == top
+
+    def fit(self, texts, labels=None, folds: int = DEFAULT_FOLDS):
+        """
+        Fit the confidence and agreement maps from fast top-1 probability.
+        With the `labels` the pipeline was trained on, they are fitted on
+        `folds` out-of-fold copies of the pipeline; without, `texts` should
+        be merchants the pipeline was not trained on.
+        """
+        if labels is None:
+            fast, full, agree = self._stage_scores(texts)
+        else:
+            texts, labels = np.asarray(texts, dtype=object), np.asarray(labels, dtype=object)
+            scores = []
+            for train, held_out in StratifiedKFold(folds, shuffle=True, random_state=0).split(texts, labels):
+                fold = CascadeBrandModel(clone(self.pipeline).fit(texts[train], labels[train]))
+                scores.append(fold._stage_scores(texts[held_out]))
+            fast, full, agree = (np.concatenate(values) for values in zip(*scores))
+        self.confidence_map = IsotonicRegression(y_min=0.0, y_max=1.0, out_of_bounds="clip").fit(fast, full)
+        self.agreement_map = IsotonicRegression(y_min=0.0, y_max=1.0, out_of_bounds="clip").fit(fast, agree)
+        return self
+
+    def route(self, texts) -> tuple[np.ndarray, dict[str, int]]:
+        """
+        (n_samples, n_classes) probabilities plus the number of rows scored
+        by each stage: {"fast": ..., "escalated": ...}.
+
+        Fast rows have their top-1 probability replaced by the mapped
+        confidence and the other classes rescaled to share the remainder
+        (capped at that confidence, so the top-1 class stays first).
+        """
+        features = self.vectorizer.transform(texts)
+        proba = self._fast_proba(features)
+        rows = np.arange(len(proba))
+        top = proba.argmax(axis=1)
+        top_proba = proba[rows, top]
+        confidence = self.confidence_map.predict(top_proba)
+
+        rest = np.divide(1.0 - confidence, 1.0 - top_proba, out=np.zeros_like(confidence), where=top_proba < 1.0)
+        proba = np.minimum(proba * rest[:, None], confidence[:, None])  # the fast top-1 stays first
+        proba[rows, top] = confidence
+
+        escalate = np.abs(confidence - self.threshold) < self.margin
+        if self.agreement_map is not None:
+            escalate |= self.agreement_map.predict(top_proba) < self.min_agreement
+        escalated = np.flatnonzero(escalate)
+        if len(escalated):
+            proba[escalated] = self.calibrated.predict_proba(features[escalated])
+        return proba, {"fast": len(proba) - len(escalated), "escalated": len(escalated)}
+
+    def predict_proba(self, texts) -> np.ndarray:
+        return self.route(texts)[0]
+
+    def predict(self, texts) -> np.ndarray:
+        return self.classes_[self.predict_proba(texts).argmax(axis=1)]
@@ -0,0 +1,188 @@
+"""
+compact_model.py
+----------------
+Compact, memory-mappable form of the trained brand classifier.
+
+The sklearn Pipeline (char n-gram TF-IDF + k-fold isotonic
+CalibratedClassifierCV) is exported as a directory of plain NumPy arrays:
+a sorted n-gram vocabulary, the idf vector, float32 coefficients for every
+calibration fold and the isotonic calibrators as interpolation tables.
+CompactBrandModel loads them with np.load(mmap_mode="r") and reproduces
+the pipeline's predict_proba() within float32 tolerance.
+"""
+
+import json
+import re
+from pathlib import Path
+
+import numpy as np
+import scipy.sparse as sp
+
+FORMAT_VERSION = 1
+_WHITE_SPACES = re.compile(r"\s\s+")  # TfidfVectorizer's char analyzer normalization
+
+
+def export_compact_model(pipeline, path) -> Path:
+    """
+    Write the arrays behind a fitted tfidf + calibrated_clf Pipeline to `path`.
+
+    Raises ValueError for vectorizer or calibration settings the compact
+    predictor does not reproduce.
+    """
+    vectorizer = pipeline.named_steps["tfidf"]
+    calibrated = pipeline.named_steps["calibrated_clf"]
+
+    if (
+        vectorizer.analyzer != "char" or vectorizer.norm != "l2" or vectorizer.sublinear_tf
+        or not vectorizer.use_idf or vectorizer.binary or vectorizer.preprocessor is not None
+        or vectorizer.strip_accents is not None
+    ):
+        raise ValueError("Compact export supports char n-gram TF-IDF with l2 norm and idf weighting only.")
+    if calibrated.method != "isotonic" or not calibrated.ensemble:
+        raise ValueError("Compact export supports ensembled isotonic calibration only.")
+
+    classes = np.asarray(calibrated.classes_)
+    folds = calibrated.calibrated_classifiers_
+    for fold in folds:
+        if not np.array_equal(fold.estimator.classes_, classes):
+            raise ValueError("Every calibration fold must have been fitted on all classes.")
+
+    # Vocabulary sorted by term, with the feature column each term maps to
+    terms = np.array(sorted(vectorizer.vocabulary_))
+    term_columns = np.array([vectorizer.vocabulary_[term] for term in terms], dtype=np.int32)
+
+    # Coefficients as (n_features, n_folds * n_outputs) for a single sparse matmul
+    coef = np.hstack([fold.estimator.coef_.T for fold in folds]).astype(np.float32)
+    intercept = np.hstack([fold.estimator.intercept_ for fold in folds]).astype(np.float32)
+
+    # Isotonic calibrators as padded (n_folds * n_outputs, n_points) interpolation tables
+    calibrators = [calibrator for fold in folds for calibrator in fold.calibrators]
+    width = max(len(c.X_thresholds_) for c in calibrators)
+    calib_x = np.empty((len(calibrators), width))
+    calib_y = np.empty((len(calibrators), width))
+    for row, calibrator in enumerate(calibrators):
+        n = len(calibrator.X_thresholds_)
+        calib_x[row, :n], calib_x[row, n:] = calibrator.X_thresholds_, calibrator.X_thresholds_[-1]
+        calib_y[row, :n], calib_y[row, n:] = calibrator.y_thresholds_, calibrator.y_thresholds_[-1]
+
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    arrays = {
+        "terms": terms,
+        "term_columns": term_columns,
+        "idf": vectorizer.idf_.astype(np.float32),
+        "coef": coef,
+        "intercept": intercept,
+        "calib_x": calib_x,
+        "calib_y": calib_y,
+        "classes": classes.astype(str),
+    }
+    for name, array in arrays.items():
+        np.save(path / f"{name}.npy", array)
+
+    meta = {
+        "format_version": FORMAT_VERSION,
+        "ngram_range": list(vectorizer.ngram_range),
+        "lowercase": bool(vectorizer.lowercase),
+        "n_folds": len(folds),
+        "n_outputs": int(folds[0].estimator.coef_.shape[0]),
+    }
+    (path / "meta.json").write_text(json.dumps(meta, indent=2))
+    return path
+
+
+class CompactBrandModel:
+    """
+    Lightweight predictor over an exported compact artifact.
+
+    Exposes `classes_`, `predict_proba()` and `predict()` like the sklearn
+    pipeline it was exported from, so it can be used wherever that model is.
+    """
+
+    def __init__(self, path):
+        path = Path(path)
+        meta = json.loads((path / "meta.json").read_text())
+        if meta["format_version"] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported compact model format {meta['format_version']} at {path}")
+
+        self.min_n, self.max_n = meta["ngram_range"]
+        self.lowercase = meta["lowercase"]
+        self.n_folds = meta["n_folds"]
+        self.n_outputs = meta["n_outputs"]
+
+        def load(name):
+            return np.load(path / f"{name}.npy", mmap_mode="r")
+
+        self.terms = load("terms")
+        self.term_columns = load("term_columns")
+        self.idf = load("idf")
+        self.coef = load("coef")
+        self.intercept = load("intercept")
+        self.calib_x = load("calib_x")
+        self.calib_y = load("calib_y")
+        self.classes_ = np.load(path / "classes.npy").astype(object)
+
+    @classmethod
+    def load(cls, path) -> "CompactBrandModel":
+        return cls(path)
+
+    def transform(self, texts) -> sp.csr_matrix:
+        """L2-normalized TF-IDF features, matching the exported TfidfVectorizer."""
+        ngrams, rows = [], []
+        for row, text in enumerate(texts):
+            text = _WHITE_SPACES.sub(" ", text.lower() if self.lowercase else text)
+            for n in range(self.min_n, min(self.max_n + 1, len(text) + 1)):
+                grams = [text[i:i + n] for i in range(len(text) - n + 1)]
+                ngrams.extend(grams)
+                rows.extend([row] * len(grams))
+
+        n_features = len(self.idf)
+        grams = np.array(ngrams, dtype=self.terms.dtype) if ngrams else np.empty(0, dtype=self.terms.dtype)
+        rows = np.asarray(rows, dtype=np.int64)
+        positions = np.searchsorted(self.terms, grams)
+        positions[positions == len(self.terms)] = 0
+        known = self.terms[positions] == grams if len(self.terms) else np.zeros(len(grams), dtype=bool)
+
+        features = sp.csr_matrix(
+            (np.ones(known.sum(), dtype=np.float64), (rows[known], self.term_columns[positions[known]])),
+            shape=(len(texts), n_features),
+        )
+        features.sum_duplicates()
+        features = features @ sp.diags(np.asarray(self.idf, dtype=np.float64))
+        norms = np.sqrt(np.asarray(features.multiply(features).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        return sp.csr_matrix(sp.diags(1.0 / norms) @ features)
+
+    def decision_function(self, texts) -> np.ndarray:
+        """Per-fold linear scores, shaped (n_samples, n_folds, n_outputs)."""
+        scores = self.transform(texts) @ self.coef + self.intercept
+        return np.asarray(scores, dtype=np.float64).reshape(-1, self.n_folds, self.n_outputs)
+
+    def predict_proba(self, texts) -> np.ndarray:
+        texts = list(texts)
+        n_classes = len(self.classes_)
+        if not texts:
+            return np.empty((0, n_classes))
+        scores = self.decision_function(texts)
+
+        proba = np.zeros((len(texts), n_classes))
+        for fold in range(self.n_folds):
+            fold_proba = np.empty((len(texts), n_classes))
+            for output in range(self.n_outputs):
+                table = fold * self.n_outputs + output
+                calibrated = np.interp(scores[:, fold, output], self.calib_x[table], self.calib_y[table])
+                if n_classes == 2:
+                    fold_proba[:, 1] = calibrated
+                    fold_proba[:, 0] = 1.0 - calibrated
+                else:
+                    fold_proba[:, output] = calibrated
+            if n_classes > 2:
+                denominator = fold_proba.sum(axis=1, keepdims=True)
+                uniform = np.full_like(fold_proba, 1 / n_classes)
+                fold_proba = np.divide(fold_proba, denominator, out=uniform, where=denominator != 0)
+            fold_proba[(1.0 < fold_proba) & (fold_proba <= 1.0 + 1e-5)] = 1.0
+            proba += fold_proba
+        return proba / self.n_folds
+
+    def predict(self, texts) -> np.ndarray:
+        return self.classes_[self.predict_proba(texts).argmax(axis=1)]
@@ -0,0 +1,144 @@
+"""
+enrichment_state.py
+-------------------
+Bookkeeping for incremental, resumable enrichment runs.
+
+A SQLite file keeps:
+
+- an index of enriched TXN_IDs, each tagged with the model fingerprint
+  that produced it (stored once in a side table and referenced by a
+  small integer), so reruns over an append-only drop only enrich rows
+  that are new or were enriched by another model;
+- chunk checkpoints of the current run per output file, so a run that
+  was killed resumes after the last chunk whose output part was written,
+  together with the TXN_IDs staged by those chunks.
+
+A chunk's TXN_IDs and its checkpoint are committed in one transaction,
+after its part file is in place. Staged TXN_IDs only join the enriched
+index in finish_run(), once the output holding them has been assembled;
+a run that is abandoned (its input changed before it was resumed) has
+its checkpoints and staged TXN_IDs dropped, so those rows are enriched
+again rather than lost with its parts.
+"""
+
+import hashlib
+import sqlite3
+from pathlib import Path
+
+import numpy as np
+
+_SQL_BATCH = 900  # stay below SQLite's bound-parameter limit
+
+
+def run_key(input_file, output_file, fingerprint: str, chunksize: int) -> str:
+    """Identity of a run: the input file's path, size and mtime plus the model and chunking."""
+    stat = Path(input_file).stat()
+    parts = [str(Path(input_file).resolve()), stat.st_size, stat.st_mtime_ns, str(output_file), fingerprint, chunksize]
+    return hashlib.sha256("\0".join(map(str, parts)).encode()).hexdigest()
+
+
+class EnrichmentState:
+    """TXN_ID -> model fingerprint index plus chunk checkpoints, for one model `fingerprint`."""
+
+    def __init__(self, path, fingerprint: str):
+        self.path = Path(path)
+        self.fingerprint = fingerprint
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=60)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS fingerprints (id INTEGER PRIMARY KEY, fingerprint TEXT UNIQUE)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS enriched (txn_id TEXT PRIMARY KEY, fingerprint_id INTEGER) WITHOUT ROWID"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoints ("
+                "output TEXT, run_key TEXT, chunk INTEGER, rows INTEGER, part TEXT, PRIMARY KEY (output, chunk))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS staged (output TEXT, txn_id TEXT, PRIMARY KEY (output, txn_id)) WITHOUT ROWID"
+            )
+            self._conn.execute("INSERT OR IGNORE INTO fingerprints (fingerprint) VALUES (?)", (fingerprint,))
+        self._fingerprint_id = self._conn.execute(
+            "SELECT id FROM fingerprints WHERE fingerprint = ?", (fingerprint,)
+        ).fetchone()[0]
+
+    def pending_mask(self, txn_ids, output=None) -> np.ndarray:
+        """
+        True for TXN_IDs never enriched, or last enriched with another model
+        (and, given `output`, not already staged by the current run into it).
+        """
+        txn_ids = [str(txn_id) for txn_id in txn_ids]
+        current = set()
+        for start in range(0, len(txn_ids), _SQL_BATCH):
+            batch = txn_ids[start:start + _SQL_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            current.update(
+                row[0] for row in self._conn.execute(
+                    f"SELECT txn_id FROM enriched WHERE fingerprint_id = ? AND txn_id IN ({placeholders})",
+                    [self._fingerprint_id, *batch],
+                )
+            )
+            if output is not None:
+                current.update(
+                    row[0] for row in self._conn.execute(
+                        f"SELECT txn_id FROM staged WHERE output = ? AND txn_id IN ({placeholders})",
+                        [str(output), *batch],
+                    )
+                )
+        return np.array([txn_id not in current for txn_id in txn_ids], dtype=bool)
+
+    def completed_chunks(self, output, key: str) -> dict[int, str | None]:
+        """
+        {chunk: part file} checkpointed for `output` by the run `key`. Another
+        run's checkpoints for `output` are dropped together with its staged
+        TXN_IDs, which become pending again.
+        """
+        with self._conn:
+            abandoned = self._conn.execute(
+                "DELETE FROM checkpoints WHERE output = ? AND run_key != ?", (str(output), key)
+            ).rowcount
+            if abandoned:
+                self._conn.execute("DELETE FROM staged WHERE output = ?", (str(output),))
+        rows = self._conn.execute(
+            "SELECT chunk, part FROM checkpoints WHERE output = ? ORDER BY chunk", (str(output),)
+        ).fetchall()
+        return dict(rows)
+
+    def commit_chunk(self, output, key: str, chunk: int, txn_ids, part: str | None):
+        """Stage `txn_ids` for `output` and checkpoint `chunk` (written to `part`)."""
+        txn_ids = [str(txn_id) for txn_id in txn_ids]
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO staged VALUES (?, ?)", ((str(output), txn_id) for txn_id in txn_ids)
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?)",
+                (str(output), key, chunk, len(txn_ids), part),
+            )
+
+    def staged_txn_ids(self, output) -> set[str]:
+        """TXN_IDs staged for `output` by the current run."""
+        return {row[0] for row in self._conn.execute("SELECT txn_id FROM staged WHERE output = ?", (str(output),))}
+
+    def finish_run(self, output):
+        """Mark the staged TXN_IDs of a run whose output has been assembled enriched, and forget its checkpoints."""
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO enriched SELECT txn_id, ? FROM staged WHERE output = ?",
+                (self._fingerprint_id, str(output)),
+            )
+            self._conn.execute("DELETE FROM staged WHERE output = ?", (str(output),))
+            self._conn.execute("DELETE FROM checkpoints WHERE output = ?", (str(output),))
+
+    def stats(self) -> dict:
+        """Enriched TXN_IDs in the index, in total and for the current model."""
+        total, current = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(fingerprint_id = ?), 0) FROM enriched", (self._fingerprint_id,)
+        ).fetchone()
+        return {"enriched": total, "current_model": current}
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,137 @@
+"""
+incremental_model.py
+--------------------
+Online-trainable brand classifier for incremental retraining.
+
+Features come from a stateless char n-gram HashingVectorizer, so there is
+no vocabulary to refit; an SGDClassifier (log loss, one-vs-rest) is
+updated chunk by chunk with partial_fit. Brands first seen in a later
+chunk are added as new classes with zero-initialized weights. Per-class
+isotonic calibration is refit on a bounded held-out sample that is kept
+with the model, so recalibration after an update also sees older data.
+
+IncrementalBrandModel exposes `classes_`, `predict_proba()` and
+`predict()`, so a joblib dump of it can be loaded by load_brand_model().
+"""
+
+import numpy as np
+from scipy.special import expit
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.isotonic import IsotonicRegression
+from sklearn.linear_model import SGDClassifier
+
+N_FEATURES = 2**18  # hashed feature space; coefficients are n_classes x N_FEATURES float64
+CALIBRATION_MAX_ROWS = 100_000  # held-out rows kept with the model for recalibration
+MIN_CALIBRATION_POSITIVES = 5  # classes with fewer held-out examples keep raw SGD probabilities
+
+
+class IncrementalBrandModel:
+    """
+    Hashing vectorizer + SGD classifier trained with partial_fit().
+
+    Call partial_fit() for every training chunk, add_holdout() for held-out
+    rows, and calibrate() once the stream has been consumed.
+    """
+
+    def __init__(
+        self,
+        n_features: int = N_FEATURES,
+        ngram_range: tuple[int, int] = (3, 5),
+        alpha: float = 1e-6,
+        random_state: int = 42,
+    ):
+        self.vectorizer = HashingVectorizer(
+            analyzer="char", ngram_range=ngram_range, n_features=n_features, alternate_sign=False, norm="l2"
+        )
+        self.classifier = SGDClassifier(loss="log_loss", alpha=alpha, random_state=random_state)
+        self.calibrators: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+        self.holdout_texts: list[str] = []
+        self.holdout_labels: list[str] = []
+        self.rows_seen = 0
+        self._rng = np.random.default_rng(random_state)
+
+    @property
+    def classes_(self) -> np.ndarray:
+        return self.classifier.classes_.astype(object)
+
+    def _add_classes(self, labels: np.ndarray):
+        """Grow the classifier to cover brands it has not seen, keeping learned weights."""
+        classifier = self.classifier
+        unseen = np.setdiff1d(labels, classifier.classes_)
+        if len(unseen) == 0:
+            return
+        old_classes = classifier.classes_
+        coef, intercept = classifier.coef_, classifier.intercept_
+        if len(old_classes) == 2:
+            # Binary models keep one row scoring the second class
+            coef, intercept = np.vstack([-coef, coef]), np.concatenate([-intercept, intercept])
+
+        classes = np.union1d(old_classes, unseen)
+        rows = np.searchsorted(classes, old_classes)
+        new_coef = np.zeros((len(classes), coef.shape[1]), dtype=coef.dtype)
+        new_intercept = np.zeros(len(classes), dtype=intercept.dtype)
+        new_coef[rows], new_intercept[rows] = coef, intercept
+        classifier.classes_, classifier.coef_, classifier.intercept_ = classes, new_coef, new_intercept
+
+    def partial_fit(self, texts, labels):
+        """Update the model with one chunk of (cleaned merchant, brand) examples."""
+        labels = np.asarray(labels, dtype=str)
+        features = self.vectorizer.transform(texts)
+        if not hasattr(self.classifier, "classes_"):
+            classes = np.unique(labels)
+            if len(classes) < 2:
+                raise ValueError("The first training chunk must contain at least two brands.")
+            self.classifier.partial_fit(features, labels, classes=classes)
+        else:
+            self._add_classes(labels)
+            self.classifier.partial_fit(features, labels)
+        self.rows_seen += len(labels)
+        return self
+
+    def add_holdout(self, texts, labels):
+        """Keep held-out examples for calibration, subsampled to CALIBRATION_MAX_ROWS."""
+        self.holdout_texts.extend(texts)
+        self.holdout_labels.extend(labels)
+        overflow = len(self.holdout_texts) - CALIBRATION_MAX_ROWS
+        if overflow > 0:
+            keep = np.sort(self._rng.choice(len(self.holdout_texts), CALIBRATION_MAX_ROWS, replace=False))
+            self.holdout_texts = [self.holdout_texts[i] for i in keep]
+            self.holdout_labels = [self.holdout_labels[i] for i in keep]
+
+    def decision_function(self, texts) -> np.ndarray:
+        """One-vs-rest scores, shaped (n_samples, n_classes) also for two classes."""
+        scores = self.classifier.decision_function(self.vectorizer.transform(texts))
+        return np.column_stack([-scores, scores]) if scores.ndim == 1 else scores
+
+    def calibrate(self):
+        """Refit per-class isotonic calibrators on the held-out sample."""
+        self.calibrators = {}
+        if not self.holdout_texts:
+            return self
+        scores = self.decision_function(self.holdout_texts)
+        labels = np.asarray(self.holdout_labels, dtype=str)
+        for column, brand in enumerate(self.classifier.classes_):
+            positives = labels == brand
+            if positives.sum() < MIN_CALIBRATION_POSITIVES:
+                continue
+            isotonic = IsotonicRegression(y_min=0.0, y_max=1.0, out_of_bounds="clip")
+            isotonic.fit(scores[:, column], positives)
+            self.calibrators[brand] = (isotonic.X_thresholds_, isotonic.y_thresholds_)
+        return self
+
+    def predict_proba(self, texts) -> np.ndarray:
+        texts = list(texts)
+        if not texts:
+            return np.empty((0, len(self.classifier.classes_)))
+        scores = self.decision_function(texts)
+        proba = expit(scores)
+        for column, brand in enumerate(self.classifier.classes_):
+            if brand in self.calibrators:
+                thresholds_x, thresholds_y = self.calibrators[brand]
+                proba[:, column] = np.interp(scores[:, column], thresholds_x, thresholds_y)
+        total = proba.sum(axis=1, keepdims=True)
+        uniform = np.full_like(proba, 1 / proba.shape[1])
+        return np.divide(proba, total, out=uniform, where=total != 0)
+
+    def predict(self, texts) -> np.ndarray:
+        return self.classes_[self.predict_proba(texts).argmax(axis=1)]
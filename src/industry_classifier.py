@@ -2,9 +2,27 @@
 industry_classifier.py
 -----------------------
 Module for mapping brands and MCC codes to industry Tier 1 and Tier 2 categories.
+
+Lookups go through an IndustryTaxonomy compiled from the versioned
+reference files under `reference/` (MCC and brand -> industry tables). The
+compiled form is cached under `models/taxonomy_cache`, so only the first
+process after a reference update parses the files. Without the reference
+files the small built-in tables below are used.
 """
 
-# Example MCC lookup table
+from pathlib import Path
+
+import pandas as pd
+
+from src.industry_taxonomy import IndustryTaxonomy
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+REFERENCE_DIR = ROOT_DIR / "reference"
+MCC_TAXONOMY_PATH = REFERENCE_DIR / "mcc_taxonomy.csv"
+BRAND_TAXONOMY_PATH = REFERENCE_DIR / "brand_industries.csv"
+TAXONOMY_CACHE_DIR = ROOT_DIR / "models" / "taxonomy_cache"
+
+# Built-in fallback MCC lookup table
 MCC_LOOKUP = {
     5814: ("Food & Beverage", "Coffee Shops"),
     5411: ("Retail", "Supermarkets"),
@@ -23,24 +41,48 @@ BRAND_INDUSTRY_MAP = {
     "shell": ("Transport", "Fuel"),
 }
 
+_taxonomy: IndustryTaxonomy | None = None  # active taxonomy, loaded on first use
+
+
+def load_taxonomy(
+    mcc_path=MCC_TAXONOMY_PATH, brand_path=BRAND_TAXONOMY_PATH, cache_dir=TAXONOMY_CACHE_DIR
+) -> IndustryTaxonomy:
+    """Compile (or load the cached compiled form of) the reference files and make them active."""
+    return set_taxonomy(IndustryTaxonomy.load(mcc_path, brand_path, cache_dir))
+
+
+def set_taxonomy(taxonomy: IndustryTaxonomy) -> IndustryTaxonomy:
+    """Use `taxonomy` for subsequent classify_industry*() calls in this process."""
+    global _taxonomy
+    _taxonomy = taxonomy
+    return taxonomy
+
+
+def get_taxonomy() -> IndustryTaxonomy:
+    """The active taxonomy: the reference files when present, else the built-in tables."""
+    if _taxonomy is not None:
+        return _taxonomy
+    if MCC_TAXONOMY_PATH.exists() and BRAND_TAXONOMY_PATH.exists():
+        return load_taxonomy()
+    return set_taxonomy(IndustryTaxonomy.from_mappings(MCC_LOOKUP, BRAND_INDUSTRY_MAP))
+
 
 def classify_industry(brand: str | None, mcc_code: int | str | None) -> tuple[str | None, str | None]:
     """
     Determine Industry Tier 1 and Tier 2 based on brand or MCC code.
     Brand takes precedence; falls back to MCC mapping if brand is unknown or 'Other'.
     """
-    # Brand mapping takes precedence
-    if isinstance(brand, str):
-        b = brand.lower().strip()
-        if b != "other" and b in BRAND_INDUSTRY_MAP:
-            return BRAND_INDUSTRY_MAP[b]
-
-    # Fallback to MCC mapping
-    try:
-        mcc_int = int(mcc_code)
-        if mcc_int in MCC_LOOKUP:
-            return MCC_LOOKUP[mcc_int]
-    except (TypeError, ValueError):
-        pass
-
-    return (None, None)
+    return get_taxonomy().classify(brand, mcc_code)
+
+
+def classify_industry_frame(brands, mccs) -> pd.DataFrame:
+    """
+    Vectorized classify_industry() over aligned brand and MCC columns.
+
+    MCCs resolve through the taxonomy's dense table indexed by code and
+    brands through a join on their distinct normalized values; brand
+    matches take precedence and 'Other' falls back to MCC. Returns
+    categorical `industry_t1_pred` and `industry_t2_pred` columns (NaN where
+    unmapped), indexed like `brands`.
+    """
+    return get_taxonomy().classify_frame(brands, mccs)
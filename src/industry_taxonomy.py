@@ -0,0 +1,223 @@
+"""
+industry_taxonomy.py
+--------------------
+Precompiled MCC and brand -> industry lookup tables.
+
+The reference taxonomy lives in versioned CSV or Parquet files (one row per
+MCC and one per brand, each with `industry_t1` and `industry_t2`). They are
+compiled into plain NumPy arrays:
+
+- `pair_t1` / `pair_t2`: the distinct (tier 1, tier 2) pairs; lookups
+  produce an int32 pair code and labels are only materialized at the end
+- `mcc_table`: a dense int32 array indexed by MCC code -> pair code
+- `brand_keys` / `brand_pairs`: interned normalized brand names -> pair code
+
+so lookups are O(1) per value and vectorize over whole columns. The
+compiled arrays are saved as an .npz keyed by a hash of the source files,
+so later processes skip parsing the reference data.
+"""
+
+import hashlib
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+FORMAT_VERSION = 1
+MCC_CODE_SPACE = 10000  # MCCs are 4-digit codes (0000-9999)
+TIER_COLUMNS = ["industry_t1", "industry_t2"]
+
+
+def _mcc_to_int(mcc_code) -> int:
+    """Scalar MCC coercion used by classify(); -1 when not a usable code."""
+    try:
+        mcc_int = int(mcc_code)
+    except ValueError:
+        # Float text such as "5411.0" (a CSV column with blanks written by pandas), truncated like numeric MCCs
+        try:
+            mcc_int = int(float(mcc_code))
+        except (ValueError, OverflowError):
+            return -1
+    except (TypeError, OverflowError):
+        return -1
+    return mcc_int if 0 <= mcc_int < MCC_CODE_SPACE else -1
+
+
+def _mcc_codes_to_int(mccs: pd.Series) -> np.ndarray:
+    """Coerce an MCC column to int64 codes in [0, MCC_CODE_SPACE), -1 where invalid."""
+    if pd.api.types.is_numeric_dtype(mccs.dtype) and not pd.api.types.is_bool_dtype(mccs.dtype):
+        values = mccs.to_numpy(dtype=np.float64, na_value=np.nan)
+        valid = np.isfinite(values) & (values > -1) & (values < MCC_CODE_SPACE)
+        # int() truncates toward zero, so 5411.7 -> 5411 and -0.5 -> 0
+        return np.where(valid, np.trunc(np.where(valid, values, 0)), -1).astype(np.int64)
+
+    # Mixed/object columns: coerce each distinct value exactly like the scalar path
+    codes, uniques = pd.factorize(mccs)
+    unique_ints = np.array([_mcc_to_int(value) for value in uniques] + [-1], dtype=np.int64)
+    return unique_ints[codes]
+
+
+def _normalize_brand(brand) -> str | None:
+    return brand.lower().strip() if isinstance(brand, str) else None
+
+
+def _read_table(path) -> pd.DataFrame:
+    path = Path(path)
+    if path.suffix == ".parquet":
+        return pd.read_parquet(path)
+    return pd.read_csv(path, dtype=str, keep_default_na=False)
+
+
+def files_fingerprint(*paths) -> str:
+    """SHA-256 over the contents of the reference files and the compiled format version."""
+    digest = hashlib.sha256(f"taxonomy-v{FORMAT_VERSION}".encode())
+    for path in paths:
+        digest.update(Path(path).read_bytes())
+    return digest.hexdigest()
+
+
+class IndustryTaxonomy:
+    """
+    Compiled MCC and brand -> (industry_t1, industry_t2) lookups.
+
+    Brand matches take precedence over the MCC; 'Other' and unknown brands
+    fall back to the MCC, and unmapped values give (None, None).
+    """
+
+    def __init__(self, pair_t1, pair_t2, mcc_table, brand_keys, brand_pairs):
+        self.pair_t1 = np.asarray(pair_t1, dtype=object)
+        self.pair_t2 = np.asarray(pair_t2, dtype=object)
+        # The extra last slot absorbs invalid codes (-1)
+        self.mcc_table = np.asarray(mcc_table, dtype=np.int32)
+        self.brand_index = pd.Index(np.asarray(brand_keys, dtype=object), dtype=object)
+        self.brand_pairs = np.append(np.asarray(brand_pairs, dtype=np.int32), np.int32(-1))
+        if len(self.mcc_table) != MCC_CODE_SPACE + 1:
+            raise ValueError(f"mcc_table must have {MCC_CODE_SPACE + 1} entries")
+        if not self.brand_index.is_unique:
+            raise ValueError("Brand keys must be unique after normalization")
+        self._brand_lookup = dict(zip(self.brand_index, self.brand_pairs[:-1].tolist()))
+
+    @classmethod
+    def from_mappings(cls, mcc_lookup: dict, brand_map: dict) -> "IndustryTaxonomy":
+        """Compile {mcc: (t1, t2)} and {brand: (t1, t2)} dicts."""
+        pairs = list(dict.fromkeys([*brand_map.values(), *mcc_lookup.values()]))
+        pair_index = {pair: i for i, pair in enumerate(pairs)}
+
+        mcc_table = np.full(MCC_CODE_SPACE + 1, -1, dtype=np.int32)
+        for code, pair in mcc_lookup.items():
+            code = _mcc_to_int(code)
+            if code >= 0:
+                mcc_table[code] = pair_index[pair]
+
+        brands = {}
+        for brand, pair in brand_map.items():
+            key = _normalize_brand(brand)
+            if key and key != "other":
+                brands[key] = pair_index[pair]
+        return cls(
+            [pair[0] for pair in pairs], [pair[1] for pair in pairs],
+            mcc_table, list(brands), list(brands.values()),
+        )
+
+    @classmethod
+    def from_frames(cls, mcc_frame: pd.DataFrame, brand_frame: pd.DataFrame) -> "IndustryTaxonomy":
+        """
+        Compile an MCC table (`mcc`, industry_t1, industry_t2) and a brand
+        table (`brand`, industry_t1, industry_t2). Later rows win for
+        duplicate MCCs or brands.
+        """
+        for frame, key in [(mcc_frame, "mcc"), (brand_frame, "brand")]:
+            missing = {key, *TIER_COLUMNS} - set(frame.columns)
+            if missing:
+                raise ValueError(f"Taxonomy table is missing columns: {sorted(missing)}")
+
+        def pairs_of(frame):
+            return list(zip(frame["industry_t1"].astype(str), frame["industry_t2"].astype(str)))
+
+        mcc_lookup = dict(zip(_mcc_codes_to_int(mcc_frame["mcc"].astype(object)).tolist(), pairs_of(mcc_frame)))
+        mcc_lookup.pop(-1, None)
+        brand_map = dict(zip(brand_frame["brand"].map(_normalize_brand), pairs_of(brand_frame)))
+        return cls.from_mappings(mcc_lookup, brand_map)
+
+    @classmethod
+    def from_files(cls, mcc_path, brand_path) -> "IndustryTaxonomy":
+        """Parse and compile the reference files (CSV, or Parquet by extension)."""
+        return cls.from_frames(_read_table(mcc_path), _read_table(brand_path))
+
+    @classmethod
+    def load(cls, mcc_path, brand_path, cache_dir=None) -> "IndustryTaxonomy":
+        """
+        from_files(), reusing the compiled arrays saved under `cache_dir`
+        for files with the same content.
+        """
+        if cache_dir is None:
+            return cls.from_files(mcc_path, brand_path)
+        cache_file = Path(cache_dir) / f"taxonomy-{files_fingerprint(mcc_path, brand_path)[:16]}.npz"
+        if cache_file.exists():
+            return cls.load_compiled(cache_file)
+        taxonomy = cls.from_files(mcc_path, brand_path)
+        try:
+            taxonomy.save_compiled(cache_file)
+        except OSError:
+            pass  # a read-only cache location only costs the parse next time
+        return taxonomy
+
+    def save_compiled(self, path) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write-then-rename so concurrent workers never read a partial file
+        tmp = path.with_name(f"{path.stem}.{os.getpid()}.tmp.npz")
+        np.savez(
+            tmp,
+            pair_t1=self.pair_t1.astype(str), pair_t2=self.pair_t2.astype(str), mcc_table=self.mcc_table,
+            brand_keys=self.brand_index.to_numpy().astype(str), brand_pairs=self.brand_pairs[:-1],
+        )
+        tmp.replace(path)
+        return path
+
+    @classmethod
+    def load_compiled(cls, path) -> "IndustryTaxonomy":
+        with np.load(path, allow_pickle=False) as arrays:
+            return cls(
+                arrays["pair_t1"], arrays["pair_t2"], arrays["mcc_table"],
+                arrays["brand_keys"], arrays["brand_pairs"],
+            )
+
+    def __len__(self) -> int:
+        return int((self.mcc_table[:-1] >= 0).sum()) + len(self.brand_index)
+
+    def classify(self, brand, mcc_code) -> tuple[str | None, str | None]:
+        """Scalar lookup; see the class docstring for precedence."""
+        pair = self._brand_lookup.get(_normalize_brand(brand), -1)
+        if pair < 0:
+            pair = self.mcc_table[_mcc_to_int(mcc_code)]
+        if pair < 0:
+            return (None, None)
+        return (self.pair_t1[pair], self.pair_t2[pair])
+
+    def pair_codes(self, brands: pd.Series, mccs: pd.Series) -> np.ndarray:
+        """int32 pair code per row (-1 when unmapped) for aligned brand and MCC columns."""
+        pair_codes = self.mcc_table[_mcc_codes_to_int(mccs)]
+        # Brand -> pair code via a join on the distinct normalized brand values
+        brand_codes, brand_values = pd.factorize(brands)
+        keys = pd.Index([_normalize_brand(b) for b in brand_values], dtype=object)
+        brand_pair = self.brand_pairs[self.brand_index.get_indexer(keys)]
+        brand_pair = np.append(brand_pair, np.int32(-1))[brand_codes]
+        return np.where(brand_pair >= 0, brand_pair, pair_codes)
+
+    def classify_frame(self, brands, mccs) -> pd.DataFrame:
+        """
+        Vectorized classify() returning categorical `industry_t1_pred` and
+        `industry_t2_pred` columns (NaN where unmapped), indexed like `brands`.
+        """
+        brands = brands if isinstance(brands, pd.Series) else pd.Series(brands, dtype=object)
+        mccs = pd.Series(mccs.array if isinstance(mccs, pd.Series) else mccs, index=brands.index)
+        pair_codes = self.pair_codes(brands, mccs)
+
+        result = {}
+        for pair_labels, column in [(self.pair_t1, "industry_t1_pred"), (self.pair_t2, "industry_t2_pred")]:
+            labels = pd.Index(list(dict.fromkeys(pair_labels)), dtype=object)
+            tier_codes = np.append(labels.get_indexer(pair_labels), -1).astype(np.int32)
+            result[column] = pd.Categorical.from_codes(tier_codes[pair_codes], categories=labels)
+        return pd.DataFrame(result, index=brands.index)
@@ -0,0 +1,188 @@
+"""
+metrics.py
+----------
+Lightweight instrumentation for the enrichment pipeline.
+
+PipelineMetrics records wall and CPU time per named stage plus free-form
+counters (rows, unique merchants, cache hits, ...); stages may be timed
+from several threads at once. Pipeline functions take an optional
+`metrics` argument; when it is None they use NULL_METRICS, whose methods
+do nothing, so disabled instrumentation costs one attribute lookup per
+stage.
+
+LatencyHistogram is the online counterpart: fixed-bucket request latency
+distributions for long-running services.
+"""
+
+import bisect
+import json
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+# Upper bounds (milliseconds) of LatencyHistogram buckets; the last bucket is unbounded
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+class PipelineMetrics:
+    """
+    Per-stage timings and counters for one pipeline run.
+
+    `callback`, if given, is called as callback(stage, record) each time a
+    stage finishes, where `record` holds that call's wall_seconds,
+    cpu_seconds and rows.
+    """
+
+    enabled = True
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.stages: dict[str, dict] = {}
+        self.counters: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _record(self, name: str, wall: float, cpu: float, rows: int | None, calls: int = 1):
+        with self._lock:
+            stage = self.stages.setdefault(name, {"wall_seconds": 0.0, "cpu_seconds": 0.0, "calls": 0, "rows": 0})
+            stage["wall_seconds"] += wall
+            stage["cpu_seconds"] += cpu
+            stage["calls"] += calls
+            stage["rows"] += rows or 0
+
+    @contextmanager
+    def stage(self, name: str, rows: int | None = None):
+        """Time the enclosed block as one call of stage `name`."""
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            self._record(name, wall, cpu, rows)
+            if self.callback is not None:
+                self.callback(name, {"wall_seconds": wall, "cpu_seconds": cpu, "rows": rows})
+
+    def timed_iter(self, name: str, iterable):
+        """Yield from `iterable`, timing each item's production as stage `name`."""
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                item = next(iterator, StopIteration)
+            if item is StopIteration:
+                return
+            if hasattr(item, "__len__"):
+                self._record(name, 0.0, 0.0, len(item), calls=0)
+            yield item
+
+    def add(self, name: str, value: float = 1):
+        """Increment counter `name` by `value`."""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set(self, name: str, value: float):
+        with self._lock:
+            self.counters[name] = value
+
+    def merge(self, other: dict):
+        """Fold in another run's as_dict() output (e.g. from a worker process)."""
+        for name, stage in other.get("stages", {}).items():
+            self._record(name, stage["wall_seconds"], stage["cpu_seconds"], stage["rows"], stage["calls"])
+        for name, value in other.get("counters", {}).items():
+            self.add(name, value)
+
+    def as_dict(self) -> dict:
+        """Stages and counters plus derived rates (rows/sec, cache hit rate, low-confidence share, cascade routing)."""
+        with self._lock:
+            stages = {name: dict(stage) for name, stage in self.stages.items()}
+            counters = dict(self.counters)
+        for stage in stages.values():
+            if stage["rows"] and stage["wall_seconds"] > 0:
+                stage["rows_per_sec"] = stage["rows"] / stage["wall_seconds"]
+
+        derived = {}
+        lookups = counters.get("cache_hits", 0) + counters.get("cache_misses", 0)
+        if lookups:
+            derived["cache_hit_rate"] = counters.get("cache_hits", 0) / lookups
+        if counters.get("rows"):
+            derived["below_threshold_share"] = counters.get("below_threshold_rows", 0) / counters["rows"]
+        routed = {name[len("cascade_"):]: count for name, count in counters.items() if name.startswith("cascade_")}
+        if sum(routed.values()):
+            derived["cascade_routing"] = {stage: count / sum(routed.values()) for stage, count in routed.items()}
+        return {"stages": stages, "counters": counters, "derived": derived}
+
+    def write_json(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.as_dict(), indent=2))
+
+
+class _NullMetrics:
+    """Stand-in used when instrumentation is off; every method is a no-op."""
+
+    enabled = False
+    _context = nullcontext()
+
+    def stage(self, name, rows=None):
+        return self._context
+
+    def timed_iter(self, name, iterable):
+        return iterable
+
+    def add(self, name, value=1):
+        pass
+
+    def set(self, name, value):
+        pass
+
+    def merge(self, other):
+        pass
+
+
+NULL_METRICS = _NullMetrics()
+
+
+class LatencyHistogram:
+    """
+    Fixed-bucket latency distribution, cheap enough to update per request.
+
+    Percentiles are reported as the upper bound of the bucket that holds
+    them, so they are conservative to within one bucket width.
+    """
+
+    def __init__(self, bounds_ms=LATENCY_BUCKETS_MS):
+        self.bounds_ms = tuple(bounds_ms)
+        self.counts = [0] * (len(self.bounds_ms) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, seconds: float):
+        ms = seconds * 1000
+        self.counts[bisect.bisect_left(self.bounds_ms, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, q: float) -> float | None:
+        """Bucket upper bound at quantile `q` (0-100); the max for the open last bucket."""
+        if not self.count:
+            return None
+        rank = q / 100 * self.count
+        seen = 0
+        for bound, count in zip(self.bounds_ms, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def as_dict(self) -> dict:
+        labels = [f"le_{bound}" for bound in self.bounds_ms] + ["inf"]
+        return {
+            "count": self.count,
+            "mean_ms": self.total_ms / self.count if self.count else None,
+            "p50_ms": self.percentile(50),
+            "p90_ms": self.percentile(90),
+            "p99_ms": self.percentile(99),
+            "max_ms": self.max_ms,
+            "buckets": dict(zip(labels, self.counts)),
+        }
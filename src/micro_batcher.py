@@ -0,0 +1,86 @@
+"""
+micro_batcher.py
+----------------
+Coalesces concurrent single-item requests into micro-batches.
+
+Callers await MicroBatcher.submit(item) from an asyncio event loop. Items
+are queued until `max_batch_size` are waiting or the oldest has waited
+`max_wait_ms`, then the whole batch is handed to `process_batch` on a
+single worker thread, so the event loop keeps accepting requests while a
+vectorized model call runs and batches never score concurrently.
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class MicroBatcher:
+    """
+    Async front end for a batch function `process_batch(items) -> results`.
+
+    `process_batch` must return one result per item, in order. If it
+    raises, every caller in that batch receives the exception.
+    `on_batch(size, seconds)`, if given, is called after each batch.
+    """
+
+    def __init__(self, process_batch, max_batch_size: int = 64, max_wait_ms: float = 2.0, on_batch=None):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.on_batch = on_batch
+        self._queue = []
+        self._timer = None
+        self._tasks = set()  # strong references to in-flight dispatches
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="micro-batch")
+
+    async def submit(self, item):
+        """Queue one item and wait for its result."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.append((item, future))
+        if len(self._queue) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    async def run(self, items):
+        """Process `items` as one batch now, on the same worker thread as queued batches."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._timed, items)
+
+    def _timed(self, items):
+        start = time.perf_counter()
+        results = self.process_batch(items)
+        if self.on_batch is not None:
+            self.on_batch(len(items), time.perf_counter() - start)
+        return results
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._queue:
+            batch, self._queue = self._queue[:self.max_batch_size], self._queue[self.max_batch_size:]
+            task = asyncio.ensure_future(self._dispatch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, batch):
+        items = [item for item, _ in batch]
+        try:
+            results = await self.run(items)
+        except Exception as exc:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,167 @@
+"""
+prediction_cache.py
+-------------------
+Persistent on-disk cache of brand predictions keyed by cleaned merchant text.
+
+Entries live in a SQLite file tagged with a fingerprint of the model
+artifact that produced them; opening the cache with a different
+fingerprint (e.g. after retraining) clears it. The cache is bounded and
+evicts least-recently-used entries. The entry count lives in the file's
+meta table, so the bound holds for every process sharing the file, and
+recency updates from lookups are buffered and written in batches so hits
+do not each take the write lock.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+from pathlib import Path
+
+CACHE_MAX_ENTRIES = 1_000_000
+CACHE_TOP_K = 3  # number of (brand, confidence) pairs stored per merchant
+_SQL_BATCH = 900  # stay below SQLite's bound-parameter limit
+TOUCH_FLUSH_SIZE = 4096  # hits buffered before their last_used updates are written
+
+
+def model_fingerprint(path) -> str:
+    """SHA-256 of a model artifact (a file, or every file under a directory)."""
+    path = Path(path)
+    files = sorted(p for p in path.rglob("*") if p.is_file()) if path.is_dir() else [path]
+    digest = hashlib.sha256()
+    for file in files:
+        digest.update(str(file.relative_to(path) if path.is_dir() else file.name).encode())
+        with open(file, "rb") as handle:
+            for block in iter(lambda: handle.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+class PredictionCache:
+    """
+    Bounded LRU map of cleaned merchant text -> (brand, confidence, top_k).
+
+    `top_k` is a list of (brand, confidence) pairs, best first. Hit and miss
+    counts are kept per instance. Safe to share between threads; separate
+    processes can open the same file concurrently.
+    """
+
+    def __init__(self, path, fingerprint: str, max_entries: int = CACHE_MAX_ENTRIES):
+        self.path = Path(path)
+        self.fingerprint = fingerprint
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._touched: dict[str, int] = {}  # merchant -> clock of its latest unwritten hit
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=60, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS predictions ("
+                "merchant TEXT PRIMARY KEY, brand TEXT, confidence REAL, top_k TEXT, last_used INTEGER)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS predictions_lru ON predictions (last_used)")
+
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'fingerprint'").fetchone()
+            if row is None or row[0] != fingerprint:
+                # Predictions from another model are stale
+                self._conn.execute("DELETE FROM predictions")
+                self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('fingerprint', ?)", (fingerprint,))
+                self._conn.execute("DELETE FROM meta WHERE key = 'entries'")
+            self._conn.execute("INSERT OR IGNORE INTO meta SELECT 'entries', COUNT(*) FROM predictions")
+
+        self._clock = self._conn.execute("SELECT COALESCE(MAX(last_used), 0) FROM predictions").fetchone()[0]
+
+    def _entries(self) -> int:
+        return self._conn.execute("SELECT CAST(value AS INTEGER) FROM meta WHERE key = 'entries'").fetchone()[0]
+
+    def _flush_touched(self):
+        """Write buffered hit recency; call with the lock held, inside a transaction."""
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE predictions SET last_used = MAX(last_used, ?) WHERE merchant = ?",
+                ((clock, merchant) for merchant, clock in self._touched.items()),
+            )
+            self._touched.clear()
+
+    def get_many(self, merchants) -> dict:
+        """Look up cleaned merchant strings; returns {merchant: (brand, confidence, top_k)} for hits."""
+        merchants = list(merchants)
+        found = {}
+        with self._lock:
+            for start in range(0, len(merchants), _SQL_BATCH):
+                batch = merchants[start:start + _SQL_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT merchant, brand, confidence, top_k FROM predictions WHERE merchant IN ({placeholders})",
+                    batch,
+                ).fetchall()
+                for merchant, brand, confidence, top_k in rows:
+                    found[merchant] = (brand, confidence, [tuple(pair) for pair in json.loads(top_k)])
+
+            if found:
+                self._clock += 1
+                self._touched.update(dict.fromkeys(found, self._clock))
+                if len(self._touched) >= TOUCH_FLUSH_SIZE:
+                    with self._conn:
+                        self._flush_touched()
+            self.hits += len(found)
+            self.misses += len(merchants) - len(found)
+        return found
+
+    def put_many(self, entries):
+        """Store (merchant, brand, confidence, top_k) tuples, evicting LRU entries past the size bound."""
+        entries = list(entries)
+        if not entries:
+            return
+        with self._lock:
+            # Other processes sharing the file advance the clock too; stay ahead of them
+            latest = self._conn.execute("SELECT COALESCE(MAX(last_used), 0) FROM predictions").fetchone()[0]
+            self._clock = max(self._clock, latest) + 1
+            with self._conn:
+                before = self._conn.total_changes
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO predictions VALUES (?, ?, ?, ?, ?)",
+                    (
+                        (merchant, brand, float(confidence), json.dumps([[b, float(c)] for b, c in top_k]), self._clock)
+                        for merchant, brand, confidence, top_k in entries
+                    ),
+                )
+                # The insert holds the write lock, so the shared count cannot change under us
+                self._conn.execute(
+                    "UPDATE meta SET value = CAST(value AS INTEGER) + ? WHERE key = 'entries'",
+                    (self._conn.total_changes - before,),
+                )
+                self._flush_touched()
+
+                overflow = self._entries() - self.max_entries
+                if overflow > 0:
+                    self._conn.execute(
+                        "DELETE FROM predictions WHERE merchant IN "
+                        "(SELECT merchant FROM predictions ORDER BY last_used LIMIT ?)",
+                        (overflow,),
+                    )
+                    self._conn.execute(
+                        "UPDATE meta SET value = CAST(value AS INTEGER) - ? WHERE key = 'entries'", (overflow,)
+                    )
+
+    def stats(self) -> dict:
+        """Hit/miss counters for this instance plus the current number of entries."""
+        lookups = self.hits + self.misses
+        with self._lock:
+            entries = self._entries()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+        }
+
+    def close(self):
+        with self._lock, self._conn:
+            self._flush_touched()
+        self._conn.close()
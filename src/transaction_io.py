@@ -0,0 +1,291 @@
+"""
+transaction_io.py
+-----------------
+Readers and writers for transaction files in CSV, Parquet and Arrow IPC
+(Feather v2) formats.
+
+Reads project only the columns the enrichment pipeline uses. CSV columns
+are read as text so pass-through fields are written back verbatim;
+columnar inputs get explicit dtypes (categorical location/currency codes,
+integer MCC, datetime TIMESTAMP). Writers append chunk by chunk, one
+Parquet row group / IPC record batch per write. list_transaction_files()
+expands a directory or glob pattern into the input files of a multi-file
+run.
+
+pyarrow's Parquet, IPC and compute modules are imported by the columnar
+code paths on first use, so CSV-only runs and service startup skip them.
+"""
+
+import glob
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# Columns read from raw transaction files
+INPUT_COLUMNS = [
+    "TXN_ID",
+    "RAW_MERCHANT",
+    "MCC_CODE",
+    "AMOUNT",
+    "CURRENCY",
+    "TIMESTAMP",
+    "CITY",
+    "COUNTRY",
+]
+CATEGORICAL_COLUMNS = ["CURRENCY", "COUNTRY", "CITY"]
+
+FORMATS = ("csv", "parquet", "arrow")
+_EXTENSIONS = {
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+    ".ipc": "arrow",
+}
+
+
+def detect_format(path, fmt: str | None = None) -> str:
+    """Return `fmt` if given, otherwise infer the file format from the extension."""
+    if fmt is not None:
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported format {fmt!r}; expected one of {FORMATS}")
+        return fmt
+    suffix = Path(path).suffix.lower()
+    if suffix not in _EXTENSIONS:
+        raise ValueError(f"Cannot infer file format from {path!r}; pass an explicit format")
+    return _EXTENSIONS[suffix]
+
+
+def is_file_pattern(path) -> bool:
+    """True if `path` names a directory or a glob pattern rather than a single file."""
+    return Path(path).is_dir() or glob.has_magic(str(path))
+
+
+def list_transaction_files(pattern, fmt: str | None = None) -> list[Path]:
+    """
+    Transaction files in directory `pattern` (not recursive) or matched by
+    glob `pattern`, sorted by path. Only files whose extension is a known
+    format (`fmt`, when given) are listed.
+    """
+    if Path(pattern).is_dir():
+        candidates = Path(pattern).iterdir()
+    else:
+        candidates = (Path(path) for path in glob.glob(str(pattern), recursive=True))
+    return sorted(
+        path for path in candidates
+        if path.is_file() and _EXTENSIONS.get(path.suffix.lower()) in ((fmt,) if fmt else FORMATS)
+    )
+
+
+def _parsed_or_original(df: pd.DataFrame, column: str, parsed: pd.Series):
+    """Store `parsed` unless it lost values present in `df[column]`; then keep the original and warn."""
+    lost = int((parsed.isna() & df[column].notna()).sum())
+    if lost:
+        warnings.warn(f"{lost:,} {column} values could not be parsed; keeping the column as read")
+        return
+    df[column] = parsed
+
+
+def apply_columnar_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Cast transaction columns to compact explicit dtypes, in place.
+
+    MCC_CODE and TIMESTAMP are only converted when every present value
+    parses; otherwise the column is left as read and a warning says how
+    many values failed, so pass-through data is never silently blanked.
+    """
+    for column in CATEGORICAL_COLUMNS:
+        if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype("category")
+    if "MCC_CODE" in df.columns and not pd.api.types.is_integer_dtype(df["MCC_CODE"].dtype):
+        mcc = pd.to_numeric(df["MCC_CODE"], errors="coerce")
+        _parsed_or_original(df, "MCC_CODE", np.trunc(mcc).astype("Int32"))
+    elif "MCC_CODE" in df.columns:
+        df["MCC_CODE"] = df["MCC_CODE"].astype("Int32")
+    if "TIMESTAMP" in df.columns and not pd.api.types.is_datetime64_any_dtype(df["TIMESTAMP"].dtype):
+        _parsed_or_original(df, "TIMESTAMP", pd.to_datetime(df["TIMESTAMP"], errors="coerce"))
+    return df
+
+
+def _projected(names) -> list[str]:
+    return [column for column in INPUT_COLUMNS if column in names]
+
+
+def _arrow_chunks(table: pa.Table, chunksize: int):
+    for offset in range(0, max(table.num_rows, 1), chunksize):
+        yield apply_columnar_dtypes(table.slice(offset, chunksize).to_pandas())
+
+
+def read_transactions(path, fmt: str | None = None, chunksize: int | None = None):
+    """
+    Read raw transactions from a CSV, Parquet or Arrow IPC file.
+
+    Returns a DataFrame, or an iterator of DataFrames of at most
+    `chunksize` rows when `chunksize` is given.
+    """
+    fmt = detect_format(path, fmt)
+
+    if fmt == "csv":
+        return pd.read_csv(path, dtype=str, usecols=lambda column: column in INPUT_COLUMNS, chunksize=chunksize)
+
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+
+    if fmt == "parquet":
+        parquet = pq.ParquetFile(path)
+        columns = _projected(parquet.schema_arrow.names)
+        if chunksize is None:
+            return apply_columnar_dtypes(parquet.read(columns=columns).to_pandas())
+        if parquet.metadata.num_rows == 0:
+            return _arrow_chunks(parquet.read(columns=columns), chunksize)
+        return (
+            apply_columnar_dtypes(pa.Table.from_batches([batch]).to_pandas())
+            for batch in parquet.iter_batches(batch_size=chunksize, columns=columns)
+        )
+
+    # Arrow IPC file: memory-mapped, so projection and slicing are zero-copy
+    table = ipc.open_file(pa.memory_map(str(path))).read_all()
+    table = table.select(_projected(table.schema.names))
+    if chunksize is None:
+        return apply_columnar_dtypes(table.to_pandas())
+    return _arrow_chunks(table, chunksize)
+
+
+class TransactionWriter:
+    """
+    Incremental writer for enriched transactions.
+
+    Each write() appends one chunk: CSV rows (header on the first chunk),
+    a Parquet row group or an Arrow IPC record batch. The schema is fixed
+    by the first chunk; categoricals are stored as plain values so chunks
+    with different categories stay compatible.
+    """
+
+    def __init__(self, path, fmt: str | None = None):
+        self.path = Path(path)
+        self.format = detect_format(path, fmt)
+        self._handle = None
+        self._writer = None
+        self._schema = None
+
+    def _to_arrow(self, df: pd.DataFrame) -> pa.Table:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        columns = [
+            column.cast(column.type.value_type) if pa.types.is_dictionary(column.type) else column
+            for column in table.columns
+        ]
+        table = pa.Table.from_arrays(columns, names=table.column_names)
+        if self._schema is None:
+            # All-null object columns in the first chunk would otherwise fix a null type
+            self._schema = pa.schema(
+                pa.field(field.name, pa.string()) if pa.types.is_null(field.type) else field
+                for field in table.schema
+            )
+        return table.cast(self._schema)
+
+    def write(self, df: pd.DataFrame):
+        if self.format == "csv":
+            if self._handle is None:
+                self._handle = open(self.path, "w", newline="", encoding="utf-8")
+                df.to_csv(self._handle, index=False)
+            else:
+                df.to_csv(self._handle, header=False, index=False)
+            return
+
+        table = self._to_arrow(df)
+        if self._writer is None:
+            import pyarrow.ipc as ipc
+            import pyarrow.parquet as pq
+
+            if self.format == "parquet":
+                self._writer = pq.ParquetWriter(self.path, self._schema)
+            else:
+                self._writer = ipc.new_file(str(self.path), self._schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._handle is not None:
+            self._handle.close()
+        if self._writer is not None:
+            self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def drop_rows(path, target, column: str, values, fmt: str | None = None) -> bool:
+    """
+    Copy the enriched file `path` to `target` without the rows whose
+    `column`, compared as text, is in `values`. Returns False, writing
+    nothing, when no row matches.
+    """
+    fmt = detect_format(path, fmt)
+    values = pa.array(sorted({str(value) for value in values}), pa.string())
+    if fmt == "csv":
+        drop = pd.read_csv(path, dtype=str, usecols=[column], keep_default_na=False)[column].isin(values.to_pylist())
+        if not drop.any():
+            return False
+        df = pd.read_csv(path, dtype=str, keep_default_na=False)
+        with TransactionWriter(target, fmt) as writer:
+            writer.write(df[~drop.to_numpy()])
+        return True
+
+    import pyarrow.compute as pc
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(path) if fmt == "parquet" else ipc.open_file(pa.memory_map(str(path))).read_all()
+    drop = pc.fill_null(pc.is_in(pc.cast(table[column], pa.string()), value_set=values), False)
+    if not pc.any(drop).as_py():
+        return False
+    table = table.filter(pc.invert(drop))
+    if fmt == "parquet":
+        pq.write_table(table, target)
+    else:
+        with ipc.new_file(str(target), table.schema) as writer:
+            writer.write_table(table)
+    return True
+
+
+def concat_files(paths, output, fmt: str | None = None):
+    """
+    Concatenate enriched files written by TransactionWriter, in order, into
+    `output`. CSV parts are copied byte for byte (keeping only the first
+    header); Parquet and Arrow parts are appended table by table.
+    """
+    paths = [Path(path) for path in paths]
+    fmt = detect_format(output, fmt)
+    if fmt == "csv":
+        with open(output, "wb") as target:
+            for number, path in enumerate(paths):
+                with open(path, "rb") as source:
+                    if number > 0:
+                        source.readline()
+                    for block in iter(lambda: source.read(1 << 20), b""):
+                        target.write(block)
+        return
+
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+
+    writer = None
+    try:
+        for path in paths:
+            if fmt == "parquet":
+                table = pq.read_table(path)
+            else:
+                table = ipc.open_file(pa.memory_map(str(path))).read_all()
+            if writer is None:
+                schema = table.schema
+                writer = pq.ParquetWriter(output, schema) if fmt == "parquet" else ipc.new_file(str(output), schema)
+            writer.write_table(table.cast(schema))
+    finally:
+        if writer is not None:
+            writer.close()
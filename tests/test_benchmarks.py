@@ -0,0 +1,20 @@
+from benchmarks.run_benchmarks import build_input, compare_results
+
+
+def _report(rows_per_sec):
+    return {"results": [{"rows": 1000, "stages": {"predict_brands": {"rows_per_sec": rows_per_sec}}}]}
+
+
+def test_compare_results_flags_regressions_beyond_threshold():
+    baseline = _report(1000.0)
+
+    assert compare_results(_report(950.0), baseline, threshold=0.10) == []
+    assert len(compare_results(_report(800.0), baseline, threshold=0.10)) == 1
+
+
+def test_build_input_is_deterministic_and_bounded_by_cardinality():
+    first = build_input(200, cardinality=20, seed=7)
+
+    assert len(first) == 200
+    assert first["RAW_MERCHANT"].nunique() <= 20
+    assert first.equals(build_input(200, cardinality=20, seed=7))
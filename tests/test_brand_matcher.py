@@ -1,5 +1,12 @@
+import pandas as pd
 import pytest
-from src.brand_matcher import clean_merchant_name, match_brand
+from src.brand_matcher import (
+    BrandMatcher,
+    clean_merchant_name,
+    clean_merchant_name_cached,
+    clean_merchant_names,
+    match_brand,
+)
 
 def test_clean_merchant_name_basic():
     assert clean_merchant_name("STARBUCKS #123!") == "starbucks"
@@ -16,3 +23,26 @@ def test_match_brand_fuzzy():
 
 def test_match_brand_none():
     assert match_brand("randomshop") is None
+
+def test_clean_merchant_names_matches_scalar():
+    names = pd.Series(["STARBUCKS #123!", "  McDonalds   TST  ", None, "STARBUCKS #123!", 42])
+
+    result = clean_merchant_names(names)
+
+    assert list(result) == [clean_merchant_name(name) for name in names]
+    assert result.index.equals(names.index)
+
+def test_clean_merchant_name_cached():
+    assert clean_merchant_name_cached("STARBUCKS #123!") == "starbucks"
+    assert clean_merchant_name_cached(None) == ""
+
+def test_brand_matcher_leading_words_and_scores():
+    matcher = BrandMatcher.from_brands(["Starbucks", "Apple Store", "Other"])
+
+    assert matcher.match("STARBUCKS Lake Joshuabury") == ("Starbucks", 1.0)
+    assert matcher.match("Appl*e Store #12") == ("Apple Store", 1.0)
+    assert matcher.match("Other") == (None, 0.0)
+
+    brands, scores = matcher.match_many(["starbks", None, "starbks"])
+    assert list(brands) == ["Starbucks", None, "Starbucks"]
+    assert 0 < scores[0] < 1 and scores[1] == 0
@@ -0,0 +1,52 @@
+import joblib
+import numpy as np
+
+import categorize_transactions
+from src.candidate_index import BrandCandidateIndex
+
+BRANDS = ["Starbucks", "Shell", "Grab", "Apple Store", "Guardian"]
+SUFFIXES = ["", "mall", "hq", "tst", "central", "north point", "orchard", "jurong east"]
+OTHERS = ["decker inc", "cruz plc", "williams ltd", "hahn group", "lopez and sons", "kim llc", "patel co"]
+
+
+def _fit():
+    texts = [f"{brand.lower()} {suffix}".strip() for brand in BRANDS for suffix in SUFFIXES] * 3 + OTHERS * 6
+    labels = [brand for brand in BRANDS for _ in SUFFIXES] * 3 + ["Other"] * (len(OTHERS) * 6)
+    return BrandCandidateIndex().fit(texts, labels, rerank_fraction=0.3)
+
+
+def test_candidate_index_top_k_and_proba():
+    index = _fit()
+    assert list(index.classes_) == sorted([*BRANDS, "Other"])
+
+    queries = ["starbucks tampines", "apple storemall", "guardian hq", "zzzz", ""]
+    indices, confidences = index.top_k(queries, 3)
+    assert indices.shape == confidences.shape == (5, 3)
+    assert list(index.classes_[indices[:3, 0]]) == ["Starbucks", "Apple Store", "Guardian"]
+    assert (confidences[:3, 0] > 0.5).all()
+    # No brand shares n-grams with these: only the "Other" remainder is a candidate
+    assert list(index.classes_[indices[3:, 0]]) == ["Other", "Other"]
+    assert (indices[3:, 1:] == -1).all() and np.isnan(confidences[3:, 1:]).all()
+
+    proba = index.predict_proba(queries)
+    assert proba.shape == (5, len(index.classes_))
+    assert np.allclose(proba.sum(axis=1), 1.0)
+    assert (proba.argmax(axis=1) == indices[:, 0]).all()
+
+
+def test_candidate_index_plugs_into_pipeline(tmp_path):
+    path = tmp_path / "index.joblib"
+    joblib.dump(_fit(), path)
+
+    previous = categorize_transactions.MODEL_PATH
+    categorize_transactions.set_model_path(path)
+    try:
+        brands, _ = categorize_transactions.predict_brands(["SHELL #12", "GRAB HQ", None])
+        top = categorize_transactions.predict_top_k("Starbucks Orchard", k=3)
+        _, _, labels = categorize_transactions.predict_top_k_batch(["zzzz"], k=2)
+    finally:
+        categorize_transactions.set_model_path(previous)
+
+    assert list(brands) == ["Shell", "Grab", None]
+    assert top[0][0] == "Starbucks" and len(top) <= 3
+    assert list(labels[0]) == ["Other", None]
@@ -0,0 +1,111 @@
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+
+import categorize_transactions
+from scripts import train_brand_classifier as training
+from src.cascade_model import CascadeBrandModel
+from src.metrics import PipelineMetrics
+
+BRANDS = ["starbucks", "shell", "grab", "guardian"]
+SUFFIXES = ["", "mall", "hq", "tst", "123", "x", "y", "z", "sg", "central", "east", "west"]
+
+
+def _training_frame():
+    rows = [(f"{brand} {suffix}".strip(), brand) for brand in BRANDS for suffix in SUFFIXES]
+    rows += [(text, "Other") for text in ["decker inc", "cruz plc", "hahn group", "kim llc", "patel co", "lee bros"] * 2]
+    return pd.DataFrame(rows, columns=["cleaned", "BRAND"])
+
+
+def _fit_pipeline(df):
+    model = Pipeline([
+        ("tfidf", TfidfVectorizer(analyzer="char", ngram_range=(3, 5))),
+        ("calibrated_clf", CalibratedClassifierCV(LogisticRegression(max_iter=1000), cv=3, method="isotonic")),
+    ])
+    return model.fit(df["cleaned"], df["BRAND"])
+
+
+def test_cascade_routes_by_margin_and_escalates_to_full_model():
+    df = _training_frame()
+    model = _fit_pipeline(df)
+    texts = ["starbucks orchard", "shel", "grab hq", "", "unknown merchant", "guardian mall"]
+
+    everything = CascadeBrandModel(model, margin=1.0).fit(df["cleaned"], df["BRAND"])
+    proba, routes = everything.route(texts)
+    assert routes == {"fast": 0, "escalated": len(texts)}
+    np.testing.assert_allclose(proba, model.predict_proba(texts))
+
+    nothing = CascadeBrandModel(model, margin=0.0, min_agreement=0.0).fit(df["cleaned"], df["BRAND"])
+    proba, routes = nothing.route(texts)
+    assert routes == {"fast": len(texts), "escalated": 0}
+    assert (proba.argmax(axis=1) == nothing._fast_proba(model.named_steps["tfidf"].transform(texts)).argmax(axis=1)).all()
+    assert (proba.max(axis=1) <= 1.0).all()
+
+
+def test_cascade_agrees_with_full_model_on_holdout():
+    df = _training_frame()
+    model = _fit_pipeline(df)
+    cascade = CascadeBrandModel(model).fit(df["cleaned"], df["BRAND"])
+    texts = [f"{brand} {suffix}" for brand in BRANDS for suffix in ["orchard", "jurong", "#9", "north point"]]
+
+    report = training.evaluate_cascade(cascade, model, texts, [brand for brand in BRANDS for _ in range(4)])
+
+    assert sum(report["routing"].values()) == 1.0
+    assert report["brand_agreement"] >= 0.95
+    assert report["cascade_accuracy"] >= report["full_accuracy"] - 0.05
+
+
+def test_out_of_fold_fit_escalates_likely_disagreements():
+    # Look-alike brands plus degraded copies of every training text, as in real card descriptors
+    brands = ["star mart", "starbucks", "shell", "shell select", "grab", "grabfood"]
+    df = pd.DataFrame(
+        [(f"{brand} {suffix}".strip(), brand) for brand in brands for suffix in SUFFIXES], columns=["cleaned", "BRAND"]
+    )
+    df = pd.concat([df, df.assign(cleaned=training.degrade_texts(df["cleaned"]))], ignore_index=True)
+    model = _fit_pipeline(df)
+    texts = training.degrade_texts([f"{brand} {suffix}" for brand in brands for suffix in ["orchard", "jurong", "#9"]], seed=1)
+    labels = [brand for brand in brands for _ in range(3)]
+
+    cascade = CascadeBrandModel(model).fit(df["cleaned"], df["BRAND"])
+
+    report = training.evaluate_cascade(cascade, model, texts, labels)
+
+    assert 0 < report["routing"]["escalated"] < 1
+    assert report["brand_agreement"] >= 0.95
+
+
+def test_cascade_routing_is_counted_in_pipeline_metrics(tmp_path):
+    path = tmp_path / "cascade.joblib"
+    joblib.dump(CascadeBrandModel(_fit_pipeline(_training_frame())).fit(_training_frame()["cleaned"]), path)
+    metrics = PipelineMetrics()
+
+    previous = categorize_transactions.MODEL_PATH
+    categorize_transactions.set_model_path(path)
+    try:
+        categorize_transactions.predict_brands(["STARBUCKS #1", "GRAB HQ", "GRAB HQ", None], metrics=metrics)
+    finally:
+        categorize_transactions.set_model_path(previous)
+
+    report = metrics.as_dict()
+    assert report["counters"]["cascade_fast"] + report["counters"]["cascade_escalated"] == 2
+    assert sum(report["derived"]["cascade_routing"].values()) == 1.0
+
+
+def test_cascade_saved_before_agreement_maps_still_routes(tmp_path):
+    df = _training_frame()
+    model = _fit_pipeline(df)
+    cascade = CascadeBrandModel(model).fit(df["cleaned"], df["BRAND"])
+    del cascade.agreement_map, cascade.min_agreement
+    joblib.dump(cascade, tmp_path / "old.joblib")
+
+    with pytest.warns(UserWarning, match="predates agreement escalation"):
+        old = joblib.load(tmp_path / "old.joblib")
+    proba, routes = old.route(["starbucks orchard", "shel", ""])
+
+    assert sum(routes.values()) == 3
+    assert proba.shape == (3, len(model.classes_))
@@ -1,5 +1,21 @@
+import numpy as np
 import pandas as pd
-from categorize_transactions import categorize_transactions
+
+from categorize_transactions import (
+    assign_brands,
+    load_brand_model,
+    categorize_transactions,
+    categorize_transactions_parallel,
+    main,
+    predict_brand,
+    predict_brands,
+    predict_top_k,
+    predict_top_k_batch,
+    threshold_brands,
+    top_k_indices,
+)
+from src.brand_matcher import BrandMatcher
+from src.prediction_cache import PredictionCache
 
 def test_pipeline_basic():
     df = pd.DataFrame({
@@ -17,3 +33,134 @@ def test_pipeline_basic():
     assert result.loc[0, "brand_pred"].lower() == "starbucks"
     assert result.loc[0, "industry_t1_pred"] == "Food & Beverage"
     assert result.loc[0, "industry_t2_pred"] == "Coffee Shops"
+
+def test_predict_brands_matches_single_predictions():
+    texts = ["STARBUCKS #123", "McDonalds TST", "STARBUCKS #123", "", None]
+
+    brands, confidences = predict_brands(texts)
+
+    assert len(brands) == len(confidences) == len(texts)
+    assert brands[0] == brands[2] == predict_brand(texts[0])
+    assert brands[1] == predict_brand(texts[1])
+    assert confidences[0] == confidences[2]
+    assert brands[3] is None and brands[4] is None
+    assert np.isnan(confidences[3]) and np.isnan(confidences[4])
+
+def test_top_k_indices_matches_full_sort():
+    rng = np.random.default_rng(0)
+    proba = rng.random((50, 12))
+
+    for k in (1, 3, 12):
+        expected = np.argsort(-proba, axis=1, kind="stable")[:, :k]
+        assert np.array_equal(top_k_indices(proba, k), expected)
+    assert top_k_indices(proba, 3).dtype == np.int32
+
+def test_predict_top_k_batch_matches_single_predictions():
+    texts = ["STARBUCKS #123", "McDonalds TST", "", None, "STARBUCKS #123"]
+
+    indices, confidences, labels = predict_top_k_batch(texts, k=3)
+
+    assert indices.shape == confidences.shape == labels.shape == (5, 3)
+    assert indices.dtype == np.int32 and confidences.dtype == np.float32
+    for row in (0, 1):
+        single = predict_top_k(texts[row], k=3)
+        assert list(labels[row]) == [brand for brand, _ in single]
+        assert np.allclose(confidences[row], [confidence for _, confidence in single])
+    assert (indices[2:4] == -1).all() and labels[3, 0] is None
+    assert np.array_equal(indices[0], indices[4])
+
+def test_assign_brands_applies_threshold():
+    texts = ["STARBUCKS #123", "", None]
+
+    brands, confidences = assign_brands(texts, threshold=0.0)
+    assert brands[0].lower() == "starbucks" and brands[1] is None and brands[2] is None
+
+    brands, _ = assign_brands(texts, threshold=1.01)
+    assert brands[0] == "Other"
+
+def test_threshold_brands_rederives_from_cached_scores():
+    indices, confidences, labels = predict_top_k_batch(["STARBUCKS #123", "McDonalds TST", None], k=1)
+
+    for threshold in (0.0, 0.5, 1.01):
+        brands, _ = assign_brands(["STARBUCKS #123", "McDonalds TST", None], threshold=threshold)
+        assert list(threshold_brands(indices[:, 0], confidences[:, 0], threshold)) == list(brands)
+
+def test_chunked_mode_matches_in_memory(tmp_path):
+    input_file = tmp_path / "raw.csv"
+    pd.DataFrame({
+        "TXN_ID": range(1, 8),
+        "RAW_MERCHANT": ["STARBUCKS #1", "Shel*l", "", "McDonalds TST", "GRAB", "STARBUCKS #1", "Guardian"],
+        "MCC_CODE": [5814, 5541, 5411, None, 4121, 5814, 5912],
+        "AMOUNT": [1.5, 2.0, 3.25, 4.0, 5.0, 6.0, 7.0],
+    }).to_csv(input_file, index=False)
+
+    main(str(input_file), str(tmp_path / "in_memory.csv"))
+    main(str(input_file), str(tmp_path / "chunked.csv"), chunksize=3)
+
+    assert (tmp_path / "chunked.csv").read_bytes() == (tmp_path / "in_memory.csv").read_bytes()
+
+def test_parallel_matches_serial():
+    df = pd.DataFrame({
+        "TXN_ID": range(1, 7),
+        "RAW_MERCHANT": ["STARBUCKS #1", "Shel*l", "GRAB", "McDonalds TST", "FAIRPRICE #9", "Guardian"],
+        "MCC_CODE": [5814, 5541, 4121, 5814, 5411, 5912],
+    })
+
+    result = categorize_transactions_parallel(df, workers=2, chunksize=2)
+
+    pd.testing.assert_frame_equal(result, categorize_transactions(df.copy()))
+
+def test_predict_brands_with_cache(tmp_path):
+    cache = PredictionCache(tmp_path / "cache.sqlite", "test-model")
+    texts = ["STARBUCKS #123", "McDonalds TST", "starbucks"]
+
+    first = predict_brands(texts, cache=cache)
+    second = predict_brands(texts, cache=cache)
+
+    assert list(first[0]) == list(second[0])
+    assert np.allclose(first[1], second[1])
+    assert cache.hits == 2 and cache.misses == 2
+
+def test_predict_top_k_batch_shares_the_prediction_cache(tmp_path):
+    cache = PredictionCache(tmp_path / "cache.sqlite", "test-model")
+    texts = ["STARBUCKS #123", "McDonalds TST", None]
+    uncached = predict_top_k_batch(texts, k=2)
+
+    predict_brands(texts[:1], cache=cache)
+    first = predict_top_k_batch(texts, k=2, cache=cache)
+    second = predict_top_k_batch(texts, k=2, cache=cache)
+    brands, _ = assign_brands(texts, threshold=0.0, cache=cache)
+
+    assert (cache.hits, cache.misses) == (1 + 2 + 2, 1 + 1)
+    for result in (first, second):
+        # Which of several tied lower-ranked classes is listed may differ with k (see top_k_indices)
+        assert np.array_equal(result[0][:, 0], uncached[0][:, 0]) and list(result[2][:, 0]) == list(uncached[2][:, 0])
+        assert np.allclose(result[1][:2], uncached[1][:2])
+    assert list(brands[:2]) == list(uncached[2][:2, 0])
+
+def test_dictionary_fast_path_skips_model_for_known_brands():
+    matcher = BrandMatcher.from_brands(["Starbucks", "McDonalds"])
+
+    brands, confidences = predict_brands(["STARBUCKS #123", "McDonalds TST", "FAIRPRICE #9"], matcher=matcher)
+
+    assert list(brands[:2]) == ["Starbucks", "McDonalds"]
+    assert list(confidences[:2]) == [1.0, 1.0]
+    assert brands[2] == predict_brand("FAIRPRICE #9")
+
+def test_compact_output_matches_default_without_copying():
+    df = pd.DataFrame({
+        "TXN_ID": range(1, 6),
+        "RAW_MERCHANT": ["STARBUCKS #1", "Shel*l", "", None, "GRAB"],
+        "MCC_CODE": [5814, 5541, 5411, None, 4121],
+        "AMOUNT": [1.5, 2.0, 3.25, 4.0, 5.0],
+    })
+    amount = df["AMOUNT"].to_numpy()
+
+    expected = categorize_transactions(df.copy())
+    result = categorize_transactions(df, compact_output=True, copy=False)
+
+    assert result["cleaned_merchant"].dtype == "string[pyarrow]"
+    assert list(result["brand_pred"].cat.categories) == list(load_brand_model().classes_)
+    assert isinstance(result["industry_t1_pred"].dtype, pd.CategoricalDtype)
+    assert np.shares_memory(result["AMOUNT"].to_numpy(), amount)
+    assert result.to_csv(index=False) == expected.to_csv(index=False)
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+
+from src.compact_model import CompactBrandModel, export_compact_model
+
+BRANDS = ["starbucks", "shell", "grab"]
+
+
+def _fit_pipeline(brands):
+    texts = [f"{brand} {suffix}" for brand in brands for suffix in ["", "mall", "hq", "tst", "123", "x", "y", "z", "sg"]]
+    labels = [brand for brand in brands for _ in range(9)]
+    model = Pipeline([
+        ("tfidf", TfidfVectorizer(analyzer="char", ngram_range=(3, 5))),
+        ("calibrated_clf", CalibratedClassifierCV(LogisticRegression(max_iter=1000), cv=3, method="isotonic")),
+    ])
+    return model.fit(texts, labels)
+
+
+@pytest.mark.parametrize("brands", [BRANDS, BRANDS[:2]])
+def test_compact_model_matches_pipeline(tmp_path, brands):
+    model = _fit_pipeline(brands)
+    texts = ["starbucks tst", "shel", "grab hq", "", "unknown merchant"]
+
+    export_compact_model(model, tmp_path / "compact")
+    compact = CompactBrandModel.load(tmp_path / "compact")
+
+    assert list(compact.classes_) == list(model.classes_)
+    np.testing.assert_allclose(compact.predict_proba(texts), model.predict_proba(texts), atol=1e-5)
+    assert list(compact.predict(texts)) == list(model.predict(texts))
@@ -0,0 +1,143 @@
+import asyncio
+import json
+
+from enrichment_server import EnrichmentServer, enrich_records
+from src.micro_batcher import MicroBatcher
+
+
+def test_micro_batcher_coalesces_concurrent_requests():
+    batch_sizes = []
+
+    def double(items):
+        batch_sizes.append(len(items))
+        return [item * 2 for item in items]
+
+    async def run():
+        batcher = MicroBatcher(double, max_batch_size=4, max_wait_ms=50)
+        try:
+            return await asyncio.gather(*(batcher.submit(i) for i in range(10)))
+        finally:
+            batcher.close()
+
+    assert asyncio.run(run()) == [i * 2 for i in range(10)]
+    assert batch_sizes == [4, 4, 2]
+
+
+def test_micro_batcher_propagates_errors():
+    def fail(items):
+        raise RuntimeError("boom")
+
+    async def run():
+        batcher = MicroBatcher(fail, max_batch_size=2, max_wait_ms=1)
+        try:
+            return await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+        finally:
+            batcher.close()
+
+    assert all(isinstance(result, RuntimeError) for result in asyncio.run(run()))
+
+
+def test_enrich_records_returns_brand_and_industry():
+    results = enrich_records([
+        {"txn_id": 1, "merchant": "STARBUCKS #123", "mcc": 5814},
+        {"merchant": "", "mcc": None},
+    ])
+
+    assert results[0]["txn_id"] == 1
+    assert results[0]["brand"].lower() == "starbucks"
+    assert results[0]["top_k"][0]["brand"] == results[0]["brand"]
+    assert results[0]["industry_t2"] == "Coffee Shops"
+    assert results[1]["brand"] is None and results[1]["industry_t1"] is None
+
+
+async def _request(port, method, path, payload=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps(payload).encode() if payload is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: test\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode()
+        + body
+    )
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, data = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(data)
+
+
+def test_server_single_bulk_and_metrics_endpoints():
+    async def run():
+        server = EnrichmentServer(max_batch_size=8, max_wait_ms=5)
+        listener = await server.start(port=0)
+        port = listener.sockets[0].getsockname()[1]
+        try:
+            singles = await asyncio.gather(*(
+                _request(port, "POST", "/enrich", {"merchant": "STARBUCKS #1", "mcc": 5814}) for _ in range(5)
+            ))
+            bulk = await _request(port, "POST", "/enrich/bulk", {"transactions": [{"merchant": "Shell 42", "mcc": 5541}]})
+            bad = await _request(port, "POST", "/enrich", {"mcc": 5814})
+            missing = await _request(port, "GET", "/nope")
+            metrics = await _request(port, "GET", "/metrics")
+        finally:
+            listener.close()
+            await listener.wait_closed()
+            server.batcher.close()
+        return singles, bulk, bad, missing, metrics
+
+    singles, bulk, bad, missing, metrics = asyncio.run(run())
+
+    assert all(status == 200 and result["brand"].lower() == "starbucks" for status, result in singles)
+    assert bulk[0] == 200 and len(bulk[1]["results"]) == 1
+    assert bad[0] == 400 and missing[0] == 404
+    assert metrics[1]["latency_ms"]["enrich"]["count"] == 5
+    assert metrics[1]["batches"] < 6  # the five singles shared batches
+
+
+def test_server_answers_unexpected_errors_and_wrong_methods():
+    def broken_model(records):
+        raise RuntimeError("model exploded")
+
+    async def run():
+        server = EnrichmentServer(max_batch_size=8, max_wait_ms=1)
+        server.batcher.close()
+        server.batcher = MicroBatcher(broken_model, max_batch_size=8, max_wait_ms=1)
+        listener = await server.start(port=0)
+        port = listener.sockets[0].getsockname()[1]
+        try:
+            failed = await _request(port, "POST", "/enrich", {"merchant": "STARBUCKS #1"})
+            health = await _request(port, "POST", "/health")
+            metrics = await _request(port, "DELETE", "/metrics")
+        finally:
+            listener.close()
+            await listener.wait_closed()
+            server.batcher.close()
+        return failed, health, metrics
+
+    failed, health, metrics = asyncio.run(run())
+
+    assert failed == (500, {"error": "Internal server error"})
+    assert health[0] == metrics[0] == 405
+
+
+def test_server_rejects_malformed_fields_without_failing_the_batch():
+    async def run():
+        server = EnrichmentServer(max_batch_size=8, max_wait_ms=20)
+        listener = await server.start(port=0)
+        port = listener.sockets[0].getsockname()[1]
+        try:
+            return await asyncio.gather(
+                _request(port, "POST", "/enrich", {"merchant": ["x"]}),
+                _request(port, "POST", "/enrich", {"merchant": "GRAB", "mcc": {"a": 1}}),
+                _request(port, "POST", "/enrich", {"merchant": "STARBUCKS #1", "mcc": 5814}),
+                _request(port, "POST", "/enrich/bulk", {"transactions": [{"merchant": "GRAB"}, {"merchant": 7}]}),
+            )
+        finally:
+            listener.close()
+            await listener.wait_closed()
+            server.batcher.close()
+
+    bad_merchant, bad_mcc, good, bulk = asyncio.run(run())
+
+    assert bad_merchant == (400, {"error": "'merchant' must be a string or null"})
+    assert bad_mcc == (400, {"error": "'mcc' must be a number, a string or null"})
+    assert good[0] == 200 and good[1]["brand"].lower() == "starbucks"
+    assert bulk == (400, {"error": "transactions[1]: 'merchant' must be a string or null"})
@@ -0,0 +1,149 @@
+import pandas as pd
+import pytest
+
+from categorize_transactions import main
+from src.enrichment_state import EnrichmentState
+
+MERCHANTS = ["STARBUCKS #1", "Shel*l", "", "McDonalds TST", "GRAB", "STARBUCKS #1", "Guardian"]
+
+
+def _raw(path, txn_ids):
+    pd.DataFrame({
+        "TXN_ID": txn_ids,
+        "RAW_MERCHANT": [MERCHANTS[i % len(MERCHANTS)] for i in txn_ids],
+        "MCC_CODE": [5814] * len(txn_ids),
+    }).to_csv(path, index=False)
+
+
+def test_state_tracks_txn_ids_per_model(tmp_path):
+    state = EnrichmentState(tmp_path / "state.sqlite", "model-a")
+    state.commit_chunk("out.csv", "run", 0, ["1", "2"], "part-000000.csv")
+
+    # Staged by the run, but only enriched once its output is assembled
+    assert list(state.pending_mask(["1", "2", "3"], "out.csv")) == [False, False, True]
+    assert list(state.pending_mask(["1", "2", "3"])) == [True, True, True]
+    assert state.completed_chunks("out.csv", "run") == {0: "part-000000.csv"}
+    state.finish_run("out.csv")
+    assert list(state.pending_mask(["1", "2", "3"])) == [False, False, True]
+    assert state.completed_chunks("out.csv", "other-run") == {}
+    state.close()
+
+    other = EnrichmentState(tmp_path / "state.sqlite", "model-b")
+    assert list(other.pending_mask(["1", "2"])) == [True, True]
+    assert other.stats() == {"enriched": 2, "current_model": 0}
+
+
+def test_killed_run_resumes_from_checkpoint(tmp_path, monkeypatch):
+    input_file = tmp_path / "raw.csv"
+    _raw(input_file, list(range(1, 11)))
+    main(str(input_file), str(tmp_path / "full.csv"), chunksize=3)
+
+    commit_chunk = EnrichmentState.commit_chunk
+    committed = []
+
+    def crash_after_first_chunk(self, output, key, chunk, txn_ids, part):
+        if committed:
+            raise KeyboardInterrupt
+        commit_chunk(self, output, key, chunk, txn_ids, part)
+        committed.append(chunk)
+
+    state = str(tmp_path / "state.sqlite")
+    output = tmp_path / "incremental.csv"
+    monkeypatch.setattr(EnrichmentState, "commit_chunk", crash_after_first_chunk)
+    with pytest.raises(KeyboardInterrupt):
+        main(str(input_file), str(output), chunksize=3, incremental=True, state_path=state)
+    monkeypatch.setattr(EnrichmentState, "commit_chunk", commit_chunk)
+    assert not output.exists()
+
+    main(str(input_file), str(output), chunksize=3, incremental=True, state_path=state)
+
+    assert output.read_bytes() == (tmp_path / "full.csv").read_bytes()
+    assert not (tmp_path / "incremental.csv.parts").exists()
+
+
+def test_rerun_enriches_only_new_rows(tmp_path):
+    input_file = tmp_path / "raw.csv"
+    state = str(tmp_path / "state.sqlite")
+    _raw(input_file, list(range(1, 6)))
+    main(str(input_file), str(tmp_path / "first.csv"), chunksize=2, incremental=True, state_path=state)
+
+    _raw(input_file, list(range(1, 9)))
+    main(str(input_file), str(tmp_path / "second.csv"), chunksize=2, incremental=True, state_path=state)
+    main(str(input_file), str(tmp_path / "third.csv"), chunksize=2, incremental=True, state_path=state)
+
+    assert list(pd.read_csv(tmp_path / "first.csv")["TXN_ID"]) == [1, 2, 3, 4, 5]
+    assert list(pd.read_csv(tmp_path / "second.csv")["TXN_ID"]) == [6, 7, 8]
+    assert not (tmp_path / "third.csv").exists()
+
+
+def test_new_drop_before_resume_does_not_lose_checkpointed_rows(tmp_path, monkeypatch):
+    input_file = tmp_path / "raw.csv"
+    state_path = str(tmp_path / "state.sqlite")
+    output = tmp_path / "incremental.csv"
+    _raw(input_file, list(range(1, 11)))
+
+    commit_chunk = EnrichmentState.commit_chunk
+    committed = []
+
+    def crash_after_first_chunk(self, output, key, chunk, txn_ids, part):
+        if committed:
+            raise KeyboardInterrupt
+        commit_chunk(self, output, key, chunk, txn_ids, part)
+        committed.append(chunk)
+
+    monkeypatch.setattr(EnrichmentState, "commit_chunk", crash_after_first_chunk)
+    with pytest.raises(KeyboardInterrupt):
+        main(str(input_file), str(output), chunksize=3, incremental=True, state_path=state_path)
+    monkeypatch.setattr(EnrichmentState, "commit_chunk", commit_chunk)
+
+    _raw(input_file, list(range(1, 13)))  # the next append-only drop lands before the rerun
+    main(str(input_file), str(output), chunksize=3, incremental=True, state_path=state_path)
+
+    assert list(pd.read_csv(output)["TXN_ID"]) == list(range(1, 13))
+    state = EnrichmentState(state_path, "unused")
+    assert state.stats()["enriched"] == 12
+    state.close()
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".parquet"])
+def test_reruns_append_to_the_same_output(tmp_path, suffix):
+    input_file = tmp_path / "raw.csv"
+    state = str(tmp_path / "state.sqlite")
+    output = tmp_path / f"incremental{suffix}"
+    _raw(input_file, list(range(1, 15)))
+    main(str(input_file), str(tmp_path / f"full{suffix}"), chunksize=3)
+
+    _raw(input_file, list(range(1, 11)))
+    main(str(input_file), str(output), chunksize=3, incremental=True, state_path=state)
+    _raw(input_file, list(range(1, 15)))  # the next append-only drop
+    main(str(input_file), str(output), chunksize=3, incremental=True, state_path=state)
+    appended = output.read_bytes()
+    main(str(input_file), str(output), chunksize=3, incremental=True, state_path=state)
+
+    assert output.read_bytes() == appended  # nothing new: the output is left as it was
+    if suffix == ".csv":
+        assert appended == (tmp_path / "full.csv").read_bytes()
+    else:
+        pd.testing.assert_frame_equal(pd.read_parquet(output), pd.read_parquet(tmp_path / "full.parquet"))
+
+
+def test_crash_after_the_output_is_replaced_does_not_duplicate_rows(tmp_path, monkeypatch):
+    input_file = tmp_path / "raw.csv"
+    state = str(tmp_path / "state.sqlite")
+    output = tmp_path / "incremental.csv"
+    _raw(input_file, list(range(1, 6)))
+    main(str(input_file), str(output), chunksize=2, incremental=True, state_path=state)
+    _raw(input_file, list(range(1, 9)))
+
+    finish_run = EnrichmentState.finish_run
+
+    def crash(self, output):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(EnrichmentState, "finish_run", crash)
+    with pytest.raises(KeyboardInterrupt):
+        main(str(input_file), str(output), chunksize=2, incremental=True, state_path=state)
+    monkeypatch.setattr(EnrichmentState, "finish_run", finish_run)
+    main(str(input_file), str(output), chunksize=2, incremental=True, state_path=state)
+
+    assert list(pd.read_csv(output)["TXN_ID"]) == list(range(1, 9))
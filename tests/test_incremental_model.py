@@ -0,0 +1,51 @@
+import joblib
+import numpy as np
+
+import categorize_transactions
+from src.incremental_model import IncrementalBrandModel
+
+SUFFIXES = ["", "mall", "hq", "tst", "123", "x", "y", "z", "sg", "central"]
+
+
+def _examples(brands):
+    texts = [f"{brand} {suffix}".strip() for brand in brands for suffix in SUFFIXES]
+    labels = [brand for brand in brands for _ in SUFFIXES]
+    return texts, labels
+
+
+def _train(model, brands, epochs=5):
+    texts, labels = _examples(brands)
+    for _ in range(epochs):
+        model.partial_fit(texts, labels)
+    model.add_holdout(texts, labels)
+    return model.calibrate()
+
+
+def test_incremental_model_learns_and_adds_new_brands():
+    model = _train(IncrementalBrandModel(n_features=2**12), ["starbucks", "shell"])
+    assert list(model.classes_) == ["shell", "starbucks"]
+    assert model.predict(["starbucks tst"])[0] == "starbucks"
+
+    _train(model, ["grab", "starbucks", "shell"])
+
+    assert list(model.classes_) == ["grab", "shell", "starbucks"]
+    assert list(model.predict(["grab hq", "shell mall", "starbucks x"])) == ["grab", "shell", "starbucks"]
+    proba = model.predict_proba(["grab hq", ""])
+    assert proba.shape == (2, 3)
+    assert np.allclose(proba.sum(axis=1), 1.0)
+
+
+def test_incremental_artifact_loads_in_pipeline(tmp_path):
+    model = _train(IncrementalBrandModel(n_features=2**12), ["starbucks", "shell", "grab"])
+    path = tmp_path / "incremental.joblib"
+    joblib.dump(model, path)
+
+    previous = categorize_transactions.MODEL_PATH
+    categorize_transactions.set_model_path(path)
+    try:
+        brands, confidences = categorize_transactions.predict_brands(["GRAB #12", "Shell HQ"])
+    finally:
+        categorize_transactions.set_model_path(previous)
+
+    assert list(brands) == ["grab", "shell"]
+    assert (confidences > 0.5).all()
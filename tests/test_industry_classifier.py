@@ -1,5 +1,6 @@
+import pandas as pd
 import pytest
-from src.industry_classifier import classify_industry
+from src.industry_classifier import classify_industry, classify_industry_frame
 
 def test_classify_by_brand():
     result = classify_industry("Starbucks", None)
@@ -17,3 +18,18 @@ def test_brand_precedence_over_mcc():
 def test_unknown_mcc_and_brand():
     result = classify_industry("UnknownBrand", 9999)
     assert result == (None, None)
+
+def test_classify_industry_frame_matches_scalar():
+    brands = ["Starbucks", None, "Other", "UnknownBrand", " shell "]
+    mccs = [5411, 5411, 4121, "9999", None]
+
+    result = classify_industry_frame(brands, mccs)
+
+    expected = [classify_industry(b, m) for b, m in zip(brands, mccs)]
+    actual = [
+        (None if pd.isna(t1) else t1, None if pd.isna(t2) else t2)
+        for t1, t2 in zip(result["industry_t1_pred"], result["industry_t2_pred"])
+    ]
+    assert actual == expected
+    assert isinstance(result["industry_t1_pred"].dtype, pd.CategoricalDtype)
+    assert isinstance(result["industry_t2_pred"].dtype, pd.CategoricalDtype)
@@ -0,0 +1,53 @@
+import pandas as pd
+
+from src.industry_classifier import (
+    BRAND_INDUSTRY_MAP,
+    BRAND_TAXONOMY_PATH,
+    MCC_LOOKUP,
+    MCC_TAXONOMY_PATH,
+)
+from src.industry_taxonomy import IndustryTaxonomy
+
+
+def test_reference_files_keep_builtin_mappings():
+    taxonomy = IndustryTaxonomy.from_files(MCC_TAXONOMY_PATH, BRAND_TAXONOMY_PATH)
+
+    for mcc, pair in MCC_LOOKUP.items():
+        assert taxonomy.classify(None, mcc) == pair
+    for brand, pair in BRAND_INDUSTRY_MAP.items():
+        assert taxonomy.classify(brand.title(), None) == pair
+    # Ranges such as airlines (3000-3299) are expanded per code
+    assert taxonomy.classify(None, "3100") == ("Travel", "Airlines")
+    assert taxonomy.classify("Other", 9999) == (None, None)
+
+
+def test_compiled_cache_round_trip(tmp_path):
+    mcc_path = tmp_path / "mcc.csv"
+    brand_path = tmp_path / "brands.csv"
+    mcc_path.write_text("mcc,industry_t1,industry_t2\n0742,Services,Veterinary\n5411,Retail,Supermarkets\n")
+    brand_path.write_text("brand,industry_t1,industry_t2\nAcme ,Retail,Hardware\n")
+
+    first = IndustryTaxonomy.load(mcc_path, brand_path, cache_dir=tmp_path / "cache")
+    assert len(list((tmp_path / "cache").glob("*.npz"))) == 1
+    cached = IndustryTaxonomy.load(mcc_path, brand_path, cache_dir=tmp_path / "cache")
+
+    brands, mccs = ["acme", None, "Other", "unknown"], [5411, 742, "5411", None]
+    pd.testing.assert_frame_equal(cached.classify_frame(brands, mccs), first.classify_frame(brands, mccs))
+    assert cached.classify(" ACME", 742) == ("Retail", "Hardware")
+
+
+def test_large_brand_table_frame_matches_scalar():
+    brand_map = {f"brand {i}": (f"Tier {i % 7}", f"Sub {i % 97}") for i in range(50_000)}
+    taxonomy = IndustryTaxonomy.from_mappings(MCC_LOOKUP, brand_map)
+
+    brands = ["Brand 49999", "brand 3", "Other", None, "nope"] * 200
+    mccs = [5411, None, 4121, "5541", 1234] * 200
+    result = taxonomy.classify_frame(brands, mccs)
+
+    expected = [taxonomy.classify(b, m) for b, m in zip(brands, mccs)]
+    actual = [
+        (None if pd.isna(t1) else t1, None if pd.isna(t2) else t2)
+        for t1, t2 in zip(result["industry_t1_pred"], result["industry_t2_pred"])
+    ]
+    assert actual == expected
+    assert expected[0] == ("Tier 5", "Sub 44")
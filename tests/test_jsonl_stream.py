@@ -0,0 +1,80 @@
+import io
+import json
+import threading
+
+import pandas as pd
+
+from categorize_transactions import categorize_transactions, enrich_jsonl_stream
+
+RECORDS = [
+    {"TXN_ID": 1, "RAW_MERCHANT": "STARBUCKS #123", "MCC_CODE": 5814, "AMOUNT": 4.5},
+    {"TXN_ID": 2, "RAW_MERCHANT": "Shel*l", "MCC_CODE": 5541},
+    {"TXN_ID": 3, "RAW_MERCHANT": None, "MCC_CODE": 9999},
+    {"TXN_ID": 4, "MCC_CODE": 5411},
+]
+
+
+def test_stream_matches_pipeline_and_keeps_order():
+    lines = [json.dumps(record) + "\n" for record in RECORDS]
+    lines.insert(2, "not json\n")
+    lines.insert(3, "\n")
+    output = io.StringIO()
+
+    written = enrich_jsonl_stream(iter(lines), output, batch_size=2)
+
+    results = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert written == len(results) == 5
+    assert "error" in results[2]
+    del results[2]
+    expected = categorize_transactions(pd.DataFrame({
+        "RAW_MERCHANT": [record.get("RAW_MERCHANT") for record in RECORDS],
+        "MCC_CODE": [record.get("MCC_CODE") for record in RECORDS],
+    }, dtype=object))
+    for result, record, (_, row) in zip(results, RECORDS, expected.iterrows()):
+        assert {key: result[key] for key in record} == record
+        assert result["brand_pred"] == row["brand_pred"]
+        assert result["industry_t1_pred"] == (None if pd.isna(row["industry_t1_pred"]) else row["industry_t1_pred"])
+
+
+def test_records_with_nested_fields_fail_alone():
+    lines = [
+        json.dumps(RECORDS[0]),
+        json.dumps({"RAW_MERCHANT": ["x"], "MCC_CODE": 5814}),
+        json.dumps({"RAW_MERCHANT": "GRAB", "MCC_CODE": {"a": 1}}),
+        json.dumps(RECORDS[1]),
+    ]
+    output = io.StringIO()
+
+    assert enrich_jsonl_stream(iter(lines), output, batch_size=10) == 4
+
+    results = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert results[1] == {"error": "RAW_MERCHANT must be a string or null"}
+    assert results[2] == {"error": "MCC_CODE must be a number, a string or null"}
+    assert [results[0]["brand_pred"], results[3]["TXN_ID"]] == ["Starbucks", 2]
+
+
+class _FlushEvent(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.flushed = threading.Event()
+
+    def flush(self):
+        self.flushed.set()
+
+
+def test_partial_batch_is_flushed_after_max_wait():
+    release = threading.Event()
+
+    def trickle():
+        yield json.dumps(RECORDS[0]) + "\n"
+        release.wait(10)  # the producer goes quiet with the batch far from full
+
+    output = _FlushEvent()
+    worker = threading.Thread(target=enrich_jsonl_stream, args=(trickle(), output, 1000, 20.0))
+    worker.start()
+    try:
+        assert output.flushed.wait(5)
+        assert json.loads(output.getvalue())["brand_pred"] == "Starbucks"
+    finally:
+        release.set()
+        worker.join()
@@ -0,0 +1,115 @@
+import json
+import threading
+
+import pandas as pd
+
+from categorize_transactions import categorize_transactions, categorize_transactions_parallel, main
+from src.metrics import NULL_METRICS, LatencyHistogram, PipelineMetrics
+
+
+def test_stage_records_time_and_calls_callback():
+    seen = []
+    metrics = PipelineMetrics(callback=lambda name, record: seen.append((name, record["rows"])))
+
+    with metrics.stage("clean", rows=10):
+        pass
+    with metrics.stage("clean", rows=5):
+        pass
+    metrics.add("rows", 15)
+    metrics.add("below_threshold_rows", 3)
+
+    report = metrics.as_dict()
+    assert report["stages"]["clean"]["calls"] == 2
+    assert report["stages"]["clean"]["rows"] == 15
+    assert report["derived"]["below_threshold_share"] == 0.2
+    assert seen == [("clean", 10), ("clean", 5)]
+
+
+def test_null_metrics_is_a_no_op():
+    with NULL_METRICS.stage("anything", rows=1):
+        pass
+    assert list(NULL_METRICS.timed_iter("read", [1, 2])) == [1, 2]
+    NULL_METRICS.add("rows", 1)
+
+
+def test_pipeline_reports_stages_and_counters():
+    df = pd.DataFrame({
+        "TXN_ID": [1, 2, 3],
+        "RAW_MERCHANT": ["STARBUCKS #123", "STARBUCKS #456", "McDonalds TST"],
+        "MCC_CODE": [5814, 5814, 5814],
+    })
+    metrics = PipelineMetrics()
+
+    categorize_transactions(df.copy(), metrics=metrics)
+
+    report = metrics.as_dict()
+    for stage in ("clean_merchant", "predict_brands", "model_inference", "classify_industry", "assemble"):
+        assert stage in report["stages"]
+    assert report["counters"]["rows"] == 3
+    assert report["counters"]["unique_merchants"] == 2
+    assert report["counters"]["model_predictions"] == 2
+
+
+def test_parallel_metrics_are_merged_from_workers():
+    df = pd.DataFrame({
+        "TXN_ID": range(6),
+        "RAW_MERCHANT": ["STARBUCKS #1", "McDonalds TST", "Shell 42"] * 2,
+        "MCC_CODE": [5814, 5814, 5541] * 2,
+    })
+    metrics = PipelineMetrics()
+
+    categorize_transactions_parallel(df, workers=2, chunksize=2, metrics=metrics)
+
+    assert metrics.counters["rows"] == 6
+    assert metrics.stages["clean_merchant"]["calls"] == 3
+
+
+def test_main_writes_metrics_and_profile(tmp_path):
+    input_file = tmp_path / "raw.csv"
+    pd.DataFrame({
+        "TXN_ID": [1, 2],
+        "RAW_MERCHANT": ["STARBUCKS #123", "McDonalds TST"],
+        "MCC_CODE": [5814, 5814],
+    }).to_csv(input_file, index=False)
+
+    main(
+        str(input_file), str(tmp_path / "out.csv"), chunksize=1,
+        metrics_path=str(tmp_path / "metrics.json"), profile_path=str(tmp_path / "run.prof"),
+    )
+
+    report = json.loads((tmp_path / "metrics.json").read_text())
+    assert {"model_load", "read", "write", "predict_brands"} <= set(report["stages"])
+    assert report["counters"]["rows"] == 2
+    assert (tmp_path / "run.prof").stat().st_size > 0
+
+
+def test_latency_histogram_percentiles():
+    histogram = LatencyHistogram()
+    for ms in [0.2] * 90 + [20] * 10:
+        histogram.observe(ms / 1000)
+
+    report = histogram.as_dict()
+    assert report["count"] == 100
+    assert report["p50_ms"] == 0.25
+    assert report["p99_ms"] == 20
+    assert sum(report["buckets"].values()) == 100
+
+
+def test_stages_and_counters_can_be_recorded_from_several_threads():
+    metrics = PipelineMetrics()
+
+    def work():
+        for chunk in metrics.timed_iter("read", [[0] * 3] * 200):
+            metrics.add("rows", len(chunk))
+            metrics.set("last_chunk_rows", len(chunk))
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    report = metrics.as_dict()
+    assert report["stages"]["read"]["calls"] == 4 * 201  # the final, exhausted next() is timed too
+    assert report["stages"]["read"]["rows"] == report["counters"]["rows"] == 4 * 200 * 3
+    assert report["counters"]["last_chunk_rows"] == 3
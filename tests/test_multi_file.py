@@ -0,0 +1,85 @@
+import json
+
+import pandas as pd
+import pyarrow.dataset as ds
+import pytest
+
+from categorize_transactions import REPORT_NAME, main
+from src.transaction_io import list_transaction_files
+
+MERCHANTS = ["STARBUCKS #1", "Shel*l", "", "McDonalds TST", "GRAB", "Guardian"]
+
+
+def _raw(rows, offset=0):
+    return pd.DataFrame({
+        "TXN_ID": [str(offset + i) for i in range(rows)],
+        "RAW_MERCHANT": [MERCHANTS[(offset + i) % len(MERCHANTS)] for i in range(rows)],
+        "MCC_CODE": ["5814"] * rows,
+    })
+
+
+def _input_dir(tmp_path):
+    input_dir = tmp_path / "drops"
+    input_dir.mkdir()
+    _raw(5).to_csv(input_dir / "day1.csv", index=False)
+    _raw(7, offset=5).to_csv(input_dir / "day2.csv", index=False)
+    _raw(4, offset=12).to_parquet(input_dir / "day3.parquet")
+    (input_dir / "broken.csv").write_text("foo,bar\n1,2\n")
+    (input_dir / "notes.txt").write_text("not a transaction file\n")
+    return input_dir
+
+
+def test_directory_input_matches_single_file_runs_and_isolates_failures(tmp_path):
+    input_dir = _input_dir(tmp_path)
+    output_dir = tmp_path / "enriched"
+
+    with pytest.raises(SystemExit, match="broken.csv"):
+        main(str(input_dir), str(output_dir), prefetch=1)
+
+    for name in ["day1.csv", "day2.csv", "day3.parquet"]:
+        main(str(input_dir / name), str(tmp_path / name))
+        assert (output_dir / name).read_bytes() == (tmp_path / name).read_bytes()
+    assert sorted(path.name for path in output_dir.iterdir()) == [REPORT_NAME, "day1.csv", "day2.csv", "day3.parquet"]
+
+    report = json.loads((output_dir / REPORT_NAME).read_text())
+    assert (report["files"], report["failed"], report["rows"]) == (4, 1, 16)
+    assert [entry["error"] is not None for entry in report["reports"]] == [True, False, False, False]
+    assert all(entry["rows_per_sec"] > 0 for entry in report["reports"][1:])
+
+
+def test_glob_input_writes_dataset_partitioned_by_source(tmp_path):
+    input_dir = _input_dir(tmp_path)
+    assert [path.name for path in list_transaction_files(input_dir / "day*")] == ["day1.csv", "day2.csv", "day3.parquet"]
+
+    main(str(input_dir / "day*"), str(tmp_path / "dataset"), output_layout="partitioned", compact_output=True)
+
+    dataset = ds.dataset(tmp_path / "dataset", format="parquet", partitioning="hive", exclude_invalid_files=True)
+    table = dataset.to_table().to_pandas()
+    assert table.groupby("source").size().to_dict() == {"day1": 5, "day2": 7, "day3": 4}
+    assert table.loc[table["TXN_ID"].astype(str) == "0", "brand_pred"].astype(str).item() == "Starbucks"
+
+
+def test_nested_inputs_keep_their_relative_paths_and_clashes_are_refused(tmp_path):
+    input_dir = tmp_path / "drops"
+    for region in ["east", "west"]:
+        (input_dir / region).mkdir(parents=True)
+        _raw(3).to_csv(input_dir / region / "day1.csv", index=False)
+    _raw(2).to_parquet(input_dir / "west" / "day1.parquet")
+
+    main(str(input_dir / "**" / "*.csv"), str(tmp_path / "enriched"))
+    assert (tmp_path / "enriched" / "east" / "day1.csv").exists() and (tmp_path / "enriched" / "west" / "day1.csv").exists()
+
+    # day1.csv and day1.parquet would share the west__day1 partition
+    with pytest.raises(SystemExit, match="same output"):
+        main(str(input_dir / "west" / "*"), str(tmp_path / "dataset"), output_layout="partitioned")
+    assert not (tmp_path / "dataset").exists()
+
+
+def test_output_directory_holding_the_inputs_is_refused(tmp_path):
+    input_dir = _input_dir(tmp_path)
+    before = (input_dir / "day1.csv").read_bytes()
+
+    for output in [input_dir, tmp_path]:
+        with pytest.raises(SystemExit, match="contains input files"):
+            main(str(input_dir / "day*"), str(output))
+    assert (input_dir / "day1.csv").read_bytes() == before
@@ -0,0 +1,71 @@
+from src.prediction_cache import PredictionCache, model_fingerprint
+
+
+def _entry(merchant, brand="Starbucks", confidence=0.9):
+    return (merchant, brand, confidence, [(brand, confidence), ("Other", 1 - confidence)])
+
+
+def test_cache_roundtrip_and_counters(tmp_path):
+    cache = PredictionCache(tmp_path / "cache.sqlite", "model-a")
+    cache.put_many([_entry("starbucks")])
+
+    found = cache.get_many(["starbucks", "unknown"])
+
+    assert found == {"starbucks": ("Starbucks", 0.9, [("Starbucks", 0.9), ("Other", 1 - 0.9)])}
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_cache_invalidated_by_new_fingerprint(tmp_path):
+    PredictionCache(tmp_path / "cache.sqlite", "model-a").put_many([_entry("starbucks")])
+
+    cache = PredictionCache(tmp_path / "cache.sqlite", "model-b")
+
+    assert cache.get_many(["starbucks"]) == {}
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = PredictionCache(tmp_path / "cache.sqlite", "model-a", max_entries=2)
+    cache.put_many([_entry("a")])
+    cache.put_many([_entry("b")])
+    cache.get_many(["a"])  # "b" is now least recently used
+
+    cache.put_many([_entry("c")])
+
+    assert set(cache.get_many(["a", "b", "c"])) == {"a", "c"}
+    assert cache.stats()["entries"] == 2
+
+
+def test_model_fingerprint_changes_with_content(tmp_path):
+    artifact = tmp_path / "model.joblib"
+    artifact.write_bytes(b"v1")
+    first = model_fingerprint(artifact)
+    artifact.write_bytes(b"v2")
+
+    assert model_fingerprint(artifact) != first
+
+
+def test_size_bound_is_shared_by_instances_on_one_file(tmp_path):
+    first = PredictionCache(tmp_path / "cache.sqlite", "model-a", max_entries=3)
+    second = PredictionCache(tmp_path / "cache.sqlite", "model-a", max_entries=3)
+
+    first.put_many([_entry("a")])
+    first.put_many([_entry("b")])
+    second.put_many([_entry("c")])
+    second.put_many([_entry("d")])
+    first.put_many([_entry("e")])
+
+    assert first.stats()["entries"] == second.stats()["entries"] == 3
+    assert set(second.get_many(["a", "b", "c", "d", "e"])) == {"c", "d", "e"}
+
+
+def test_hits_do_not_write_until_flushed(tmp_path):
+    cache = PredictionCache(tmp_path / "cache.sqlite", "model-a")
+    cache.put_many([_entry("a")])
+    writes = cache._conn.total_changes
+
+    cache.get_many(["a"])
+    cache.get_many(["a", "b"])
+
+    assert cache._conn.total_changes == writes
+    cache.close()
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+from scripts.generate_synthetic_data_with_labels import (
+    build_merchant_catalog,
+    generate_transaction_chunks,
+    write_load_test_data,
+)
+
+
+def _collect(**options):
+    chunks = list(generate_transaction_chunks(**options))
+    return pd.concat([raw for raw, _ in chunks], ignore_index=True), pd.concat([train for _, train in chunks])
+
+
+def test_generation_is_deterministic_and_chunked():
+    first_raw, first_train = _collect(n_rows=2500, chunksize=1000, cardinality=200, seed=7)
+    second_raw, _ = _collect(n_rows=2500, chunksize=1000, cardinality=200, seed=7)
+    other_raw, _ = _collect(n_rows=2500, chunksize=1000, cardinality=200, seed=8)
+
+    pd.testing.assert_frame_equal(first_raw, second_raw)
+    assert not first_raw["RAW_MERCHANT"].equals(other_raw["RAW_MERCHANT"])
+    assert list(first_raw["TXN_ID"]) == list(range(1, 2501))
+    assert len(first_train) == 2500
+    assert first_raw["RAW_MERCHANT"].nunique() <= 200
+
+
+def test_zipf_skew_concentrates_traffic():
+    skewed, _ = _collect(n_rows=20_000, cardinality=1000, skew=1.2)
+    uniform, _ = _collect(n_rows=20_000, cardinality=1000, skew=0.0)
+
+    top_share = skewed["RAW_MERCHANT"].value_counts(normalize=True).iloc[0]
+    assert top_share > 3 * uniform["RAW_MERCHANT"].value_counts(normalize=True).iloc[0]
+
+
+def test_catalog_labels_match_merchants():
+    catalog = build_merchant_catalog(500, seed=1, other_share=0.3)
+
+    known = catalog[catalog["BRAND"] != "Other"]
+    assert 0.2 < (catalog["BRAND"] == "Other").mean() < 0.4
+    first_words = known["cleaned"].str.replace(" ", "").str[:4]
+    assert (first_words == known["BRAND"].str.lower().str.replace(" ", "").str[:4]).all()
+
+
+def test_write_load_test_data_streams_parquet(tmp_path):
+    rows = write_load_test_data(
+        3000, tmp_path / "raw.parquet", tmp_path / "labels.parquet", chunksize=1000, cardinality=100
+    )
+
+    raw = pd.read_parquet(tmp_path / "raw.parquet")
+    labels = pd.read_parquet(tmp_path / "labels.parquet")
+    assert rows == len(raw) == len(labels) == 3000
+    assert np.issubdtype(raw["TIMESTAMP"].dtype, np.datetime64)
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+from scripts import train_brand_classifier as training
+
+
+def _training_frame():
+    brands = ["starbucks", "shell", "grab"]
+    suffixes = ["", "mall", "hq", "tst", "123", "x", "y", "z", "sg", "central", "east", "west"]
+    rows = [(f"{brand} {suffix}".strip(), brand) for brand in brands for suffix in suffixes]
+    return pd.DataFrame(rows, columns=["cleaned", "BRAND"])
+
+
+def test_featurize_reuses_cached_matrices(tmp_path):
+    df = _training_frame()
+    cache_dir = tmp_path / training.feature_cache_key(df)
+
+    _, first_train, first_test = training.featurize(df["cleaned"][:30], df["cleaned"][30:], cache_dir)
+    vectorizer, cached_train, cached_test = training.featurize(None, None, cache_dir)
+
+    assert (first_train != cached_train).nnz == 0 and (first_test != cached_test).nnz == 0
+    assert vectorizer.transform(["grab hq"]).shape[1] == first_train.shape[1]
+
+
+def test_feature_cache_key_tracks_data():
+    df = _training_frame()
+    changed = df.copy()
+    changed.loc[0, "BRAND"] = "shell"
+
+    assert training.feature_cache_key(df) == training.feature_cache_key(df.copy())
+    assert training.feature_cache_key(df) != training.feature_cache_key(changed)
+
+
+def test_cached_training_matches_uncached(tmp_path, monkeypatch):
+    monkeypatch.setattr(training, "FEATURE_CACHE_DIR", tmp_path)
+    df = _training_frame()
+    texts = ["starbucks tst", "grab", "unknown"]
+
+    fresh = training.train_model(df, n_jobs=1)
+    cached = training.train_model(df, n_jobs=1, cache_features=True)
+    reused = training.train_model(df, n_jobs=1, cache_features=True)
+
+    assert np.allclose(fresh.predict_proba(texts), cached.predict_proba(texts))
+    assert np.allclose(fresh.predict_proba(texts), reused.predict_proba(texts))
@@ -0,0 +1,91 @@
+import pandas as pd
+import pytest
+
+from src.industry_classifier import classify_industry_frame
+from src.transaction_io import TransactionWriter, detect_format, drop_rows, read_transactions
+
+RAW = pd.DataFrame({
+    "TXN_ID": [1, 2, 3],
+    "RAW_MERCHANT": ["STARBUCKS #1", "Shel*l", "GRAB"],
+    "MCC_CODE": [5814, 5541, None],
+    "CURRENCY": ["SGD", "HKD", "SGD"],
+    "TIMESTAMP": ["2025-01-01 10:00:00", "2025-01-02 11:30:00", "2025-01-03 12:45:00"],
+    "CITY": ["Singapore", "Hong Kong", "Singapore"],
+    "UNUSED": ["x", "y", "z"],
+})
+
+
+def test_detect_format():
+    assert detect_format("out/enriched.parquet") == "parquet"
+    assert detect_format("in.feather") == "arrow"
+    assert detect_format("in.dat", "csv") == "csv"
+    with pytest.raises(ValueError):
+        detect_format("in.dat")
+
+
+@pytest.mark.parametrize("suffix", [".parquet", ".arrow"])
+def test_columnar_roundtrip_projects_and_types_columns(tmp_path, suffix):
+    path = tmp_path / f"raw{suffix}"
+    with TransactionWriter(path) as writer:
+        writer.write(RAW.iloc[:2])
+        writer.write(RAW.iloc[2:])
+
+    df = read_transactions(path)
+
+    assert "UNUSED" not in df.columns
+    assert isinstance(df["CURRENCY"].dtype, pd.CategoricalDtype)
+    assert str(df["MCC_CODE"].dtype) == "Int32"
+    assert pd.api.types.is_datetime64_any_dtype(df["TIMESTAMP"])
+    assert df["MCC_CODE"].isna().tolist() == [False, False, True]
+    assert [len(chunk) for chunk in read_transactions(path, chunksize=2)] == [2, 1]
+
+
+def test_csv_reads_text_columns(tmp_path):
+    path = tmp_path / "raw.csv"
+    RAW.to_csv(path, index=False)
+
+    df = read_transactions(path)
+
+    assert "UNUSED" not in df.columns
+    assert df.loc[0, "MCC_CODE"] == "5814.0"  # verbatim text, not re-parsed
+
+
+def test_csv_float_mcc_text_still_maps_to_an_industry(tmp_path):
+    path = tmp_path / "raw.csv"
+    path.write_text("TXN_ID,RAW_MERCHANT,MCC_CODE\n1,ZQXJ VWK,5411.0\n2,FOO,\n3,BAR,5814\n")
+
+    df = read_transactions(path)
+    industries = classify_industry_frame([None] * len(df), df["MCC_CODE"])
+
+    assert df["MCC_CODE"].tolist()[::2] == ["5411.0", "5814"]
+    assert industries["industry_t2_pred"].tolist()[::2] == ["Supermarkets", "Coffee Shops"]
+
+
+def test_unparseable_values_are_kept_with_a_warning(tmp_path):
+    path = tmp_path / "raw.parquet"
+    malformed = RAW.assign(TIMESTAMP=["2025-01-01 10:00:00", "yesterday", None], MCC_CODE=["5814", "n/a", None])
+    malformed.to_parquet(path)
+
+    with pytest.warns(UserWarning) as caught:
+        df = read_transactions(path)
+
+    assert sorted(str(warning.message) for warning in caught) == [
+        "1 MCC_CODE values could not be parsed; keeping the column as read",
+        "1 TIMESTAMP values could not be parsed; keeping the column as read",
+    ]
+    assert df["TIMESTAMP"].tolist() == ["2025-01-01 10:00:00", "yesterday", None]
+    assert df["MCC_CODE"].tolist() == ["5814", "n/a", None]
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".parquet", ".arrow"])
+def test_drop_rows_copies_only_when_rows_match(tmp_path, suffix):
+    path, target = tmp_path / f"enriched{suffix}", tmp_path / f"kept{suffix}"
+    with TransactionWriter(path) as writer:
+        writer.write(RAW)
+
+    assert not drop_rows(path, target, "TXN_ID", ["9"])
+    assert not target.exists()
+    assert drop_rows(path, target, "TXN_ID", ["1", "3"])
+
+    kept = pd.read_csv(target) if suffix == ".csv" else read_transactions(target)
+    assert kept["TXN_ID"].tolist() == [2]